@@ -3,6 +3,11 @@ from PyQt6.QtWidgets import (
 )
 import mariadb
 from PyQt6 import uic
+from controls.events import bus, ProductUpdated
+from db.changes import record_change
+from db.inventory import record_movement
+from db.replicas import note_write
+from reports.money import to_cents
 
 class AddProductForm(QMainWindow):
     def __init__(self, user_id, db_config):
@@ -17,6 +22,7 @@ class AddProductForm(QMainWindow):
         self.price_input = self.findChild(QLineEdit, "priceInput")
         self.purchase_price_input = self.findChild(QLineEdit, "purchasePriceInput")
         self.stock_input = self.findChild(QSpinBox, "stockInput")
+        self.sku_input = self.findChild(QLineEdit, "skuInput")
 
         if self.stock_input:
             self.stock_input.setMinimum(1)
@@ -31,6 +37,8 @@ class AddProductForm(QMainWindow):
         selling_price = self.price_input.text()
         purchase_price = self.purchase_price_input.text()
         stock = self.stock_input.value()
+        #sku is optional, empty means the product has no code
+        sku = self.sku_input.text().strip() or None
 
         if product_name and selling_price and purchase_price:
             try:
@@ -40,12 +48,26 @@ class AddProductForm(QMainWindow):
                 conn = mariadb.connect(**self.db_config)
                 cursor = conn.cursor()
                 cursor.execute(
-                    "INSERT INTO products (productName, price, purchasePrice, stock, userId) VALUES (?, ?, ?, ?, ?)",
-                    (product_name, selling_price, purchase_price, stock, self.user_id)
+                    "INSERT INTO products (productName, sku, price, purchasePrice, stock, userId) VALUES (?, ?, ?, ?, ?, ?)",
+                    (product_name, sku, selling_price, purchase_price, stock, self.user_id)
                 )
+                product_id = cursor.lastrowid
+                record_movement(cursor, self.user_id, product_id, stock, "receipt", note="new product")
+                record_change(cursor, self.user_id, "product", product_id)
                 conn.commit()
+                note_write(self.user_id)
+                bus.publish(ProductUpdated(
+                    self.user_id, product_id, product_name,
+                    to_cents(selling_price), to_cents(purchase_price), stock, created=True, sku=sku
+                ))
                 QMessageBox.information(self, "Success", "Product added successfully!")
                 self.clear_fields()
+            except mariadb.IntegrityError as e:
+                #1062 is a duplicate key; only the SKU's unique key means the code is taken
+                if e.errno == 1062 and "idx_products_user_sku" in str(e):
+                    QMessageBox.critical(self, "Error", f"The SKU {sku} is already used by another product.")
+                else:
+                    QMessageBox.critical(self, "Error", str(e))
             except Exception as e:
                 QMessageBox.critical(self, "Error", str(e))
             finally:
@@ -59,6 +81,7 @@ class AddProductForm(QMainWindow):
         self.product_name_input.clear()
         self.price_input.clear()
         self.purchase_price_input.clear()
+        self.sku_input.clear()
         self.stock_input.setValue(1)
 
     def go_back(self):
@@ -0,0 +1,79 @@
+from dataclasses import dataclass
+from decimal import Decimal
+
+#the order screen's basket, kept apart from the table so a quantity change costs O(1)
+
+@dataclass
+class CartLine:
+    product_id: int
+    name: str
+    quantity: int
+    price_cents: int
+    cost_cents: int
+
+    @property
+    def total_cents(self):
+        return self.price_cents * self.quantity
+
+
+class Cart:
+    def __init__(self):
+        self.lines = {}  #productId -> CartLine, in the order they were added
+        self.total_cents = 0
+        self.cost_cents = 0
+        self.units = 0
+
+    def __len__(self):
+        return len(self.lines)
+
+    def __bool__(self):
+        return bool(self.lines)
+
+    def quantity(self, product_id):
+        line = self.lines.get(product_id)
+        return line.quantity if line else 0
+
+    def set_quantity(self, product_id, name, price_cents, cost_cents, quantity):
+        line = self.lines.get(product_id)
+        if line:
+            self.total_cents -= line.total_cents
+            self.cost_cents -= line.cost_cents * line.quantity
+            self.units -= line.quantity
+        if quantity <= 0:
+            self.lines.pop(product_id, None)
+            return
+        if line:
+            line.name, line.quantity, line.price_cents, line.cost_cents = name, quantity, price_cents, cost_cents
+        else:
+            line = self.lines[product_id] = CartLine(product_id, name, quantity, price_cents, cost_cents)
+        self.total_cents += line.total_cents
+        self.cost_cents += line.cost_cents * line.quantity
+        self.units += line.quantity
+
+    def set_price(self, product_id, price_cents):
+        line = self.lines.get(product_id)
+        if line:
+            self.total_cents += (price_cents - line.price_cents) * line.quantity
+            line.price_cents = price_cents
+
+    def remove(self, product_id):
+        line = self.lines.get(product_id)
+        if line:
+            self.set_quantity(product_id, line.name, line.price_cents, line.cost_cents, 0)
+
+    def clear(self):
+        self.lines = {}
+        self.total_cents = 0
+        self.cost_cents = 0
+        self.units = 0
+
+    def change_cents(self, payment_cents):
+        return payment_cents - self.total_cents
+
+    def checkout_lines(self):
+        #(productId, quantity, total, unit price, unit cost) as Decimals for the database
+        return tuple(
+            (line.product_id, line.quantity, Decimal(line.total_cents).scaleb(-2),
+             Decimal(line.price_cents).scaleb(-2), Decimal(line.cost_cents).scaleb(-2))
+            for line in self.lines.values()
+        )
@@ -0,0 +1,106 @@
+import mariadb
+from PyQt6.QtCore import QCoreApplication, QThread, pyqtSignal
+from controls.events import bus, OrderCommitted, OrderLine, ProductUpdated
+from db.changes import TERMINAL_ID
+from db.config import change_feed_config
+from db.statements import Statements
+
+#userId -> the running feed, one per user however many dashboards get created
+feeds = {}
+
+
+def start_feed(user_id, db_config):
+    feed = feeds.get(user_id)
+    if feed and feed.isRunning():
+        return feed
+    if not feeds:
+        QCoreApplication.instance().aboutToQuit.connect(stop_feeds)
+    feed = feeds[user_id] = ChangeFeedThread(user_id, db_config)
+    #bus lives in the GUI thread, so the events are published there
+    feed.changed.connect(bus.publish)
+    feed.start()
+    return feed
+
+
+def stop_feeds():
+    for feed in feeds.values():
+        feed.requestInterruption()
+    for feed in feeds.values():
+        feed.wait()
+    feeds.clear()
+
+
+class ChangeFeedThread(QThread):
+    #turns other terminals' change_log rows into the same events this terminal publishes itself
+    changed = pyqtSignal(object)
+
+    def __init__(self, user_id, db_config):
+        super().__init__()
+        self.user_id = user_id
+        self.db_config = db_config
+        self.last_seq = None
+
+    def run(self):
+        conn = None
+        while not self.isInterruptionRequested():
+            try:
+                if conn is None:
+                    conn = mariadb.connect(**self.db_config)
+                    #every poll has to see rows committed since the previous one
+                    conn.autocommit = True
+                    statements = Statements(conn)
+                    if self.last_seq is None:
+                        #start from now, whatever happened before is already in the views' first load
+                        self.last_seq = statements.one("last_change", (self.user_id,)).seq
+                self.poll(statements)
+            except mariadb.Error as e:
+                print("Change feed error:", e)
+                if conn:
+                    conn.close()
+                conn = None
+            self.pause(change_feed_config["poll_seconds"])
+        if conn:
+            statements.close()
+            conn.close()
+
+    def pause(self, seconds):
+        for _ in range(int(seconds * 10)):
+            if self.isInterruptionRequested():
+                return
+            self.msleep(100)
+
+    def poll(self, statements):
+        rows = statements.all("changes_since", (self.user_id, self.last_seq, change_feed_config["batch"]))
+        orders, products = {}, {}
+        for row in rows:
+            if row.terminalId == TERMINAL_ID:
+                continue
+            #several changes to the same row become one read
+            (orders if row.entity == "order" else products)[row.entityId] = True
+
+        for order_id in orders:
+            event = self.read_order(statements, order_id)
+            if event:
+                self.changed.emit(event)
+        for product_id in products:
+            self.changed.emit(self.read_product(statements, product_id))
+        #only moved on once everything was read, a failed poll is retried from the same place
+        if rows:
+            self.last_seq = rows[-1].seq
+
+    def read_order(self, statements, order_id):
+        lines = statements.all("changed_order", (order_id, self.user_id))
+        if not lines:
+            return None  # archived or moved since
+        return OrderCommitted(self.user_id, order_id, lines[0].orderDateTime, lines[0].totalCents, tuple(
+            OrderLine(line.productId, line.productName, line.quantity, line.lineCents, line.costCents)
+            for line in lines
+        ))
+
+    def read_product(self, statements, product_id):
+        product = statements.one("changed_product", (product_id, self.user_id))
+        if product is None:
+            return ProductUpdated(self.user_id, product_id, removed=True)
+        #created lets a view that does not list the product yet add it when it matches its search
+        return ProductUpdated(self.user_id, product_id, product.productName, product.priceCents,
+                              product.purchasePriceCents, product.stock, created=True, sku=product.sku)
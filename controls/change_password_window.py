@@ -54,10 +54,7 @@ class ChangePasswordWindow(QDialog):
 
         try:
             username = self.user_data.get("username")
-            result = self.db.execute_query(
-                "SELECT uniqueToken FROM user WHERE LOWER(username) = LOWER(?)",
-                (username,)
-            )
+            result = self.db.fetch("token_by_username", (username,))
 
             if result is None:
                 QMessageBox.critical(self, "Database Error", "An error occurred during the database query.")
@@ -67,7 +64,7 @@ class ChangePasswordWindow(QDialog):
                 QMessageBox.critical(self, "Error", "User not found or no token set.")
                 return
 
-            stored_token = result[0]["uniqueToken"]
+            stored_token = result[0].uniqueToken
 
             if ":" not in stored_token:
                 QMessageBox.critical(self, "Error", "Stored token format is invalid.")
@@ -123,10 +120,7 @@ class ChangePasswordWindow(QDialog):
         password_to_store = encrypted_password.hex() + ":" + salt.hex()
 
         try:
-            success = self.db.execute_non_query(
-                "UPDATE user SET password = ? WHERE username = ?",
-                (password_to_store, self.user_data["username"])
-            )
+            success = self.db.run("update_password", (password_to_store, self.user_data["username"]))
             if success:
                 QMessageBox.information(self, "Success", "Password updated successfully.")
                 self.go_back()
@@ -0,0 +1,206 @@
+import math
+from bisect import bisect_left
+from PyQt6.QtWidgets import QWidget, QToolTip
+from PyQt6.QtCore import Qt, QPointF, QRectF, pyqtSignal
+from PyQt6.QtGui import QPainter, QColor, QPen, QFont, QPolygonF
+
+BAR_COLOR = QColor(135, 206, 235)       # skyblue, same as the old graphs
+HOVER_COLOR = QColor(58, 141, 255)
+GRID_COLOR = QColor(204, 204, 204)
+TEXT_COLOR = QColor(3, 37, 57)
+
+
+def nice_ticks(max_value, count=5, integer=True):
+    if max_value <= 0:
+        return [0, 1] if integer else [0.0, 1.0]
+    raw_step = max_value / count
+    magnitude = 10 ** math.floor(math.log10(raw_step))
+    for factor in (1, 2, 5, 10):
+        step = factor * magnitude
+        if step >= raw_step:
+            break
+    if integer:
+        step = max(1, int(round(step)))
+    top = math.ceil(max_value / step) * step
+    ticks = []
+    value = 0
+    while value <= top + step / 2:
+        ticks.append(value)
+        value += step
+    return ticks
+
+
+class ChartWidget(QWidget):
+    #index of the bar (or point) the user clicked
+    barClicked = pyqtSignal(int)
+
+    def __init__(self, parent=None, kind="bar", integer=True):
+        super().__init__(parent)
+        self.kind = kind
+        self.integer = integer
+        self.labels = []
+        self.values = []
+        self.positions = None
+        self.title = ""
+        self.y_label = ""
+        self.hover_index = None
+        self.value_format = (lambda value: f"{value:,.0f}") if integer else (lambda value: f"{value:,.2f}")
+        self.setMouseTracking(True)
+        self.setMinimumHeight(120)
+
+    def set_data(self, labels, values, title="", y_label="", positions=None):
+        #positions (line charts only) are 0..1 fractions of the width, for unevenly spaced points
+        self.labels = list(labels)
+        self.values = list(values)
+        self.positions = list(positions) if positions is not None else None
+        self.title = title
+        self.y_label = y_label
+        self.hover_index = None
+        self.update()
+
+    def set_value(self, index, value):
+        self.values[index] = value
+        self.update()
+
+    def plot_rect(self):
+        left = 48 if self.y_label else 36
+        return QRectF(left, 24, max(self.width() - left - 12, 1), max(self.height() - 24 - 30, 1))
+
+    def plot_width(self):
+        return int(self.plot_rect().width())
+
+    def index_at(self, x):
+        if not self.values:
+            return None
+        plot = self.plot_rect()
+        if x < plot.left() or x > plot.right():
+            return None
+        if self.kind == "line":
+            fractions = self.line_fractions()
+            target = (x - plot.left()) / plot.width()
+            i = bisect_left(fractions, target)
+            if i == len(fractions) or (i > 0 and target - fractions[i - 1] < fractions[i] - target):
+                i -= 1
+            return i
+        slot = plot.width() / len(self.values)
+        return min(int((x - plot.left()) / slot), len(self.values) - 1)
+
+    def line_fractions(self):
+        if self.positions is not None:
+            return self.positions
+        count = len(self.values)
+        return [i / max(count - 1, 1) for i in range(count)]
+
+    def paintEvent(self, event):
+        painter = QPainter(self)
+        painter.setRenderHint(QPainter.RenderHint.Antialiasing)
+        painter.fillRect(self.rect(), Qt.GlobalColor.white)
+        plot = self.plot_rect()
+
+        small_font = QFont(self.font())
+        small_font.setPointSize(7)
+        title_font = QFont(self.font())
+        title_font.setPointSize(9)
+
+        painter.setFont(title_font)
+        painter.setPen(TEXT_COLOR)
+        painter.drawText(QRectF(0, 2, self.width(), 20), Qt.AlignmentFlag.AlignCenter, self.title)
+
+        ticks = nice_ticks(max(self.values, default=0), integer=self.integer)
+        top = ticks[-1] or 1
+
+        def y_of(value):
+            return plot.bottom() - value / top * plot.height()
+
+        painter.setFont(small_font)
+        grid_pen = QPen(GRID_COLOR)
+        grid_pen.setStyle(Qt.PenStyle.DashLine)
+        for tick in ticks:
+            y = y_of(tick)
+            painter.setPen(grid_pen)
+            painter.drawLine(QPointF(plot.left(), y), QPointF(plot.right(), y))
+            painter.setPen(TEXT_COLOR)
+            painter.drawText(QRectF(0, y - 7, plot.left() - 4, 14),
+                             Qt.AlignmentFlag.AlignRight | Qt.AlignmentFlag.AlignVCenter,
+                             f"{tick:g}" if self.integer else f"{tick:,.0f}")
+
+        if self.y_label:
+            painter.save()
+            painter.translate(10, plot.center().y())
+            painter.rotate(-90)
+            painter.drawText(QRectF(-plot.height() / 2, -6, plot.height(), 12), Qt.AlignmentFlag.AlignCenter, self.y_label)
+            painter.restore()
+
+        count = len(self.values)
+        if count:
+            if self.kind == "line":
+                self.paint_line(painter, plot, y_of)
+            else:
+                self.paint_bars(painter, plot, y_of)
+            self.paint_x_labels(painter, plot)
+        painter.end()
+
+    def paint_bars(self, painter, plot, y_of):
+        slot = plot.width() / len(self.values)
+        bar_width = max(slot * 0.7, 1)
+        painter.setPen(Qt.PenStyle.NoPen)
+        for i, value in enumerate(self.values):
+            if value <= 0:
+                continue
+            x = plot.left() + i * slot + (slot - bar_width) / 2
+            y = y_of(value)
+            painter.setBrush(HOVER_COLOR if i == self.hover_index else BAR_COLOR)
+            painter.drawRect(QRectF(x, y, bar_width, plot.bottom() - y))
+
+    def paint_line(self, painter, plot, y_of):
+        fractions = self.line_fractions()
+        polygon = QPolygonF([QPointF(plot.left() + f * plot.width(), y_of(value))
+                             for f, value in zip(fractions, self.values)])
+        pen = QPen(BAR_COLOR)
+        pen.setWidthF(1.5)
+        painter.setPen(pen)
+        painter.drawPolyline(polygon)
+        if self.hover_index is not None:
+            painter.setBrush(HOVER_COLOR)
+            painter.setPen(Qt.PenStyle.NoPen)
+            i = self.hover_index
+            painter.drawEllipse(QPointF(plot.left() + fractions[i] * plot.width(), y_of(self.values[i])), 3, 3)
+
+    def paint_x_labels(self, painter, plot):
+        count = len(self.labels)
+        if not count:
+            return
+        metrics = painter.fontMetrics()
+        widest = max(metrics.horizontalAdvance(str(label)) for label in self.labels[:: max(count // 50, 1)]) + 6
+        if self.kind == "line":
+            positions = [plot.left() + f * plot.width() for f in self.line_fractions()]
+        else:
+            slot = plot.width() / count
+            positions = [plot.left() + (i + 0.5) * slot for i in range(count)]
+        #skip labels instead of letting them overlap
+        every = max(1, math.ceil(widest / (plot.width() / count)))
+        painter.setPen(TEXT_COLOR)
+        for i in range(0, count, every):
+            painter.drawText(QRectF(positions[i] - widest / 2, plot.bottom() + 4, widest, 14),
+                             Qt.AlignmentFlag.AlignCenter, str(self.labels[i]))
+
+    def mouseMoveEvent(self, event):
+        index = self.index_at(event.position().x())
+        if index != self.hover_index:
+            self.hover_index = index
+            self.update()
+        if index is not None:
+            QToolTip.showText(event.globalPosition().toPoint(),
+                              f"{self.labels[index]}: {self.value_format(self.values[index])}", self)
+        else:
+            QToolTip.hideText()
+
+    def leaveEvent(self, event):
+        self.hover_index = None
+        self.update()
+
+    def mousePressEvent(self, event):
+        if event.button() == Qt.MouseButton.LeftButton:
+            index = self.index_at(event.position().x())
+            if index is not None:
+                self.barClicked.emit(index)
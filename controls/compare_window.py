@@ -0,0 +1,147 @@
+from datetime import timedelta
+from PyQt6 import uic
+from PyQt6.QtWidgets import (
+    QMainWindow, QTableWidget, QTableWidgetItem, QPushButton, QMessageBox,
+    QLabel, QComboBox, QDateEdit, QHeaderView
+)
+from PyQt6.QtCore import QDate, Qt, QThread, pyqtSignal
+from controls.profiling import profiled
+from reports.compare import (
+    METRICS, METRIC_LABELS, compare_periods, format_change, format_delta, format_metric,
+    previous_period, same_period_last_year
+)
+from reports.money import format_cents
+
+class CompareWindow(QMainWindow):
+    def __init__(self, user_id, db_config, selected_date=None):
+        super().__init__()
+        uic.loadUi("ui/compare.ui", self)
+        self.user_id = user_id
+        self.db_config = db_config
+        self.thread = None
+
+        self.period_start = self.findChild(QDateEdit, "periodStart")
+        self.period_end = self.findChild(QDateEdit, "periodEnd")
+        self.base_choice = self.findChild(QComboBox, "baseChoice")
+        self.base_start = self.findChild(QDateEdit, "baseStart")
+        self.base_end = self.findChild(QDateEdit, "baseEnd")
+        self.compare_button = self.findChild(QPushButton, "compareButton")
+        self.back_button = self.findChild(QPushButton, "backButton")
+        self.totals_table = self.findChild(QTableWidget, "totalsTable")
+        self.products_table = self.findChild(QTableWidget, "productsTable")
+        self.periods_label = self.findChild(QLabel, "periodsLabel")
+
+        self.totals_table.setColumnCount(4)
+        self.totals_table.setHorizontalHeaderLabels(["Metric", "Period", "Against", "Change"])
+        self.products_table.setColumnCount(5)
+        self.products_table.setHorizontalHeaderLabels(["Product Name", "Units", "Revenue", "Against", "Change"])
+        self.products_table.horizontalHeader().setSectionResizeMode(0, QHeaderView.ResizeMode.Stretch)
+
+        #default: the week of the day picked in sales history, up to that day
+        day = selected_date or QDate.currentDate()
+        self.period_start.setDate(day.addDays(1 - day.dayOfWeek()))
+        self.period_end.setDate(day)
+        self.update_base_dates()
+
+        self.base_choice.currentTextChanged.connect(self.update_base_dates)
+        self.period_start.dateChanged.connect(self.update_base_dates)
+        self.period_end.dateChanged.connect(self.update_base_dates)
+        self.compare_button.clicked.connect(self.compare)
+        self.back_button.clicked.connect(self.close)
+
+        self.compare()
+
+    def period(self):
+        return self.period_start.date().toPyDate(), self.period_end.date().addDays(1).toPyDate()
+
+    def update_base_dates(self):
+        custom = self.base_choice.currentText() == "Custom"
+        self.base_start.setEnabled(custom)
+        self.base_end.setEnabled(custom)
+        if custom:
+            return
+        start, end = self.period()
+        if start >= end:
+            return
+        if self.base_choice.currentText() == "Same period last year":
+            start, end = same_period_last_year(start, end)
+        else:
+            start, end = previous_period(start, end)
+        self.base_start.setDate(QDate(start.year, start.month, start.day))
+        self.base_end.setDate(QDate(end.year, end.month, end.day).addDays(-1))
+
+    @profiled("compare.load")
+    def compare(self):
+        if self.thread and self.thread.isRunning():
+            return
+        period = self.period()
+        base = self.base_start.date().toPyDate(), self.base_end.date().addDays(1).toPyDate()
+        if period[0] >= period[1] or base[0] >= base[1]:
+            QMessageBox.warning(self, "Invalid Range", "The start date must be before the end date.")
+            return
+
+        self.compare_button.setEnabled(False)
+        self.statusBar().showMessage("Comparing...")
+        self.periods_label.setText(
+            f"{period[0]} to {period[1] - timedelta(days=1)} against {base[0]} to {base[1] - timedelta(days=1)}"
+        )
+        self.thread = CompareLoaderThread(self.user_id, self.db_config, period, base)
+        self.thread.loaded.connect(self.on_compare_loaded)
+        self.thread.failed.connect(self.on_compare_failed)
+        self.thread.start()
+
+    @profiled("compare.show")
+    def on_compare_loaded(self, totals, products):
+        self.compare_button.setEnabled(True)
+        self.statusBar().clearMessage()
+
+        self.totals_table.setRowCount(len(METRICS))
+        for row, metric in enumerate(METRICS):
+            values = totals[metric]
+            shown = format_delta(metric, values["delta"]) if metric == "margin" else format_change(values["change"])
+            self.set_row(self.totals_table, row, [
+                METRIC_LABELS[metric],
+                format_metric(metric, values["period"]),
+                format_metric(metric, values["base"]),
+                shown
+            ])
+
+        self.products_table.setRowCount(len(products))
+        for row, product in enumerate(products):
+            self.set_row(self.products_table, row, [
+                product["productName"],
+                f"{product['period_units']} ({product['units_delta']:+})",
+                format_cents(product["period_revenue_cents"]),
+                format_cents(product["base_revenue_cents"]),
+                format_change(product["revenue_change"])
+            ])
+
+    def set_row(self, table, row, values):
+        for col, value in enumerate(values):
+            item = QTableWidgetItem(value)
+            item.setFlags(item.flags() & ~Qt.ItemFlag.ItemIsEditable)
+            table.setItem(row, col, item)
+
+    def on_compare_failed(self, error):
+        self.compare_button.setEnabled(True)
+        self.statusBar().clearMessage()
+        QMessageBox.critical(self, "Compare Error", error)
+
+
+class CompareLoaderThread(QThread):
+    loaded = pyqtSignal(dict, list)
+    failed = pyqtSignal(str)
+
+    def __init__(self, user_id, db_config, period, base):
+        super().__init__()
+        self.user_id = user_id
+        self.db_config = db_config
+        self.period = period
+        self.base = base
+
+    def run(self):
+        try:
+            totals, products = compare_periods(self.db_config, self.user_id, self.period, self.base)
+            self.loaded.emit(totals, products)
+        except Exception as e:
+            self.failed.emit(str(e))
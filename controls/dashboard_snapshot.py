@@ -0,0 +1,83 @@
+import calendar
+import json
+import os
+from datetime import date
+import mariadb
+from PyQt6.QtCore import QThread, pyqtSignal
+from db.replicas import reporting_config
+from db.statements import Statements
+
+#last dashboard data per user, painted right after login while the real data loads
+SNAPSHOT_DIR = os.path.join(os.path.expanduser("~"), ".dailysales")
+
+
+def snapshot_path(user_id):
+    return os.path.join(SNAPSHOT_DIR, f"dashboard_{user_id}.json")
+
+
+def load_snapshot(user_id):
+    try:
+        with open(snapshot_path(user_id), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def save_snapshot(user_id, data):
+    os.makedirs(SNAPSHOT_DIR, exist_ok=True)
+    path = snapshot_path(user_id)
+    #write then rename so a crash never leaves half a file
+    with open(path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(data, f)
+    os.replace(path + ".tmp", path)
+
+
+def data_version(statements, user_id):
+    row = statements.one("orders_version", (user_id,))
+    return f"{row.orders}:{row.lastOrderId}"
+
+
+def fetch_dashboard_data(db_config, user_id, today=None, known=None):
+    today = today or date.today()
+    year, month = today.year, today.month
+    days = calendar.monthrange(year, month)[1]
+    next_month = date(year + month // 12, month % 12 + 1, 1)
+
+    conn = mariadb.connect(**reporting_config(db_config, user_id))
+    try:
+        statements = Statements(conn)
+        version = data_version(statements, user_id)
+        #same orders and same month on screen: the GROUP BY queries would return what is already painted
+        if known and (known.get("version"), known.get("year"), known.get("month")) == (version, year, month):
+            statements.close()
+            return known
+
+        monthly = [0] * 12
+        for row in statements.all("orders_per_month", (user_id, date(year, 1, 1), date(year + 1, 1, 1))):
+            monthly[row.month - 1] = row.orders
+
+        daily = [0] * days
+        for row in statements.all("orders_per_day", (user_id, date(year, month, 1), next_month)):
+            daily[row.day - 1] = row.orders
+        statements.close()
+    finally:
+        conn.close()
+
+    return {"version": version, "year": year, "month": month, "monthly": monthly, "daily": daily}
+
+
+class DashboardLoaderThread(QThread):
+    loaded = pyqtSignal(dict)
+    failed = pyqtSignal(str)
+
+    def __init__(self, user_id, db_config, known=None):
+        super().__init__()
+        self.user_id = user_id
+        self.db_config = db_config
+        self.known = known
+
+    def run(self):
+        try:
+            self.loaded.emit(fetch_dashboard_data(self.db_config, self.user_id, known=self.known))
+        except Exception as e:
+            self.failed.emit(str(e))
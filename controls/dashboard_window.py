@@ -4,17 +4,24 @@ from PyQt6 import uic
 from controls.account_window import AccountWindow
 from main import LoginWindow
 from db.db_functions import Database
+from db.config import db_config as directory_config
 from controls.add_product import ProductMainWindow
 from controls.order import MakeOrderWindow
 from controls.sales_history import SalesHistoryWindow
+from controls.top_sellers_window import TopSellersWindow
+from controls.trends_window import TrendsWindow
+from controls.heatmap_window import HeatmapWindow
+from controls.events import bus
+from controls.change_feed import start_feed
+from controls.profiling import profiled
 
 #sa graph to lahat
-from PyQt6.QtCore import QDateTime, QTimer
-import matplotlib.pyplot as plt
-from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
-from datetime import datetime
+from PyQt6.QtCore import QDateTime, QTimer, QThread
+from controls.chart_widget import ChartWidget
+from controls.dashboard_snapshot import DashboardLoaderThread, load_snapshot, save_snapshot
+from db.inventory import take_snapshots_if_due
+from datetime import date
 import calendar
-import mariadb
 
 class DashboardWindow(QMainWindow):
     def __init__(self, user_data, db_config, parent=None):
@@ -43,9 +50,24 @@ class DashboardWindow(QMainWindow):
         self.timer.start(1000)
         self.update_date_time()
 
-        #display bar graph
-        self.load_monthly_orders_graph()
-        self.load_daily_orders_graph()
+        #display bar graph, paint the last snapshot right away then refresh in the background
+        self.monthly_graph = None
+        self.daily_graph = None
+        self.graph_loader = None
+        self.setup_graphs()
+        self.snapshot = load_snapshot(self.user_data["userId"])
+        if self.snapshot:
+            self.show_graph_data(self.snapshot)
+        self.reload_graphs()
+
+        #new orders bump the bars directly instead of re-running the queries
+        bus.order_committed.connect(self.on_order_committed)
+        #sales and product edits from other terminals come in through the same bus
+        start_feed(self.user_data["userId"], self.db_config)
+
+        #stock snapshots keep point-in-time stock queries short
+        self.stock_snapshot_thread = StockSnapshotThread(self.user_data["userId"], self.db_config)
+        self.stock_snapshot_thread.start()
 
     def update_date_time(self):
         current_datetime = QDateTime.currentDateTime().toString("yyyy-MM-dd HH:mm:ss")
@@ -57,12 +79,27 @@ class DashboardWindow(QMainWindow):
         elif choice == "Account":
             self.set_buttons_visible(False)
             self.check_login_for_account()
+        elif choice == "Top Sellers":
+            self.reset_choice()
+            self.check_login_for_top_sellers()
+        elif choice == "Trends":
+            self.reset_choice()
+            self.check_login_for_trends()
+        elif choice == "Heatmap":
+            self.reset_choice()
+            self.check_login_for_heatmap()
+
+    def reset_choice(self):
+        self.choices.blockSignals(True)
+        self.choices.setCurrentText("Dashboard")
+        self.choices.blockSignals(False)
 
     def set_buttons_visible(self, visible):
         self.productBtn.setVisible(visible)
         self.makeorderBtn.setVisible(visible)
         self.salesreportBtn.setVisible(visible)
 
+    @profiled("dashboard.open_products")
     def open_products_section(self):
         self.add_product = ProductMainWindow(
             user_id=self.user_data["userId"],
@@ -72,16 +109,17 @@ class DashboardWindow(QMainWindow):
         self.add_product.show()
         self.close()
 
+    @profiled("dashboard.open_order")
     def open_make_order_section(self):
         self.make_order_window = MakeOrderWindow(
             user_id=self.user_data["userId"],
             db_config=self.db_config,
-            dashboard_window=self,
-            reload_graphs_callback=self.reload_graphs
+            dashboard_window=self
         )
         self.make_order_window.show()
         self.close()
 
+    @profiled("dashboard.open_sales_history")
     def open_sales_report_section(self):
         self.sales_report_window = SalesHistoryWindow(
             user_id=self.user_data["userId"],
@@ -91,6 +129,27 @@ class DashboardWindow(QMainWindow):
         self.sales_report_window.show()
         self.close()
 
+    def open_top_sellers_section(self):
+        self.top_sellers_window = TopSellersWindow(
+            user_id=self.user_data["userId"],
+            db_config=self.db_config
+        )
+        self.top_sellers_window.show()
+
+    def open_trends_section(self):
+        self.trends_window = TrendsWindow(
+            user_id=self.user_data["userId"],
+            db_config=self.db_config
+        )
+        self.trends_window.show()
+
+    def open_heatmap_section(self):
+        self.heatmap_window = HeatmapWindow(
+            user_id=self.user_data["userId"],
+            db_config=self.db_config
+        )
+        self.heatmap_window.show()
+
     def check_login_for_account(self):
         if self.is_logged_in:
             self.redirect_to_account()
@@ -115,6 +174,24 @@ class DashboardWindow(QMainWindow):
         else:
             self.show_login_prompt("Sales Report")
 
+    def check_login_for_top_sellers(self):
+        if self.is_logged_in:
+            self.open_top_sellers_section()
+        else:
+            self.show_login_prompt("Top Sellers")
+
+    def check_login_for_trends(self):
+        if self.is_logged_in:
+            self.open_trends_section()
+        else:
+            self.show_login_prompt("Trends")
+
+    def check_login_for_heatmap(self):
+        if self.is_logged_in:
+            self.open_heatmap_section()
+        else:
+            self.show_login_prompt("Heatmap")
+
     def show_login_prompt(self, section):
         msg = QMessageBox(self)
         msg.setWindowTitle("Login Required")
@@ -132,7 +209,8 @@ class DashboardWindow(QMainWindow):
         self.close()
 
     def open_login_window(self):
-        self.login_window = LoginWindow(Database(self.db_config))
+        #logins always go through the directory, self.db_config is this user's shard
+        self.login_window = LoginWindow(Database(directory_config))
         self.login_window.show()
         self.close()
 
@@ -157,27 +235,30 @@ class DashboardWindow(QMainWindow):
         self.new_dashboard.show()
 
     def reload_graphs(self):
-        self.load_monthly_orders_graph()
-        self.load_daily_orders_graph()
-
-    def clear_widget_layout(self, widget):
-        old_layout = widget.layout()
-        if old_layout is not None:
-            while old_layout.count():
-                child = old_layout.takeAt(0)
-                if child.widget():
-                    child.widget().deleteLater()
-            QWidget().setLayout(old_layout)  # Trick to remove layout
-
-
-    def update_graphs_on_new_order(self):
-        self.load_monthly_orders_graph()
-        self.load_daily_orders_graph()
-        
-    def load_monthly_orders_graph(self):
-        graph_widget = self.findChild(QWidget, "monthlyOrdergraphWidget")
-        self.clear_widget_layout(graph_widget)
+        if self.graph_loader and self.graph_loader.isRunning():
+            return
+        self.graph_loader = DashboardLoaderThread(self.user_data["userId"], self.db_config, self.snapshot)
+        self.graph_loader.loaded.connect(self.on_graph_data_loaded)
+        self.graph_loader.failed.connect(lambda error: print("Error loading graphs:", error))
+        self.graph_loader.start()
+
+    def on_graph_data_loaded(self, data):
+        #only repaint and rewrite the snapshot when something changed
+        if data == self.snapshot:
+            return
+        self.show_graph_data(data)
+        self.snapshot = data
+        try:
+            save_snapshot(self.user_data["userId"], data)
+        except OSError as e:
+            print("Error saving dashboard snapshot:", e)
+
+    def setup_graphs(self):
+        self.monthly_chart = self.add_chart("monthlyOrdergraphWidget", self.on_month_clicked)
+        self.daily_chart = self.add_chart("graphorderwidget", self.on_day_clicked)
 
+    def add_chart(self, widget_name, on_click):
+        graph_widget = self.findChild(QWidget, widget_name)
         graph_widget.setStyleSheet("""
             QWidget {
                 border-radius: 15px;
@@ -185,127 +266,65 @@ class DashboardWindow(QMainWindow):
                 background-color: #ffffff;
             }
         """)
-
-        try:
-            conn = mariadb.connect(**self.db_config)
-            cursor = conn.cursor()
-
-            cursor.execute("""
-                SELECT MONTH(o.orderDateTime), COUNT(o.orderId)
-                FROM orders o
-                WHERE o.userId = ? AND YEAR(o.orderDateTime) = YEAR(CURRENT_DATE())
-                GROUP BY MONTH(o.orderDateTime)
-                ORDER BY MONTH(o.orderDateTime)
-            """, (self.user_data["userId"],))
-
-            results = cursor.fetchall()
-            orders_by_month = {month: 0 for month in range(1, 13)}
-            for month, total in results:
-                orders_by_month[month] = total
-
-            month_labels = [calendar.month_abbr[m] for m in range(1, 13)]
-            totals = [orders_by_month[m] for m in range(1, 13)]
-            current_year = datetime.now().year
-
-        except Exception as e:
-            print("Error loading graph:", e)
-            return
-        finally:
-            if conn:
-                cursor.close()
-                conn.close()
-        #inside ng graphs
-        fig, ax = plt.subplots()
-        bars = ax.bar(month_labels, totals, color='skyblue')
-        ax.set_title("Monthly Order Totals", fontsize=10)
-        ax.set_ylabel("Total Orders", fontsize=9)
-        ax.set_xticks(range(len(month_labels)))
-        ax.set_xticklabels(month_labels, fontsize=8)
-        ax.set_yticks(range(0, max(totals) + 20, 10))
-        ax.tick_params(axis='y', labelsize=8)
-        ax.grid(True, linestyle='--', alpha=0.5)
-
-        def on_click(event):
-            for i, bar in enumerate(bars):
-                if bar.contains(event)[0]:
-                    month_name = calendar.month_name[i + 1]
-                    total = totals[i]
-                    QMessageBox.information(self, "Total Orders",
-                        f"Total Orders for {month_name} {current_year}: {total}")
-                    break
-
-        fig.canvas.mpl_connect("button_press_event", on_click)
-        canvas = FigureCanvas(fig)
+        chart = ChartWidget()
+        chart.barClicked.connect(on_click)
         layout = QVBoxLayout()
-        layout.addWidget(canvas)
+        layout.addWidget(chart)
         graph_widget.setLayout(layout)
+        return chart
 
-    def load_daily_orders_graph(self):
-        graph_widget = self.findChild(QWidget, "graphorderwidget")
-        self.clear_widget_layout(graph_widget)
+    def show_graph_data(self, data):
+        today = date.today()
+        year, month = today.year, today.month
+        days = calendar.monthrange(year, month)[1]
 
-        graph_widget.setStyleSheet("""
-            QWidget {
-                border-radius: 15px;
-                border: 1px solid #ccc;
-                background-color: #ffffff;
-            }
-        """)
+        #a snapshot from an earlier month or year only counts for the part still on screen
+        monthly = list(data["monthly"]) if data["year"] == year else [0] * 12
+        if (data["year"], data["month"]) == (year, month):
+            daily = list(data["daily"])
+        else:
+            daily = [0] * days
 
-        try:
-            conn = mariadb.connect(**self.db_config)
-            cursor = conn.cursor()
-            current_date = datetime.now()
-            year = current_date.year
-            month = current_date.month
-            days = calendar.monthrange(year, month)[1]
-
-            cursor.execute("""
-                SELECT DAY(o.orderDateTime), COUNT(o.orderId)
-                FROM orders o
-                WHERE o.userId = ? AND MONTH(o.orderDateTime) = ? AND YEAR(o.orderDateTime) = ?
-                GROUP BY DAY(o.orderDateTime)
-                ORDER BY DAY(o.orderDateTime)
-            """, (self.user_data["userId"], month, year))
-
-            results = cursor.fetchall()
-            orders_by_day = {day: 0 for day in range(1, days + 1)}
-            for day, total in results:
-                orders_by_day[day] = total
-
-            day_labels = [str(d) for d in range(1, days + 1)]
-            totals = [orders_by_day[d] for d in range(1, days + 1)]
+        self.monthly_graph = {"year": year, "totals": monthly, "chart": self.monthly_chart}
+        self.monthly_chart.set_data([calendar.month_abbr[m] for m in range(1, 13)], monthly,
+                                    "Monthly Order Totals", "Total Orders")
 
-        except Exception as e:
-            print("Error loading daily graph:", e)
+        self.daily_graph = {"year": year, "month": month, "totals": daily, "chart": self.daily_chart}
+        self.daily_chart.set_data([str(d) for d in range(1, days + 1)], daily,
+                                  f"Daily Orders - {calendar.month_name[month]} {year}", "Total Orders")
+
+    def on_month_clicked(self, i):
+        QMessageBox.information(self, "Total Orders",
+            f"Total Orders for {calendar.month_name[i + 1]} {self.monthly_graph['year']}: {self.monthly_graph['totals'][i]}")
+
+    def on_day_clicked(self, i):
+        graph = self.daily_graph
+        QMessageBox.information(self, "Total Orders",
+            f"Total Orders for {calendar.month_name[graph['month']]} {i + 1}, {graph['year']}: {graph['totals'][i]}")
+
+    def on_order_committed(self, event):
+        if event.user_id != self.user_data["userId"]:
             return
-        finally:
-            if conn:
-                cursor.close()
-                conn.close()
-       #inside ng graphs
-        fig, ax = plt.subplots(figsize=(8, 2))
-        bars = ax.bar(day_labels, totals, color='skyblue')
-        ax.set_title(f"Daily Orders - {calendar.month_name[month]} {year}", fontsize=10)
-        ax.set_ylabel("Total Orders", fontsize=7)
-        ax.set_xlabel("Day", fontsize=6)
-        ax.set_xticks(range(len(day_labels)))
-        ax.set_xticklabels(day_labels, fontsize=6, rotation=45)
-        max_total = max(totals) if totals else 0
-        ax.set_yticks(range(0, max_total + 6, 5))
-        ax.tick_params(axis='y', labelsize=7)
-        ax.grid(True, linestyle='--', alpha=0.5)
-
-        def on_click(event):
-            for i, bar in enumerate(bars):
-                if bar.contains(event)[0]:
-                    QMessageBox.information(self, "Total Orders",
-                        f"Total Orders for {calendar.month_name[month]} {i + 1}, {year}: {totals[i]}")
-                    break
-
-        fig.canvas.mpl_connect("button_press_event", on_click)
-        fig.tight_layout()
-        canvas = FigureCanvas(fig)
-        layout = QVBoxLayout()
-        layout.addWidget(canvas)
-        graph_widget.setLayout(layout)
+        when = event.order_datetime
+        if self.monthly_graph and when.year == self.monthly_graph["year"]:
+            self.bump_graph_bar(self.monthly_graph, when.month - 1)
+        if self.daily_graph and (when.year, when.month) == (self.daily_graph["year"], self.daily_graph["month"]):
+            self.bump_graph_bar(self.daily_graph, when.day - 1)
+
+    def bump_graph_bar(self, graph, index):
+        totals = graph["totals"]
+        totals[index] += 1
+        graph["chart"].set_value(index, totals[index])
+
+
+class StockSnapshotThread(QThread):
+    def __init__(self, user_id, db_config):
+        super().__init__()
+        self.user_id = user_id
+        self.db_config = db_config
+
+    def run(self):
+        try:
+            take_snapshots_if_due(self.db_config, self.user_id)
+        except Exception as e:
+            print("Error taking stock snapshots:", e)
@@ -0,0 +1,63 @@
+from dataclasses import dataclass
+from datetime import datetime
+from PyQt6.QtCore import QObject, pyqtSignal
+
+#domain events, publish these instead of making every open view re-query
+
+@dataclass(frozen=True)
+class OrderLine:
+    product_id: int
+    product_name: str
+    quantity: int
+    total_cents: int
+    cost_cents: int
+
+
+@dataclass(frozen=True)
+class OrderCommitted:
+    user_id: int
+    order_id: int
+    order_datetime: datetime
+    total_cents: int
+    lines: tuple
+
+
+@dataclass(frozen=True)
+class StockChanged:
+    user_id: int
+    product_id: int
+    delta: int
+    stock: int = None  # new stock when the writer knows it, otherwise apply delta
+
+
+@dataclass(frozen=True)
+class ProductUpdated:
+    user_id: int
+    product_id: int
+    product_name: str = None
+    price_cents: int = None
+    purchase_price_cents: int = None
+    stock: int = None
+    removed: bool = False
+    created: bool = False
+    sku: str = None
+
+
+class EventBus(QObject):
+    order_committed = pyqtSignal(object)
+    stock_changed = pyqtSignal(object)
+    product_updated = pyqtSignal(object)
+
+    def publish(self, event):
+        if isinstance(event, OrderCommitted):
+            self.order_committed.emit(event)
+        elif isinstance(event, StockChanged):
+            self.stock_changed.emit(event)
+        elif isinstance(event, ProductUpdated):
+            self.product_updated.emit(event)
+        else:
+            raise TypeError(f"Unknown event type: {type(event).__name__}")
+
+
+#one bus per app, publish from the GUI thread
+bus = EventBus()
@@ -0,0 +1,106 @@
+from PyQt6.QtWidgets import QWidget, QToolTip
+from PyQt6.QtCore import Qt, QRectF
+from PyQt6.QtGui import QPainter, QColor, QFont
+from controls.chart_widget import GRID_COLOR, HOVER_COLOR, TEXT_COLOR
+
+LOW_COLOR = QColor(251, 243, 242)
+HIGH_COLOR = QColor(255, 87, 87)
+
+
+def blend(low, high, fraction):
+    return QColor(
+        round(low.red() + (high.red() - low.red()) * fraction),
+        round(low.green() + (high.green() - low.green()) * fraction),
+        round(low.blue() + (high.blue() - low.blue()) * fraction)
+    )
+
+
+class HeatmapWidget(QWidget):
+    #rows are weekdays, columns are hours; the darker the cell the busier that hour
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.row_labels = []
+        self.values = []
+        self.title = ""
+        self.hover_cell = None
+        self.value_format = lambda value: f"{value:,.0f}"
+        self.setMouseTracking(True)
+        self.setMinimumHeight(120)
+
+    def set_data(self, row_labels, values, title=""):
+        self.row_labels = list(row_labels)
+        self.values = [list(row) for row in values]
+        self.title = title
+        self.hover_cell = None
+        self.update()
+
+    def grid_rect(self):
+        return QRectF(40, 24, max(self.width() - 40 - 12, 1), max(self.height() - 24 - 22, 1))
+
+    def cell_at(self, x, y):
+        if not self.values:
+            return None
+        grid = self.grid_rect()
+        if not grid.contains(x, y):
+            return None
+        columns = len(self.values[0])
+        row = min(int((y - grid.top()) / (grid.height() / len(self.values))), len(self.values) - 1)
+        column = min(int((x - grid.left()) / (grid.width() / columns)), columns - 1)
+        return row, column
+
+    def paintEvent(self, event):
+        painter = QPainter(self)
+        painter.fillRect(self.rect(), Qt.GlobalColor.white)
+        grid = self.grid_rect()
+
+        small_font = QFont(self.font())
+        small_font.setPointSize(7)
+        title_font = QFont(self.font())
+        title_font.setPointSize(9)
+
+        painter.setFont(title_font)
+        painter.setPen(TEXT_COLOR)
+        painter.drawText(QRectF(0, 2, self.width(), 20), Qt.AlignmentFlag.AlignCenter, self.title)
+        if not self.values:
+            painter.end()
+            return
+
+        rows, columns = len(self.values), len(self.values[0])
+        cell_width, cell_height = grid.width() / columns, grid.height() / rows
+        top = max(max(row) for row in self.values) or 1
+
+        painter.setFont(small_font)
+        for r, row in enumerate(self.values):
+            y = grid.top() + r * cell_height
+            painter.setPen(TEXT_COLOR)
+            painter.drawText(QRectF(0, y, grid.left() - 4, cell_height),
+                             Qt.AlignmentFlag.AlignRight | Qt.AlignmentFlag.AlignVCenter, self.row_labels[r])
+            for c, value in enumerate(row):
+                cell = QRectF(grid.left() + c * cell_width, y, cell_width, cell_height)
+                painter.fillRect(cell, blend(LOW_COLOR, HIGH_COLOR, value / top))
+                painter.setPen(HOVER_COLOR if (r, c) == self.hover_cell else GRID_COLOR)
+                painter.drawRect(cell)
+
+        painter.setPen(TEXT_COLOR)
+        #label every hour when there is room, otherwise every third
+        every = 1 if cell_width >= 18 else 3
+        for c in range(0, columns, every):
+            painter.drawText(QRectF(grid.left() + c * cell_width, grid.bottom() + 4, cell_width * every, 14),
+                             Qt.AlignmentFlag.AlignLeft, f"{c:02d}")
+        painter.end()
+
+    def mouseMoveEvent(self, event):
+        cell = self.cell_at(event.position().x(), event.position().y())
+        if cell != self.hover_cell:
+            self.hover_cell = cell
+            self.update()
+        if cell is not None:
+            r, c = cell
+            QToolTip.showText(event.globalPosition().toPoint(),
+                              f"{self.row_labels[r]} {c:02d}:00-{c:02d}:59: {self.value_format(self.values[r][c])}", self)
+        else:
+            QToolTip.hideText()
+
+    def leaveEvent(self, event):
+        self.hover_cell = None
+        self.update()
@@ -0,0 +1,108 @@
+from PyQt6 import uic
+from PyQt6.QtWidgets import (
+    QMainWindow, QPushButton, QMessageBox, QLabel, QComboBox, QDateEdit, QWidget, QVBoxLayout
+)
+from PyQt6.QtCore import QDate, QThread, pyqtSignal
+from controls.heatmap_widget import HeatmapWidget
+from controls.profiling import profiled
+from reports.heatmap import WEEKDAYS, load_heatmap
+from reports.money import format_cents
+
+class HeatmapWindow(QMainWindow):
+    def __init__(self, user_id, db_config):
+        super().__init__()
+        uic.loadUi("ui/heatmap.ui", self)
+        self.user_id = user_id
+        self.db_config = db_config
+        self.thread = None
+        self.orders = None
+        self.revenue_cents = None
+
+        self.start_date = self.findChild(QDateEdit, "startDate")
+        self.end_date = self.findChild(QDateEdit, "endDate")
+        self.metric_choice = self.findChild(QComboBox, "metricChoice")
+        self.load_button = self.findChild(QPushButton, "loadButton")
+        self.back_button = self.findChild(QPushButton, "backButton")
+        self.summary_label = self.findChild(QLabel, "summaryLabel")
+        self.chart_widget = self.findChild(QWidget, "chartWidget")
+
+        self.heatmap = HeatmapWidget()
+        layout = QVBoxLayout()
+        layout.addWidget(self.heatmap)
+        self.chart_widget.setLayout(layout)
+
+        today = QDate.currentDate()
+        self.start_date.setDate(today.addMonths(-3))
+        self.end_date.setDate(today)
+
+        self.load_button.clicked.connect(self.load_heatmap)
+        self.metric_choice.currentTextChanged.connect(self.draw_heatmap)
+        self.back_button.clicked.connect(self.close)
+
+        self.load_heatmap()
+
+    @profiled("heatmap.load")
+    def load_heatmap(self):
+        if self.thread and self.thread.isRunning():
+            return
+        start = self.start_date.date().toPyDate()
+        end = self.end_date.date().addDays(1).toPyDate()
+        if start >= end:
+            QMessageBox.warning(self, "Invalid Range", "The start date must be before the end date.")
+            return
+
+        self.load_button.setEnabled(False)
+        self.statusBar().showMessage("Loading heatmap...")
+        self.thread = HeatmapLoaderThread(self.user_id, self.db_config, start, end)
+        self.thread.loaded.connect(self.on_heatmap_loaded)
+        self.thread.failed.connect(self.on_heatmap_failed)
+        self.thread.start()
+
+    def on_heatmap_loaded(self, orders, revenue_cents):
+        self.load_button.setEnabled(True)
+        self.statusBar().clearMessage()
+        self.orders = orders
+        self.revenue_cents = revenue_cents
+        self.draw_heatmap()
+
+    def on_heatmap_failed(self, error):
+        self.load_button.setEnabled(True)
+        self.statusBar().clearMessage()
+        QMessageBox.critical(self, "Heatmap Error", error)
+
+    def draw_heatmap(self):
+        if self.orders is None:
+            return
+        revenue = self.metric_choice.currentText() == "Revenue"
+        grid = self.revenue_cents if revenue else self.orders
+        self.heatmap.value_format = format_cents if revenue else (lambda value: f"{value:,} orders")
+        self.heatmap.set_data(WEEKDAYS, grid, f"{self.metric_choice.currentText()} by weekday and hour")
+
+        #the busiest hour is what staffing is planned around
+        weekday, hour = max(((d, h) for d in range(len(WEEKDAYS)) for h in range(24)), key=lambda cell: grid[cell[0]][cell[1]])
+        if grid[weekday][hour]:
+            self.summary_label.setText(
+                f"Busiest: {WEEKDAYS[weekday]} {hour:02d}:00-{hour:02d}:59, "
+                f"{self.orders[weekday][hour]:,} orders, {format_cents(self.revenue_cents[weekday][hour])} revenue."
+            )
+        else:
+            self.summary_label.setText("No orders in this range.")
+
+
+class HeatmapLoaderThread(QThread):
+    loaded = pyqtSignal(list, list)
+    failed = pyqtSignal(str)
+
+    def __init__(self, user_id, db_config, start, end):
+        super().__init__()
+        self.user_id = user_id
+        self.db_config = db_config
+        self.start_date = start
+        self.end_date = end
+
+    def run(self):
+        try:
+            orders, revenue_cents = load_heatmap(self.db_config, self.user_id, self.start_date, self.end_date)
+            self.loaded.emit(orders, revenue_cents)
+        except Exception as e:
+            self.failed.emit(str(e))
@@ -1,16 +1,28 @@
 from PyQt6.QtWidgets import (
     QMainWindow, QApplication, QLineEdit, QTableWidget, QTableWidgetItem,
-    QPushButton, QMessageBox, QLabel, QSpinBox
+    QPushButton, QMessageBox, QLabel, QSpinBox, QInputDialog
 )
-from PyQt6.QtCore import Qt
+from PyQt6.QtCore import Qt, QThread, pyqtSignal
+from functools import partial
 from decimal import Decimal, InvalidOperation
 import mariadb
 import sys
 from PyQt6 import uic
+from db.changes import record_changes
 from db.config import db_config
+from db.hourly import record_order_hour
+from db.inventory import record_movement
+from db.replicas import note_write
+from db.statements import Statements
+from db.velocity import record_sale
+from controls.cart import Cart
+from controls.events import bus, OrderCommitted, OrderLine, StockChanged
+from controls.profiling import profiled
+from reports.money import format_cents, to_cents
 
 class MakeOrderWindow(QMainWindow):
-    def __init__(self, user_id, db_config, dashboard_window, reload_graphs_callback):
+    @profiled("order.open")
+    def __init__(self, user_id, db_config, dashboard_window):
         super().__init__()
         uic.loadUi("ui/order.ui", self)
 
@@ -18,6 +30,10 @@ class MakeOrderWindow(QMainWindow):
         self.db_config = db_config
         self.dashboard_window = dashboard_window
         self.low_payment_warned = False
+        self.pending_orders = []  #checkout threads still committing
+        self.reserved_stock = {}  #productId -> qty held by pending orders
+        self.cart = Cart()
+        self.parked_carts = []  #(cart, payment text) put aside for later
 
         self.order_table = self.findChild(QTableWidget, "orderTable")
         self.total_label = self.findChild(QLabel, "totalAmountEdit")
@@ -25,80 +41,171 @@ class MakeOrderWindow(QMainWindow):
         self.change_label = self.findChild(QLabel, "changeEdit")
         self.confirm_button = self.findChild(QPushButton, "addButton")
         self.cancel_button = self.findChild(QPushButton, "cancelButton")
+        self.park_button = self.findChild(QPushButton, "parkButton")
+        self.resume_button = self.findChild(QPushButton, "resumeButton")
 
         self.order_table.setColumnCount(4)
         self.order_table.setHorizontalHeaderLabels(["Product Name", "Price", "Stock", "Quantity"])
         self.product_data = {}  #maps row index to product info
+        self.product_rows = {}  #maps productId to row index
+        self.catalog = {}  #productId -> product info, shared with product_data
+        self.sku_index = {}  #sku -> productId, so a scan never waits for the database
+        self.sku_lookups = []  #threads looking up codes missing from sku_index
 
         self.populate_product_table()
 
         self.payment_edit.textChanged.connect(self.calculate_change)
         self.confirm_button.clicked.connect(self.process_order)
         self.cancel_button.clicked.connect(self.cancel_order)
+        self.park_button.clicked.connect(self.park_cart)
+        self.resume_button.clicked.connect(self.resume_cart)
+        self.update_park_buttons()
+
+        #apply changes from other windows without reloading the table
+        bus.stock_changed.connect(self.on_stock_changed)
+        bus.product_updated.connect(self.on_product_updated)
 
-        self.reload_graphs_callback = reload_graphs_callback #callback to  sa update ng orders in graphs
         #searchproducts
         self.search_edit = self.findChild(QLineEdit, "searchEdit")
         self.search_edit.setClearButtonEnabled(True)#auto x
         self.search_edit.textChanged.connect(self.filter_product_table)
 
+        #scanners type the code and press enter
+        self.scan_edit = self.findChild(QLineEdit, "scanEdit")
+        self.scan_edit.returnPressed.connect(self.on_scan)
+        self.scan_edit.setFocus()
+
 
 
     def populate_product_table(self, search_text=""):
         try:
             conn = mariadb.connect(**self.db_config)
-            cursor = conn.cursor()
-            cursor.execute(
-    "SELECT productId, productName, price, stock FROM products WHERE userId = ? AND productName LIKE ?",
-    (self.user_id, f"%{search_text}%")
-)
-
-            products = cursor.fetchall()
+            products = Statements(conn).all("products_like", (self.user_id, f"%{search_text}%"))
 
             self.order_table.setRowCount(0)
             self.product_data.clear()
+            self.product_rows.clear()
+            if not search_text:
+                #the full list is loaded, rebuild the scan lookup from it
+                self.catalog.clear()
+                self.sku_index.clear()
 
-            for row, (product_id, name, price, stock) in enumerate(products):
-                self.order_table.insertRow(row)
-                self.product_data[row] = {"productId": product_id, "price": Decimal(str(price)), "stock": stock}
-
-                for col, value in enumerate([name, f"{price:.2f}", stock]):
-                    item = QTableWidgetItem(str(value))
-                    item.setFlags(item.flags() & ~Qt.ItemFlag.ItemIsEditable)
-                    self.order_table.setItem(row, col, item)
-
-                spin_box = QSpinBox()
-                spin_box.setRange(0, stock)
-                spin_box.valueChanged.connect(self.calculate_total)
-                self.order_table.setCellWidget(row, 3, spin_box)
+            for product_id, name, price, stock, purchase_price, sku in products:
+                self.add_product_row(product_id, name, price, purchase_price, stock, sku)
 
-            self.calculate_total()
+            self.update_total_labels()
         except Exception as e:
             QMessageBox.critical(self, "Error loading products", str(e))
         finally:
             if 'conn' in locals() and conn:
-                cursor.close()
                 conn.close()
 
-    def calculate_total(self):
-        total = Decimal("0.00")
-        for row in range(self.order_table.rowCount()):
-            try:
-                quantity = self.order_table.cellWidget(row, 3).value()
-                price = self.product_data[row]["price"]
-                total += price * quantity
-            except Exception:
-                continue
-
-        self.total_label.setText(f"Total: {total:.2f}")
+    def remember_product(self, product_id, name, price, purchase_price, stock, sku=None):
+        #stock is what the database has, pending orders are subtracted for display
+        product_info = self.catalog.setdefault(product_id, {"productId": product_id, "sku": None})
+        product_info.update(name=name, price=to_cents(price), cost=to_cents(purchase_price), stock=stock)
+        if sku:
+            product_info["sku"] = sku
+            self.sku_index[sku] = product_id
+        return product_info
+
+    def forget_product(self, product_id):
+        product_info = self.catalog.pop(product_id, None)
+        if product_info and product_info["sku"]:
+            self.sku_index.pop(product_info["sku"], None)
+
+    def add_product_row(self, product_id, name, price, purchase_price, stock, sku=None):
+        row = self.order_table.rowCount()
+        self.order_table.insertRow(row)
+        self.product_data[row] = self.remember_product(product_id, name, price, purchase_price, stock, sku)
+        self.product_rows[product_id] = row
+
+        for col, value in enumerate([name, format_cents(self.product_data[row]["price"]), stock]):
+            item = QTableWidgetItem(str(value))
+            item.setFlags(item.flags() & ~Qt.ItemFlag.ItemIsEditable)
+            self.order_table.setItem(row, col, item)
+
+        spin_box = QSpinBox()
+        self.order_table.setCellWidget(row, 3, spin_box)
+        self.update_stock_cell(product_id)
+        #the table is rebuilt on search, show what is already in the cart
+        self.show_cart_quantity(product_id)
+        spin_box.valueChanged.connect(partial(self.on_quantity_changed, product_id))
+
+    def update_stock_cell(self, product_id):
+        row = self.product_rows.get(product_id)
+        if row is None:
+            return
+        available = max(self.product_data[row]["stock"] - self.reserved_stock.get(product_id, 0), 0)
+        self.order_table.item(row, 2).setText(str(available))
+        self.order_table.cellWidget(row, 3).setMaximum(available)
+
+    @profiled("order.scan")
+    def on_scan(self):
+        sku = self.scan_edit.text().strip()
+        self.scan_edit.clear()
+        if not sku:
+            return
+        product_id = self.sku_index.get(sku)
+        if product_id is not None:
+            self.add_scanned_product(product_id)
+            return
+
+        #not loaded yet (added elsewhere), ask the sku index without blocking the next scan
+        thread = SkuLookupThread(self.user_id, self.db_config, sku)
+        thread.found.connect(self.on_sku_found)
+        thread.finished.connect(partial(self.sku_lookups.remove, thread))
+        self.sku_lookups.append(thread)
+        thread.start()
+
+    def on_sku_found(self, sku, product):
+        if product is None:
+            self.statusBar().showMessage(f"Unknown SKU / barcode: {sku}", 5000)
+            QApplication.beep()
+            return
+        product_id, name, price, stock, purchase_price = product
+        self.remember_product(product_id, name, price, purchase_price, stock, sku)
+        self.add_scanned_product(product_id)
+
+    def add_scanned_product(self, product_id):
+        product_info = self.catalog[product_id]
+        quantity = self.cart.quantity(product_id) + 1
+        available = product_info["stock"] - self.reserved_stock.get(product_id, 0)
+        if quantity > available:
+            self.statusBar().showMessage(f"No more stock left for {product_info['name']}.", 5000)
+            QApplication.beep()
+            return
+        self.cart.set_quantity(product_id, product_info["name"], product_info["price"], product_info["cost"], quantity)
+        self.show_cart_quantity(product_id)
+        self.update_total_labels()
+        self.statusBar().showMessage(f"{product_info['name']} x{quantity}", 3000)
+
+    def on_quantity_changed(self, product_id, quantity):
+        product_info = self.product_data[self.product_rows[product_id]]
+        self.cart.set_quantity(product_id, product_info["name"], product_info["price"], product_info["cost"], quantity)
+        self.update_total_labels()
+
+    def show_cart_quantity(self, product_id):
+        row = self.product_rows.get(product_id)
+        if row is None:
+            return
+        spin_box = self.order_table.cellWidget(row, 3)
+        spin_box.blockSignals(True)
+        spin_box.setValue(self.cart.quantity(product_id))
+        spin_box.blockSignals(False)
+        #the spin box clamps to the stock left, keep the cart in line with it
+        if spin_box.value() != self.cart.quantity(product_id):
+            self.on_quantity_changed(product_id, spin_box.value())
+
+    def update_total_labels(self):
+        self.total_label.setText(f"Total: {format_cents(self.cart.total_cents)}")
         self.calculate_change()
 
+    @profiled("order.payment")
     def calculate_change(self):
         try:
-            total = Decimal(self.total_label.text().replace("Total: ", ""))
-            payment = Decimal(self.payment_edit.text())
-            change = payment - total
-            self.change_label.setText(f"Change: {change:.2f}")
+            change = self.cart.change_cents(to_cents(self.payment_edit.text()))
+            self.change_label.setText(f"Change: {format_cents(change)}")
 
             if change < 0 and not self.low_payment_warned:
                 QMessageBox.warning(self, "Insufficient Payment", "Please enter enough money for this order.")
@@ -109,86 +216,304 @@ class MakeOrderWindow(QMainWindow):
             self.change_label.setText("")
             self.low_payment_warned = False
 
+    @profiled("order.checkout")
     def process_order(self):
+        if not self.cart:
+            QMessageBox.warning(self, "No Products Selected", "Please select at least one product.")
+            return
+
         try:
-            total_price = Decimal("0.00")
-            order_details = []
-
-            for row in range(self.order_table.rowCount()):
-                quantity = self.order_table.cellWidget(row, 3).value()
-                if quantity > 0:
-                    product_info = self.product_data[row]
-                    product_id = product_info["productId"]
-                    price = product_info["price"]
-                    total = price * quantity
-                    total_price += total
-                    order_details.append((product_id, quantity, total))
-
-            if not order_details:
-                QMessageBox.warning(self, "No Products Selected", "Please select at least one product.")
+            payment = Decimal(self.payment_edit.text())
+            if self.cart.change_cents(to_cents(payment)) < 0:
+                QMessageBox.warning(self, "Insufficient Payment", "Payment must be at least equal to total.")
                 return
-
-            try:
-                payment = Decimal(self.payment_edit.text())
-                if payment < total_price:
-                    QMessageBox.warning(self, "Insufficient Payment", "Payment must be at least equal to total.")
-                    return
-            except (InvalidOperation, ValueError):
-                QMessageBox.warning(self, "Invalid Payment", "Please enter a valid numeric payment amount.")
+        except (InvalidOperation, ValueError):
+            QMessageBox.warning(self, "Invalid Payment", "Please enter a valid numeric payment amount.")
+            return
+
+        #lock the basket, the commit runs on its own thread
+        basket = {
+            "lines": self.cart.checkout_lines(),
+            "names": {product_id: line.name for product_id, line in self.cart.lines.items()},
+            "total": Decimal(self.cart.total_cents).scaleb(-2),
+            "payment": payment
+        }
+        for product_id, quantity, *_ in basket["lines"]:
+            self.reserved_stock[product_id] = self.reserved_stock.get(product_id, 0) + quantity
+            self.update_stock_cell(product_id)
+
+        #open the next cart right away
+        self.clear_cart()
+
+        thread = CheckoutThread(self.user_id, self.db_config, basket)
+        thread.committed.connect(self.on_order_committed)
+        thread.failed.connect(self.on_order_failed)
+        thread.finished.connect(partial(self.on_checkout_finished, thread))
+        self.pending_orders.append(thread)
+        self.update_pending_indicator()
+        thread.start()
+
+    def clear_cart(self):
+        product_ids = list(self.cart.lines)
+        self.cart.clear()
+        for product_id in product_ids:
+            self.show_cart_quantity(product_id)
+        self.payment_edit.clear()
+        self.update_total_labels()
+        self.change_label.setText("Change: 0.00")
+
+    def load_cart(self, cart, payment_text):
+        #a parked cart may ask for more than is left now, keep what is available
+        for product_id, line in list(cart.lines.items()):
+            row = self.product_rows.get(product_id)
+            if row is not None:
+                available = self.order_table.cellWidget(row, 3).maximum()
+                if line.quantity > available:
+                    cart.set_quantity(product_id, line.name, line.price_cents, line.cost_cents, available)
+        self.cart = cart
+        for product_id in cart.lines:
+            self.show_cart_quantity(product_id)
+        self.payment_edit.setText(payment_text)
+        self.update_total_labels()
+
+    @profiled("order.park")
+    def park_cart(self):
+        if not self.cart:
+            QMessageBox.warning(self, "Empty Cart", "There is nothing to park.")
+            return
+        parked = self.cart
+        payment_text = self.payment_edit.text()
+        self.clear_cart()
+        self.parked_carts.append((parked, payment_text))
+        self.update_park_buttons()
+        self.statusBar().showMessage(f"Cart parked ({len(self.parked_carts)} waiting).", 5000)
+
+    @profiled("order.resume")
+    def resume_cart(self):
+        if not self.parked_carts:
+            return
+        labels = [
+            f"#{i + 1}: {len(cart)} item(s), {cart.units} unit(s), total {format_cents(cart.total_cents)}"
+            for i, (cart, _) in enumerate(self.parked_carts)
+        ]
+        choice = 0
+        if len(labels) > 1:
+            label, ok = QInputDialog.getItem(self, "Resume Cart", "Parked carts:", labels, 0, False)
+            if not ok:
                 return
+            choice = labels.index(label)
+
+        cart, payment_text = self.parked_carts.pop(choice)
+        #whatever is in progress takes the resumed cart's place
+        if self.cart:
+            self.parked_carts.append((self.cart, self.payment_edit.text()))
+            self.clear_cart()
+        self.load_cart(cart, payment_text)
+        self.update_park_buttons()
+
+    def update_park_buttons(self):
+        self.resume_button.setEnabled(bool(self.parked_carts))
+        self.resume_button.setText(f"Resume ({len(self.parked_carts)})" if self.parked_carts else "Resume")
+
+    def release_reserved_stock(self, basket):
+        for product_id, quantity, *_ in basket["lines"]:
+            remaining = self.reserved_stock.get(product_id, 0) - quantity
+            if remaining > 0:
+                self.reserved_stock[product_id] = remaining
+            else:
+                self.reserved_stock.pop(product_id, None)
+
+    def on_order_committed(self, order_id, order_datetime, basket):
+        self.release_reserved_stock(basket)
+        self.statusBar().showMessage(f"Order #{order_id} saved.", 5000)
+
+        lines = tuple(
+            OrderLine(product_id, basket["names"][product_id], quantity, to_cents(total), to_cents(unit_cost) * quantity)
+            for product_id, quantity, total, unit_price, unit_cost in basket["lines"]
+        )
+        bus.publish(OrderCommitted(self.user_id, order_id, order_datetime, to_cents(basket["total"]), lines))
+        for line in lines:
+            bus.publish(StockChanged(self.user_id, line.product_id, -line.quantity))
+
+    def on_order_failed(self, error, basket):
+        self.release_reserved_stock(basket)
+        for product_id, *_ in basket["lines"]:
+            self.update_stock_cell(product_id)
+
+        #the failed basket comes back as a cart of its own, never mixed into the one being rung up
+        failed = Cart()
+        for product_id, quantity, total, unit_price, unit_cost in basket["lines"]:
+            failed.set_quantity(product_id, basket["names"][product_id], to_cents(unit_price), to_cents(unit_cost), quantity)
+        payment_text = f"{basket['payment']:.2f}"
+        if self.cart:
+            self.parked_carts.append((failed, payment_text))
+            self.update_park_buttons()
+            restored = "The basket has been parked, use Resume to try it again."
+        else:
+            self.load_cart(failed, payment_text)
+            restored = "The basket has been restored so you can try again."
+
+        QMessageBox.critical(self, "Order Error", f"The order could not be saved: {error}\n{restored}")
+
+    def on_checkout_finished(self, thread):
+        if thread in self.pending_orders:
+            self.pending_orders.remove(thread)
+        self.update_pending_indicator()
+
+    def update_pending_indicator(self):
+        pending = len(self.pending_orders)
+        if pending:
+            self.statusBar().showMessage(f"Saving {pending} order(s)...")
+        elif self.statusBar().currentMessage().startswith("Saving"):
+            self.statusBar().clearMessage()
+
+    def on_stock_changed(self, event):
+        product_info = self.catalog.get(event.product_id)
+        if event.user_id != self.user_id or product_info is None:
+            return
+        product_info["stock"] = event.stock if event.stock is not None else product_info["stock"] + event.delta
+        self.update_stock_cell(event.product_id)
+
+    def on_product_updated(self, event):
+        if event.user_id != self.user_id:
+            return
+        row = self.product_rows.get(event.product_id)
+        if row is None:
+            if event.removed:
+                self.forget_product(event.product_id)
+                self.cart.remove(event.product_id)
+                self.update_total_labels()
+            elif event.created:
+                product = (event.product_id, event.product_name, Decimal(event.price_cents) / 100,
+                           Decimal(event.purchase_price_cents or 0) / 100, event.stock, event.sku)
+                search_text = self.search_edit.text().strip().lower()
+                if search_text in event.product_name.lower():
+                    self.add_product_row(*product)
+                else:
+                    self.remember_product(*product)
+            else:
+                self.apply_product_update(self.catalog.get(event.product_id), event)
+            return
+
+        product_info = self.product_data[row]
+        if event.removed:
+            #keep the row so row indexes stay valid, just make it unsellable
+            product_info["stock"] = 0
+            self.order_table.item(row, 0).setText(f"{product_info['name']} (removed)")
+            self.cart.remove(event.product_id)
+            self.show_cart_quantity(event.product_id)
+            self.update_stock_cell(event.product_id)
+            self.update_total_labels()
+            if product_info["sku"]:
+                self.sku_index.pop(product_info["sku"], None)
+            return
+        self.apply_product_update(product_info, event)
+        if event.product_name is not None:
+            self.order_table.item(row, 0).setText(event.product_name)
+        if event.price_cents is not None:
+            self.order_table.item(row, 1).setText(format_cents(event.price_cents))
+
+    def apply_product_update(self, product_info, event):
+        if product_info is None:
+            return
+        if event.product_name is not None:
+            product_info["name"] = event.product_name
+            if event.product_id in self.cart.lines:
+                self.cart.lines[event.product_id].name = event.product_name
+        if event.price_cents is not None:
+            product_info["price"] = event.price_cents
+            self.cart.set_price(event.product_id, event.price_cents)
+            self.update_total_labels()
+        if event.purchase_price_cents is not None:
+            product_info["cost"] = event.purchase_price_cents
+        if event.stock is not None:
+            product_info["stock"] = event.stock
+            self.update_stock_cell(event.product_id)
+
+    @profiled("order.cancel")
+    def cancel_order(self):
+        self.close()
+        self.dashboard_window.show()
+
+    @profiled("order.search")
+    def filter_product_table(self):
+        search_text = self.search_edit.text().strip()
+        self.populate_product_table(search_text)
+
+class SkuLookupThread(QThread):
+    found = pyqtSignal(str, object)
+
+    def __init__(self, user_id, db_config, sku):
+        super().__init__()
+        self.user_id = user_id
+        self.db_config = db_config
+        self.sku = sku
 
+    def run(self):
+        conn = None
+        product = None
+        try:
+            conn = mariadb.connect(**self.db_config)
+            #served by the unique (userId, sku) index
+            product = Statements(conn).one("product_by_sku", (self.user_id, self.sku))
+        except Exception as e:
+            print("Error looking up SKU:", e)
+        finally:
+            if conn:
+                conn.close()
+            self.found.emit(self.sku, product)
+
+class CheckoutThread(QThread):
+    committed = pyqtSignal(int, object, object)
+    failed = pyqtSignal(str, object)
+
+    def __init__(self, user_id, db_config, basket):
+        super().__init__()
+        self.user_id = user_id
+        self.db_config = db_config
+        self.basket = basket
+
+    def run(self):
+        conn = None
+        try:
             conn = mariadb.connect(**self.db_config)
-            cursor = conn.cursor()
+            #the per line statements are prepared once and re-run for every line
+            statements = Statements(conn)
+            payment = self.basket["payment"]
+            total_price = self.basket["total"]
 
-            cursor.execute("""
-                INSERT INTO orders (userId, totalPrice, totalMoney, changeAmount, orderDateTime)
-                VALUES (?, ?, ?, ?, NOW())
-            """, (
+            order_id = statements.execute("insert_order", (
                 self.user_id,
                 total_price,
                 payment,
                 payment - total_price
-            ))
+            )).lastrowid
 
-            order_id = cursor.lastrowid
+            for product_id, quantity, total, unit_price, unit_cost in self.basket["lines"]:
+                statements.execute("insert_order_line", (order_id, product_id, quantity, unit_price, unit_cost, total))
 
-            for product_id, quantity, total in order_details:
-                cursor.execute("""
-                    INSERT INTO order_details (orderId, productId, quantity, totalPrice)
-                    VALUES (?, ?, ?, ?)
-                """, (order_id, product_id, quantity, total))
+                if statements.execute("take_stock", (quantity, product_id, quantity)).rowcount == 0:
+                    raise ValueError(f"Not enough stock left for product #{product_id}.")
 
-                cursor.execute("""
-                    UPDATE products
-                    SET stock = stock - ?
-                    WHERE productId = ?
-                """, (quantity, product_id))
+                record_movement(statements.cursor("record_movement"), self.user_id, product_id, -quantity, "sale", order_id)
+                record_sale(statements.cursor("record_sale"), self.user_id, product_id, quantity)
 
-            conn.commit()
-            QMessageBox.information(self, "Order Success", "Order has been processed successfully.")
-            self.populate_product_table()
-            self.payment_edit.clear()
-            self.change_label.setText("Change: 0.00")
-            
-            if self.reload_graphs_callback:
-                self.reload_graphs_callback()    
+            order_datetime = statements.one("order_datetime", (order_id,)).orderDateTime
+            record_order_hour(statements.cursor("record_hour"), self.user_id, order_datetime, total_price)
+            record_changes(statements.cursor("record_change"), self.user_id,
+                           [("order", order_id)] + [("product", line[0]) for line in self.basket["lines"]])
 
+            conn.commit()
+            note_write(self.user_id)
+            self.committed.emit(order_id, order_datetime, self.basket)
         except Exception as e:
-            QMessageBox.critical(self, "Order Error", str(e))
+            if conn:
+                conn.rollback()
+            self.failed.emit(str(e), self.basket)
         finally:
-            self.dashboard_window.update_graphs_on_new_order()
-            if 'conn' in locals() and conn:
-                cursor.close()
+            if conn:
                 conn.close()
 
-    def cancel_order(self):
-        self.close()
-        self.dashboard_window.show()
-
-    def filter_product_table(self):
-        search_text = self.search_edit.text().strip()
-        self.populate_product_table(search_text)
-
 if __name__ == "__main__":
     app = QApplication(sys.argv)
     from dashboard_window import DashboardWindow
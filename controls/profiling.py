@@ -0,0 +1,163 @@
+import argparse
+import cProfile
+import functools
+import inspect
+import json
+import os
+import pstats
+import sys
+import time
+from datetime import datetime
+
+from db.config import profiling_config
+
+INDEX_FILE = "index.json"
+
+
+def profiling_enabled():
+    value = os.environ.get("DAILYSALES_PROFILE")
+    if value is not None:
+        return value.strip().lower() not in ("", "0", "false", "no", "off")
+    return bool(profiling_config["enabled"])
+
+
+#read once at startup, a disabled build gets the undecorated functions back
+ENABLED = profiling_enabled()
+#only the outermost action is profiled, cProfile cannot nest
+active = False
+
+
+def positional_limit(func):
+    #Qt passes every signal argument (clicked sends `checked`), drop the ones the slot does not take
+    parameters = inspect.signature(func).parameters.values()
+    if any(p.kind == p.VAR_POSITIONAL for p in parameters):
+        return None
+    return sum(p.kind in (p.POSITIONAL_ONLY, p.POSITIONAL_OR_KEYWORD) for p in parameters)
+
+
+def profiled(name):
+    def decorate(func):
+        if not ENABLED:
+            return func
+        limit = positional_limit(func)
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            global active
+            if limit is not None:
+                args = args[:limit]
+            if active:
+                return func(*args, **kwargs)
+            active = True
+            profile = cProfile.Profile()
+            started = datetime.now()
+            wall, cpu = time.perf_counter(), time.process_time()
+            error = None
+            try:
+                profile.enable()
+                try:
+                    return func(*args, **kwargs)
+                finally:
+                    profile.disable()
+            except Exception as e:
+                error = repr(e)
+                raise
+            finally:
+                active = False
+                try:
+                    save_profile(name, profile, started, time.perf_counter() - wall, time.process_time() - cpu, error)
+                except OSError as e:
+                    print("Could not save profile:", e)
+        return wrapper
+    return decorate
+
+
+def top_functions(profile, count):
+    stats = pstats.Stats(profile)
+    stats.sort_stats("cumulative")
+    top = []
+    for key in stats.fcn_list:
+        filename, line, function = key
+        if filename == "~" or filename == __file__:
+            continue  # builtins and this wrapper
+        calls, _, own, cumulative, _ = stats.stats[key]
+        top.append({
+            "function": f"{filename}:{line}({function})",
+            "calls": calls,
+            "own_ms": round(own * 1000, 3),
+            "cumulative_ms": round(cumulative * 1000, 3)
+        })
+        if len(top) == count:
+            break
+    return top
+
+
+def load_index(directory):
+    try:
+        with open(os.path.join(directory, INDEX_FILE), encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return []
+
+
+def save_profile(name, profile, started, wall, cpu, error=None):
+    directory = profiling_config["directory"]
+    os.makedirs(directory, exist_ok=True)
+    filename = f"{started:%Y%m%d-%H%M%S-%f}_{name}.prof"
+    profile.dump_stats(os.path.join(directory, filename))
+
+    index = load_index(directory)
+    index.append({
+        "action": name,
+        "file": filename,
+        "started": started.isoformat(timespec="milliseconds"),
+        "wall_ms": round(wall * 1000, 3),
+        "cpu_ms": round(cpu * 1000, 3),
+        "error": error,
+        "top": top_functions(profile, profiling_config["top_functions"])
+    })
+    #rotate: the index and the .prof files keep only the newest keep_files actions
+    keep = profiling_config["keep_files"]
+    for entry in index[:-keep]:
+        try:
+            os.remove(os.path.join(directory, entry["file"]))
+        except OSError:
+            pass
+    index = index[-keep:]
+
+    path = os.path.join(directory, INDEX_FILE)
+    with open(path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(index, f, indent=1)
+    os.replace(path + ".tmp", path)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Inspect the per action profiles written with DAILYSALES_PROFILE=1")
+    parser.add_argument("--dir", default=profiling_config["directory"])
+    parser.add_argument("--action", help="only this action, e.g. order.search")
+    parser.add_argument("--slowest", action="store_true", help="slowest first instead of newest last")
+    parser.add_argument("--show", metavar="FILE", help="print the full profile of one .prof file")
+    parser.add_argument("--limit", type=int, default=25, help="functions printed with --show")
+    args = parser.parse_args(argv)
+
+    if args.show:
+        path = args.show if os.path.exists(args.show) else os.path.join(args.dir, args.show)
+        pstats.Stats(path).sort_stats("cumulative").print_stats(args.limit)
+        return 0
+
+    entries = [entry for entry in load_index(args.dir) if not args.action or entry["action"] == args.action]
+    if not entries:
+        print(f"No profiles in {args.dir}.")
+        return 0
+    if args.slowest:
+        entries.sort(key=lambda entry: entry["wall_ms"], reverse=True)
+    for entry in entries:
+        print(f"{entry['started']}  {entry['action']:<24} wall={entry['wall_ms']:>10.1f} ms  "
+              f"cpu={entry['cpu_ms']:>10.1f} ms  {entry['file']}" + (f"  ERROR {entry['error']}" if entry["error"] else ""))
+        for function in entry["top"][:3]:
+            print(f"    {function['cumulative_ms']:>10.1f} ms  {function['function']}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -7,6 +7,7 @@ from PyQt6.QtWidgets import QMainWindow, QMessageBox, QApplication, QLineEdit
 from PyQt6.QtGui import QMouseEvent
 from db.db_functions import Database
 from db.config import db_config
+from db.shards import assign_shard
 
 class RegisterWindow(QMainWindow):
     def __init__(self, db_config):
@@ -33,9 +34,7 @@ class RegisterWindow(QMainWindow):
             QMessageBox.warning(self, "Invalid Name", "Full name must only contain letters, spaces, or commas.")
             return
         try:
-            existing_user = self.db.execute_query(
-                "SELECT username FROM user WHERE username = ?", (username,)
-            )
+            existing_user = self.db.fetch("username_taken", (username,))
             if existing_user:
                 QMessageBox.warning(self, "Error", "Username already exists.")
                 return
@@ -53,13 +52,11 @@ class RegisterWindow(QMainWindow):
                 'sha256', unique_token.encode('utf-8'), token_salt, 10000
             )
             unique_token_to_store = encrypted_token.hex() + ":" + token_salt.hex()
-            query = """
-                INSERT INTO user (name, username, password, gender, uniqueToken)
-                VALUES (?, ?, ?, ?, ?)
-            """
             params = (name, username, password_to_store, gender, unique_token_to_store)
 
-            if self.db.execute_non_query(query, params):
+            cursor = self.db.run("insert_user", params)
+            if cursor:
+                assign_shard(cursor.lastrowid)
                 QMessageBox.information(self, "Success", "Account registered!")
                 self.redirect_to_login()
             else:
@@ -0,0 +1,116 @@
+from datetime import date
+from PyQt6.QtCore import QAbstractItemModel, QModelIndex, Qt
+from reports.export import HEADERS
+from reports.money import format_cents
+
+
+class SalesTreeModel(QAbstractItemModel):
+    #orders are the top rows and their lines the children, read straight from the SalesBuffer
+    #an order's lines only become rows when it is expanded, so loading a day is O(orders)
+    def __init__(self, sales, parent=None):
+        super().__init__(parent)
+        self.sales = sales
+        self.rows = []      # SalesBuffer order index of each top row
+        self.fetched = set()  # order indexes whose lines are rows
+
+    def set_sales(self, sales, indexes=None):
+        #indexes limits the top rows to those orders (search results)
+        self.beginResetModel()
+        self.sales = sales
+        self.rows = list(range(len(sales))) if indexes is None else list(indexes)
+        self.fetched = set()
+        self.endResetModel()
+
+    def append_order(self, order):
+        row = len(self.rows)
+        self.beginInsertRows(QModelIndex(), row, row)
+        self.rows.append(order)
+        self.endInsertRows()
+
+    def line_count(self, order):
+        return self.sales.order_starts[order + 1] - self.sales.order_starts[order]
+
+    def is_order(self, index):
+        return index.isValid() and index.internalId() == 0
+
+    def index(self, row, column, parent=QModelIndex()):
+        #the internal id is 0 for orders and the parent's top row + 1 for lines, never a pointer
+        if not self.hasIndex(row, column, parent):
+            return QModelIndex()
+        if not parent.isValid():
+            return self.createIndex(row, column, 0)
+        return self.createIndex(row, column, parent.row() + 1)
+
+    def parent(self, index):
+        if not index.isValid() or index.internalId() == 0:
+            return QModelIndex()
+        return self.createIndex(index.internalId() - 1, 0, 0)
+
+    def rowCount(self, parent=QModelIndex()):
+        if not parent.isValid():
+            return len(self.rows)
+        if self.is_order(parent) and parent.column() == 0:
+            order = self.rows[parent.row()]
+            return self.line_count(order) if order in self.fetched else 0
+        return 0
+
+    def columnCount(self, parent=QModelIndex()):
+        return len(HEADERS)
+
+    def hasChildren(self, parent=QModelIndex()):
+        #lets the view draw the expand arrow before the lines are fetched
+        if not parent.isValid():
+            return bool(self.rows)
+        return self.is_order(parent) and parent.column() == 0 and self.line_count(self.rows[parent.row()]) > 0
+
+    def canFetchMore(self, parent):
+        return self.is_order(parent) and parent.column() == 0 and self.rows[parent.row()] not in self.fetched
+
+    def fetchMore(self, parent):
+        #Qt also asks for the root, which has nothing more to fetch
+        if not self.canFetchMore(parent):
+            return
+        order = self.rows[parent.row()]
+        count = self.line_count(order)
+        if count == 0:
+            self.fetched.add(order)
+            return
+        self.beginInsertRows(parent, 0, count - 1)
+        self.fetched.add(order)
+        self.endInsertRows()
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        if role == Qt.ItemDataRole.TextAlignmentRole and index.column() in (2, 3):
+            return Qt.AlignmentFlag.AlignRight | Qt.AlignmentFlag.AlignVCenter
+        if role != Qt.ItemDataRole.DisplayRole:
+            return None
+
+        sales, column = self.sales, index.column()
+        if self.is_order(index):
+            order = self.rows[index.row()]
+            start, end = sales.order_starts[order], sales.order_starts[order + 1]
+            if column == 0:
+                return str(sales.order_ids[order])
+            if column == 1:
+                return ", ".join(sales.names[sales.line_names[j]] for j in range(start, end))
+            if column == 2:
+                return str(sum(sales.line_quantities[start:end]))
+            if column == 3:
+                return format_cents(sales.order_totals[order])
+            return str(date.fromordinal(sales.order_days[order]))
+
+        line = sales.order_starts[self.rows[index.internalId() - 1]] + index.row()
+        if column == 1:
+            return sales.names[sales.line_names[line]]
+        if column == 2:
+            return str(sales.line_quantities[line])
+        if column == 3:
+            return format_cents(sales.line_cents[line])
+        return ""
+
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if orientation == Qt.Orientation.Horizontal and role == Qt.ItemDataRole.DisplayRole:
+            return HEADERS[section]
+        return None
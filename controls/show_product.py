@@ -5,18 +5,37 @@ from PyQt6.QtWidgets import (
     QMainWindow, QApplication, QTableWidget, QTableWidgetItem, QPushButton,
     QMessageBox, QInputDialog, QLineEdit
 )
+from PyQt6.QtGui import QColor
+from PyQt6.QtCore import QTimer
+from db.changes import record_change
 from db.config import db_config
+from db.inventory import record_movement
+from db.replicas import note_write
+from db.statements import Statements
+from db.velocity import daily_rate, stock_outlook
+from controls.events import bus, ProductUpdated, StockChanged
+from controls.profiling import profiled
+from reports.money import format_cents, to_cents
+
+LOW_STOCK_COLOR = QColor(255, 214, 214)
 
 class ShowProductsWindow(QMainWindow):
+    @profiled("products.open")
     def __init__(self, user_id, db_config):
         super().__init__()
         uic.loadUi("ui/show_products.ui", self)
         self.user_id = user_id
         self.db_config = db_config
+        self.product_rows = {}  #productId -> row
+        self.product_info = {}  #productId -> name, stock and daily sales rate
+        self.low_stock = {}
 
         self.products_table = self.findChild(QTableWidget, "productsTable")
-        self.products_table.setColumnCount(6)
-        self.products_table.setHorizontalHeaderLabels(["Product Name", "Price", "Stock", "Update Price", "Update Stock", "Remove"])
+        self.products_table.setColumnCount(8)
+        self.products_table.setHorizontalHeaderLabels([
+            "Product Name", "Price", "Stock", "Days Left", "Suggested Reorder",
+            "Update Price", "Update Stock", "Remove"
+        ])
 
         # search Input
         self.search_input = self.findChild(QLineEdit, "searchInput")
@@ -28,94 +47,203 @@ class ShowProductsWindow(QMainWindow):
         self.cancel_btn.clicked.connect(self.go_back)
 
         self.load_products()  # Load all products initially
+        bus.stock_changed.connect(self.on_stock_changed)
+        bus.product_updated.connect(self.on_product_updated)
+        QTimer.singleShot(0, self.warn_low_stock)
 
+    @profiled("products.search")
     def search_products(self, text):
         self.load_products(text)
 
     def load_products(self, search_text=""):
         try:
             conn = mariadb.connect(**self.db_config)
-            cursor = conn.cursor()
+            statements = Statements(conn)
 
             if search_text:
-                query = "SELECT productId, productName, price, stock FROM products WHERE userId = ? AND productName LIKE ?"
-                cursor.execute(query, (self.user_id, f"%{search_text}%"))
+                products = statements.all("product_list_like", (self.user_id, f"%{search_text}%"))
             else:
-                cursor.execute("SELECT productId, productName, price, stock FROM products WHERE userId = ?", (self.user_id,))
-
-            products = cursor.fetchall()
-            self.products_table.setRowCount(len(products))
-
-            for row, product in enumerate(products):
-                self.products_table.setItem(row, 0, QTableWidgetItem(product[1]))
-                self.products_table.setItem(row, 1, QTableWidgetItem(str(product[2])))
-                self.products_table.setItem(row, 2, QTableWidgetItem(str(product[3])))
-
-                update_price_button = QPushButton("Update Price")
-                update_price_button.clicked.connect(lambda checked, product_id=product[0]: self.update_price(product_id))
-                self.products_table.setCellWidget(row, 3, update_price_button)
-
-                update_stock_button = QPushButton("Update Stock")
-                update_stock_button.clicked.connect(lambda checked, product_id=product[0]: self.update_stock(product_id))
-                self.products_table.setCellWidget(row, 4, update_stock_button)
+                products = statements.all("product_list", (self.user_id,))
+            self.products_table.setRowCount(0)
+            self.product_rows.clear()
+            self.product_info.clear()
+            self.low_stock.clear()
 
-                remove_button = QPushButton("Remove")
-                remove_button.clicked.connect(lambda checked, product_id=product[0]: self.remove_product(product_id))
-                self.products_table.setCellWidget(row, 5, remove_button)
+            for product in products:
+                rate = daily_rate(product[4] or 0.0, product[5] or 0, product[6])
+                self.add_product_row(product[0], product[1], product[2], product[3], rate)
 
         except Exception as e:
             QMessageBox.critical(self, "Error", str(e))
         finally:
             if 'conn' in locals() and conn:
-                cursor.close()
+                statements.close()
                 conn.close()
 
+        self.update_low_stock_message()
+
+    def add_product_row(self, product_id, name, price, stock, rate):
+        row = self.products_table.rowCount()
+        self.products_table.insertRow(row)
+        self.product_rows[product_id] = row
+        self.product_info[product_id] = {"name": name, "stock": stock, "rate": rate}
+
+        self.products_table.setItem(row, 0, QTableWidgetItem(name))
+        self.products_table.setItem(row, 1, QTableWidgetItem(str(price)))
+        for col in range(2, 5):
+            self.products_table.setItem(row, col, QTableWidgetItem())
+        self.refresh_stock_cells(product_id)
+
+        update_price_button = QPushButton("Update Price")
+        update_price_button.clicked.connect(lambda checked, product_id=product_id: self.update_price(product_id))
+        self.products_table.setCellWidget(row, 5, update_price_button)
+
+        update_stock_button = QPushButton("Update Stock")
+        update_stock_button.clicked.connect(lambda checked, product_id=product_id: self.update_stock(product_id))
+        self.products_table.setCellWidget(row, 6, update_stock_button)
+
+        remove_button = QPushButton("Remove")
+        remove_button.clicked.connect(lambda checked, product_id=product_id: self.remove_product(product_id))
+        self.products_table.setCellWidget(row, 7, remove_button)
+
+    def refresh_stock_cells(self, product_id):
+        row = self.product_rows[product_id]
+        info = self.product_info[product_id]
+        outlook = stock_outlook(info["stock"], info["rate"])
+        cover_days = outlook["cover_days"]
+
+        self.products_table.item(row, 2).setText(str(info["stock"]))
+        self.products_table.item(row, 3).setText("-" if cover_days is None else f"{cover_days:.1f}")
+        self.products_table.item(row, 4).setText(str(outlook["reorder"]))
+
+        if outlook["low"]:
+            self.low_stock[product_id] = (info["name"], info["stock"], outlook["reorder"])
+        else:
+            self.low_stock.pop(product_id, None)
+        color = LOW_STOCK_COLOR if outlook["low"] else QColor(0, 0, 0, 0)
+        for col in range(5):
+            self.products_table.item(row, col).setBackground(color)
+
+    def update_low_stock_message(self):
+        if self.low_stock:
+            self.statusBar().showMessage(f"{len(self.low_stock)} product(s) running low on stock.")
+        else:
+            self.statusBar().clearMessage()
+
+    def warn_low_stock(self):
+        if not self.low_stock:
+            return
+        low_stock = list(self.low_stock.values())
+        lines = [f"{name}: {stock} left, reorder {reorder}" for name, stock, reorder in low_stock[:15]]
+        if len(low_stock) > 15:
+            lines.append(f"...and {len(low_stock) - 15} more")
+        QMessageBox.warning(self, "Low Stock", "These products will run out soon:\n\n" + "\n".join(lines))
+
+    def on_stock_changed(self, event):
+        if event.user_id != self.user_id or event.product_id not in self.product_rows:
+            return
+        info = self.product_info[event.product_id]
+        info["stock"] = event.stock if event.stock is not None else info["stock"] + event.delta
+        self.refresh_stock_cells(event.product_id)
+        self.update_low_stock_message()
+
+    def on_product_updated(self, event):
+        if event.user_id != self.user_id:
+            return
+        if event.product_id not in self.product_rows:
+            search_text = self.search_input.text().strip().lower()
+            if event.created and search_text in event.product_name.lower():
+                self.add_product_row(event.product_id, event.product_name,
+                                     format_cents(event.price_cents), event.stock, 0.0)
+                self.update_low_stock_message()
+            return
+
+        row = self.product_rows[event.product_id]
+        if event.removed:
+            self.products_table.removeRow(row)
+            del self.product_rows[event.product_id]
+            del self.product_info[event.product_id]
+            self.low_stock.pop(event.product_id, None)
+            #only rows below the removed one move up
+            for product_id, product_row in self.product_rows.items():
+                if product_row > row:
+                    self.product_rows[product_id] = product_row - 1
+            self.update_low_stock_message()
+            return
+
+        info = self.product_info[event.product_id]
+        if event.product_name is not None:
+            info["name"] = event.product_name
+            self.products_table.item(row, 0).setText(event.product_name)
+        if event.price_cents is not None:
+            self.products_table.item(row, 1).setText(format_cents(event.price_cents))
+        if event.stock is not None:
+            info["stock"] = event.stock
+            self.refresh_stock_cells(event.product_id)
+            self.update_low_stock_message()
+
+    @profiled("products.update_price")
     def update_price(self, product_id):
         price, ok = QInputDialog.getDouble(self, "Update Price", "Enter new price:")
         if ok:
             try:
                 conn = mariadb.connect(**self.db_config)
-                cursor = conn.cursor()
-                cursor.execute("UPDATE products SET price = ? WHERE productId = ?", (price, product_id))
+                statements = Statements(conn)
+                statements.execute("update_price", (price, product_id))
+                record_change(statements.cursor("record_change"), self.user_id, "product", product_id)
                 conn.commit()
-                self.load_products(self.search_input.text())
+                note_write(self.user_id)
+                bus.publish(ProductUpdated(self.user_id, product_id, price_cents=to_cents(price)))
             except Exception as e:
                 QMessageBox.critical(self, "Error", str(e))
             finally:
                 if 'conn' in locals() and conn:
-                    cursor.close()
+                    statements.close()
                     conn.close()
 
+    @profiled("products.update_stock")
     def update_stock(self, product_id):
         stock, ok = QInputDialog.getInt(self, "Update Stock", "Enter new stock:")
         if ok:
             try:
                 conn = mariadb.connect(**self.db_config)
-                cursor = conn.cursor()
-                cursor.execute("UPDATE products SET stock = ? WHERE productId = ?", (stock, product_id))
+                statements = Statements(conn)
+                #lock the row so a sale on another terminal lands before or after, not in between
+                old_stock = statements.one("lock_stock", (product_id,)).stock
+                statements.execute("set_stock", (stock, product_id))
+                if stock != old_stock:
+                    record_movement(statements.cursor("record_movement"), self.user_id, product_id, stock - old_stock, "adjustment", note="manual stock update")
+                record_change(statements.cursor("record_change"), self.user_id, "product", product_id)
                 conn.commit()
-                self.load_products(self.search_input.text())
+                note_write(self.user_id)
+                bus.publish(StockChanged(self.user_id, product_id, stock - old_stock, stock))
             except Exception as e:
                 QMessageBox.critical(self, "Error", str(e))
             finally:
                 if 'conn' in locals() and conn:
-                    cursor.close()
+                    statements.close()
                     conn.close()
 
+    @profiled("products.remove")
     def remove_product(self, product_id):
         reply = QMessageBox.question(self, "Remove Product", "Are you sure you want to remove this product?")
         if reply == QMessageBox.StandardButton.Yes:
             try:
                 conn = mariadb.connect(**self.db_config)
-                cursor = conn.cursor()
-                cursor.execute("DELETE FROM products WHERE productId = ?", (product_id,))
+                statements = Statements(conn)
+                stock = statements.one("lock_stock", (product_id,)).stock
+                statements.execute("delete_product", (product_id,))
+                if stock:
+                    record_movement(statements.cursor("record_movement"), self.user_id, product_id, -stock, "adjustment", note="product removed")
+                record_change(statements.cursor("record_change"), self.user_id, "product", product_id)
                 conn.commit()
-                self.load_products(self.search_input.text())
+                note_write(self.user_id)
+                bus.publish(ProductUpdated(self.user_id, product_id, removed=True))
             except Exception as e:
                 QMessageBox.critical(self, "Error", str(e))
             finally:
                 if 'conn' in locals() and conn:
-                    cursor.close()
+                    statements.close()
                     conn.close()
 
     def go_back(self):
@@ -0,0 +1,112 @@
+from PyQt6 import uic
+from PyQt6.QtWidgets import (
+    QMainWindow, QTableWidget, QTableWidgetItem, QPushButton, QMessageBox,
+    QLabel, QComboBox, QSpinBox, QDateEdit
+)
+from PyQt6.QtCore import QDate, Qt, QThread, pyqtSignal
+from reports.money import format_cents
+from controls.profiling import profiled
+from reports.top_sellers import top_sellers_report
+
+class TopSellersWindow(QMainWindow):
+    def __init__(self, user_id, db_config):
+        super().__init__()
+        uic.loadUi("ui/top_sellers.ui", self)
+        self.user_id = user_id
+        self.db_config = db_config
+        self.thread = None
+
+        self.start_date = self.findChild(QDateEdit, "startDate")
+        self.end_date = self.findChild(QDateEdit, "endDate")
+        self.metric_choice = self.findChild(QComboBox, "metricChoice")
+        self.top_count = self.findChild(QSpinBox, "topCount")
+        self.load_button = self.findChild(QPushButton, "loadButton")
+        self.back_button = self.findChild(QPushButton, "backButton")
+        self.top_table = self.findChild(QTableWidget, "topTable")
+        self.class_summary_label = self.findChild(QLabel, "classSummaryLabel")
+
+        self.top_table.setColumnCount(8)
+        self.top_table.setHorizontalHeaderLabels([
+            "Rank", "Product Name", "Units", "Revenue", "Profit", "Margin", "Revenue Share", "Class"
+        ])
+
+        today = QDate.currentDate()
+        self.start_date.setDate(QDate(today.year(), today.month(), 1))
+        self.end_date.setDate(today)
+
+        self.load_button.clicked.connect(self.load_report)
+        self.back_button.clicked.connect(self.close)
+
+        self.load_report()
+
+    @profiled("top_sellers.load")
+    def load_report(self):
+        if self.thread and self.thread.isRunning():
+            return
+        start = self.start_date.date().toPyDate()
+        end = self.end_date.date().addDays(1).toPyDate()
+        metric = self.metric_choice.currentText().lower()
+
+        self.load_button.setEnabled(False)
+        self.statusBar().showMessage("Loading report...")
+        self.thread = TopSellersLoaderThread(
+            self.user_id, self.db_config, start, end, metric, self.top_count.value()
+        )
+        self.thread.loaded.connect(self.on_report_loaded)
+        self.thread.failed.connect(self.on_report_failed)
+        self.thread.start()
+
+    @profiled("top_sellers.show")
+    def on_report_loaded(self, products, summary):
+        self.load_button.setEnabled(True)
+        self.statusBar().clearMessage()
+        self.top_table.setRowCount(len(products))
+
+        for row, product in enumerate(products):
+            values = [
+                str(row + 1),
+                product["productName"],
+                str(product["units"]),
+                format_cents(product["revenue_cents"]),
+                format_cents(product["profit_cents"]),
+                f"{product['margin']:.1%}",
+                f"{product['share']:.1%}",
+                product["class"]
+            ]
+            for col, value in enumerate(values):
+                item = QTableWidgetItem(value)
+                item.setFlags(item.flags() & ~Qt.ItemFlag.ItemIsEditable)
+                self.top_table.setItem(row, col, item)
+
+        self.class_summary_label.setText("   ".join(
+            f"Class {abc_class}: {totals['products']} products ({format_cents(totals['revenue_cents'])})"
+            for abc_class, totals in summary.items()
+        ))
+
+    def on_report_failed(self, error):
+        self.load_button.setEnabled(True)
+        self.statusBar().clearMessage()
+        QMessageBox.critical(self, "Report Error", error)
+
+
+class TopSellersLoaderThread(QThread):
+    loaded = pyqtSignal(list, dict)
+    failed = pyqtSignal(str)
+
+    def __init__(self, user_id, db_config, start, end, metric, limit):
+        super().__init__()
+        self.user_id = user_id
+        self.db_config = db_config
+        self.start_date = start
+        self.end_date = end
+        self.metric = metric
+        self.limit = limit
+
+    def run(self):
+        try:
+            products, summary = top_sellers_report(
+                self.db_config, self.user_id, self.start_date, self.end_date, self.metric, self.limit
+            )
+            self.loaded.emit(products, summary)
+        except Exception as e:
+            self.failed.emit(str(e))
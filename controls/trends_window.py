@@ -0,0 +1,125 @@
+from PyQt6 import uic
+from PyQt6.QtWidgets import (
+    QMainWindow, QPushButton, QMessageBox, QLabel, QComboBox, QDateEdit, QWidget, QVBoxLayout
+)
+from PyQt6.QtCore import QDate, QThread, pyqtSignal
+from controls.chart_widget import ChartWidget
+from controls.profiling import profiled
+from reports.trends import load_trend, lttb
+
+LABEL_FORMATS = {
+    "hour": "%m-%d %H:00",
+    "day": "%Y-%m-%d",
+    "week": "%Y-%m-%d",
+    "month": "%Y-%m",
+    "quarter": "%Y-%m",
+    "year": "%Y"
+}
+
+class TrendsWindow(QMainWindow):
+    def __init__(self, user_id, db_config):
+        super().__init__()
+        self.bucket = None
+        self.series = []
+        uic.loadUi("ui/trends.ui", self)
+        self.user_id = user_id
+        self.db_config = db_config
+        self.thread = None
+
+        self.start_date = self.findChild(QDateEdit, "startDate")
+        self.end_date = self.findChild(QDateEdit, "endDate")
+        self.metric_choice = self.findChild(QComboBox, "metricChoice")
+        self.load_button = self.findChild(QPushButton, "loadButton")
+        self.back_button = self.findChild(QPushButton, "backButton")
+        self.bucket_label = self.findChild(QLabel, "bucketLabel")
+        self.chart_widget = self.findChild(QWidget, "chartWidget")
+
+        self.chart = ChartWidget(kind="line")
+        layout = QVBoxLayout()
+        layout.addWidget(self.chart)
+        self.chart_widget.setLayout(layout)
+
+        today = QDate.currentDate()
+        self.start_date.setDate(today.addMonths(-3))
+        self.end_date.setDate(today)
+
+        self.load_button.clicked.connect(self.load_trend)
+        self.metric_choice.currentTextChanged.connect(self.draw_chart)
+        self.back_button.clicked.connect(self.close)
+
+        self.load_trend()
+
+    @profiled("trends.load")
+    def load_trend(self):
+        if self.thread and self.thread.isRunning():
+            return
+        start = self.start_date.date().toPyDate()
+        end = self.end_date.date().addDays(1).toPyDate()
+        if start >= end:
+            QMessageBox.warning(self, "Invalid Range", "The start date must be before the end date.")
+            return
+
+        self.load_button.setEnabled(False)
+        self.statusBar().showMessage("Loading trend...")
+        self.thread = TrendLoaderThread(self.user_id, self.db_config, start, end)
+        self.thread.loaded.connect(self.on_trend_loaded)
+        self.thread.failed.connect(self.on_trend_failed)
+        self.thread.start()
+
+    @profiled("trends.show")
+    def on_trend_loaded(self, bucket, series):
+        self.load_button.setEnabled(True)
+        self.statusBar().clearMessage()
+        self.bucket = bucket
+        self.series = series
+        self.draw_chart()
+
+    def on_trend_failed(self, error):
+        self.load_button.setEnabled(True)
+        self.statusBar().clearMessage()
+        QMessageBox.critical(self, "Trend Error", error)
+
+    def draw_chart(self):
+        if not self.series:
+            return
+        revenue = self.metric_choice.currentText() == "Revenue"
+        points = [(i, (row[2] / 100) if revenue else row[1]) for i, row in enumerate(self.series)]
+        #never draw more points than there are pixels across the chart
+        sampled = lttb(points, max(self.chart.plot_width(), 3))
+
+        date_format = LABEL_FORMATS[self.bucket]
+        self.chart.integer = not revenue
+        self.chart.value_format = (lambda value: f"{value:,.2f}") if revenue else (lambda value: f"{value:,.0f}")
+        self.chart.set_data(
+            [self.series[i][0].strftime(date_format) for i, _ in sampled],
+            [value for _, value in sampled],
+            f"{self.metric_choice.currentText()} per {self.bucket}",
+            positions=[i / max(len(self.series) - 1, 1) for i, _ in sampled]
+        )
+
+        self.bucket_label.setText(
+            f"{len(self.series)} {self.bucket} buckets, {len(sampled)} points drawn."
+        )
+
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        self.draw_chart()
+
+
+class TrendLoaderThread(QThread):
+    loaded = pyqtSignal(str, list)
+    failed = pyqtSignal(str)
+
+    def __init__(self, user_id, db_config, start, end):
+        super().__init__()
+        self.user_id = user_id
+        self.db_config = db_config
+        self.start_date = start
+        self.end_date = end
+
+    def run(self):
+        try:
+            bucket, series = load_trend(self.db_config, self.user_id, self.start_date, self.end_date)
+            self.loaded.emit(bucket, series)
+        except Exception as e:
+            self.failed.emit(str(e))
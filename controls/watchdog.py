@@ -0,0 +1,172 @@
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+import traceback
+from collections import Counter
+from datetime import datetime, timedelta
+
+from db.config import watchdog_config
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def watchdog_enabled():
+    value = os.environ.get("DAILYSALES_WATCHDOG")
+    if value is not None:
+        return value.strip().lower() not in ("", "0", "false", "no", "off")
+    return bool(watchdog_config["enabled"])
+
+
+def app_frame(frames):
+    #innermost frame in our own code, that is the line to fix even when the time goes into Qt or mariadb
+    for frame in reversed(frames):
+        filename = os.path.abspath(frame.filename)
+        if filename.startswith(APP_DIR) and filename != os.path.abspath(__file__):
+            return frame
+    return frames[-1] if frames else None
+
+
+def describe(frame):
+    if frame is None:
+        return "unknown"
+    return f"{os.path.relpath(os.path.abspath(frame.filename), APP_DIR)}:{frame.lineno}({frame.name})"
+
+
+class Watchdog:
+    #the GUI thread beats from a QTimer, a plain thread notices when the beats stop
+    def __init__(self, app):
+        from PyQt6.QtCore import QTimer
+
+        self.main_thread_id = threading.main_thread().ident
+        self.heartbeat = watchdog_config["heartbeat_ms"] / 1000
+        self.threshold = watchdog_config["stall_ms"] / 1000
+        self.last_beat = time.monotonic()
+        self.stop_event = threading.Event()
+
+        self.timer = QTimer(app)
+        self.timer.timeout.connect(self.beat)
+        self.timer.start(watchdog_config["heartbeat_ms"])
+        app.aboutToQuit.connect(self.stop)
+
+        #daemon, a hung GUI must never keep the process alive
+        self.monitor = threading.Thread(target=self.watch, name="gui-watchdog", daemon=True)
+        self.monitor.start()
+
+    def beat(self):
+        self.last_beat = time.monotonic()
+
+    def stop(self):
+        self.stop_event.set()
+        self.timer.stop()
+
+    def main_stack(self):
+        frame = sys._current_frames().get(self.main_thread_id)
+        return traceback.extract_stack(frame) if frame is not None else []
+
+    def watch(self):
+        stall = None
+        while not self.stop_event.wait(self.heartbeat):
+            blocked = time.monotonic() - self.last_beat
+            if blocked < self.threshold:
+                if stall:
+                    self.finish(stall)
+                    stall = None
+                continue
+            stack = self.main_stack()
+            if stall is None:
+                #the stack at the moment the stall is noticed, then samples until it ends
+                stall = {
+                    "began": self.last_beat,
+                    "started": datetime.now() - timedelta(seconds=blocked),
+                    "stack": stack,
+                    "samples": Counter()
+                }
+            stall["samples"][describe(app_frame(stack))] += 1
+
+    def finish(self, stall):
+        samples = stall["samples"]
+        entry = {
+            "started": stall["started"].isoformat(timespec="milliseconds"),
+            #from the last beat before the freeze to the first one after it
+            "duration_ms": round((self.last_beat - stall["began"]) * 1000, 1),
+            "location": describe(app_frame(stall["stack"])),
+            "hottest": samples.most_common(1)[0][0],
+            "samples": sum(samples.values()),
+            "stack": [f"{describe(frame)}  {frame.line or ''}".rstrip() for frame in stall["stack"]]
+        }
+        try:
+            write_stall(entry)
+        except OSError as e:
+            print("Could not log stall:", e)
+
+
+def write_stall(entry):
+    path = watchdog_config["log_file"]
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    #keep one old log around, the current one never grows past max_log_bytes
+    if os.path.exists(path) and os.path.getsize(path) > watchdog_config["max_log_bytes"]:
+        os.replace(path, path + ".1")
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(json.dumps(entry) + "\n")
+
+
+def install_watchdog(app):
+    if not watchdog_enabled():
+        return None
+    return Watchdog(app)
+
+
+def load_stalls(path):
+    stalls = []
+    for name in (path + ".1", path):
+        try:
+            with open(name, encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        stalls.append(json.loads(line))
+                    except ValueError:
+                        pass  # a line cut short by a crash
+        except OSError:
+            pass
+    return stalls
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Rank the GUI freezes logged by the watchdog")
+    parser.add_argument("--log", default=watchdog_config["log_file"])
+    parser.add_argument("--by", choices=("location", "hottest"), default="location",
+                        help="group by where the stall was noticed or where most samples landed")
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument("--since", type=datetime.fromisoformat, help="only stalls after this date")
+    parser.add_argument("--stack", action="store_true", help="print the stack of the longest stall per place")
+    args = parser.parse_args(argv)
+
+    stalls = [stall for stall in load_stalls(args.log)
+              if not args.since or datetime.fromisoformat(stall["started"]) >= args.since]
+    if not stalls:
+        print(f"No stalls logged in {args.log}.")
+        return 0
+
+    places = {}
+    for stall in stalls:
+        places.setdefault(stall[args.by], []).append(stall)
+    #worst first: total time frozen, then the single longest freeze
+    ranked = sorted(places.items(), key=lambda item: (
+        -sum(stall["duration_ms"] for stall in item[1]), -max(stall["duration_ms"] for stall in item[1])))
+
+    print(f"{len(stalls)} stalls, {sum(stall['duration_ms'] for stall in stalls) / 1000:.1f} s frozen in total")
+    for place, group in ranked[:args.top]:
+        durations = [stall["duration_ms"] for stall in group]
+        print(f"{sum(durations) / 1000:>8.1f} s  x{len(group):<5} max {max(durations):>9.0f} ms  "
+              f"avg {sum(durations) / len(durations):>8.0f} ms  {place}")
+        if args.stack:
+            for line in max(group, key=lambda stall: stall["duration_ms"])["stack"]:
+                print(f"        {line}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
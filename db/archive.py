@@ -0,0 +1,288 @@
+import argparse
+import gzip
+import hashlib
+import json
+import os
+import sys
+from datetime import date, datetime
+from decimal import Decimal
+from functools import lru_cache
+
+import mariadb
+
+from db.config import archive_config
+
+ORDERS_IN_RANGE = """
+    SELECT o.orderId, o.orderDateTime,
+           CAST(ROUND(o.totalPrice * 100) AS SIGNED),
+           CAST(ROUND(COALESCE(o.totalMoney, 0) * 100) AS SIGNED),
+           CAST(ROUND(COALESCE(o.changeAmount, 0) * 100) AS SIGNED)
+    FROM orders o
+    WHERE o.userId = ? AND o.orderDateTime >= ? AND o.orderDateTime < ?
+    ORDER BY o.orderId
+"""
+
+LINES_IN_RANGE = """
+    SELECT od.orderId, od.orderDetailId, od.productId, p.productName, od.quantity,
+           CAST(ROUND(COALESCE(od.unitPrice, od.totalPrice / NULLIF(od.quantity, 0), 0) * 100) AS SIGNED),
+           CAST(ROUND(COALESCE(od.unitCost, p.purchasePrice, 0) * 100) AS SIGNED),
+           CAST(ROUND(od.totalPrice * 100) AS SIGNED)
+    FROM order_details od
+    JOIN orders o ON od.orderId = o.orderId
+    JOIN products p ON od.productId = p.productId
+    WHERE o.userId = ? AND o.orderDateTime >= ? AND o.orderDateTime < ?
+    ORDER BY od.orderId, od.orderDetailId
+"""
+
+CATALOG_IN_RANGE = """
+    SELECT month, path FROM archive_catalog
+    WHERE userId = ? AND month >= ? AND month < ?
+    ORDER BY month
+"""
+
+
+def month_start(day):
+    return date(day.year, day.month, 1)
+
+
+def add_months(month, count):
+    index = month.year * 12 + month.month - 1 + count
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def archive_path(user_id, month):
+    return os.path.join(archive_config["directory"], str(user_id), f"orders_{month:%Y-%m}.jsonl.gz")
+
+
+def fetch_month(cursor, user_id, month):
+    #one record per order with its lines, amounts in cents
+    period = (user_id, month, add_months(month, 1))
+    cursor.execute(ORDERS_IN_RANGE, period)
+    orders = {
+        order_id: {
+            "orderId": order_id,
+            "orderDateTime": str(order_datetime),
+            "totalCents": total_cents,
+            "moneyCents": money_cents,
+            "changeCents": change_cents,
+            "lines": []
+        }
+        for order_id, order_datetime, total_cents, money_cents, change_cents in cursor.fetchall()
+    }
+    cursor.execute(LINES_IN_RANGE, period)
+    for order_id, detail_id, product_id, name, quantity, unit_price, unit_cost, total_cents in cursor.fetchall():
+        orders[order_id]["lines"].append({
+            "orderDetailId": detail_id,
+            "productId": product_id,
+            "productName": name,
+            "quantity": quantity,
+            "unitPriceCents": unit_price,
+            "unitCostCents": unit_cost,
+            "totalCents": total_cents
+        })
+    return list(orders.values())
+
+
+def write_archive(path, orders):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    #mtime=0 so the same month always compresses to the same bytes
+    with open(path + ".tmp", "wb") as f:
+        with gzip.GzipFile(filename="", mode="wb", fileobj=f, mtime=0) as archive:
+            for order in orders:
+                archive.write(json.dumps(order, separators=(",", ":")).encode("utf-8") + b"\n")
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(path + ".tmp", path)
+    with open(path, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+@lru_cache(maxsize=4)
+def load_archive(path, modified):
+    #modified is part of the cache key, a rewritten file is read again
+    with gzip.open(path, "rt", encoding="utf-8") as archive:
+        return tuple(json.loads(line) for line in archive)
+
+
+def read_archive(path):
+    return load_archive(path, os.path.getmtime(path))
+
+
+def archive_month(db_config, user_id, month):
+    month = month_start(month)
+    conn = mariadb.connect(**db_config)
+    try:
+        cursor = conn.cursor()
+        cursor.execute("SELECT path FROM archive_catalog WHERE userId = ? AND month = ?", (user_id, month))
+        if cursor.fetchone():
+            raise ValueError(f"{month:%Y-%m} is already archived.")
+
+        orders = fetch_month(cursor, user_id, month)
+        if not orders:
+            return None
+        path = archive_path(user_id, month)
+        digest = write_archive(path, orders)
+        if len(read_archive(path)) != len(orders):
+            raise IOError(f"Archive {path} could not be read back.")
+
+        lines = sum(len(order["lines"]) for order in orders)
+        total_cents = sum(order["totalCents"] for order in orders)
+        cursor.execute("""
+            INSERT INTO archive_catalog (userId, month, path, orders, `lines`, totalCents, sha256)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        """, (user_id, month, path, len(orders), lines, total_cents, digest))
+        #order_details go with their orders (ON DELETE CASCADE)
+        cursor.execute("DELETE FROM orders WHERE userId = ? AND orderDateTime >= ? AND orderDateTime < ?",
+                       (user_id, month, add_months(month, 1)))
+        if cursor.rowcount != len(orders):
+            raise ValueError(f"Orders for {month:%Y-%m} changed while archiving, nothing was removed.")
+        conn.commit()
+        return {"month": month, "path": path, "orders": len(orders), "lines": lines, "totalCents": total_cents}
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+
+def closed_months(db_config, user_id, keep_months=None, today=None):
+    if keep_months is None:
+        keep_months = archive_config["keep_months"]
+    cutoff = add_months(month_start(today or date.today()), -keep_months)
+    conn = mariadb.connect(**db_config)
+    try:
+        cursor = conn.cursor()
+        cursor.execute("SELECT MIN(orderDateTime) FROM orders WHERE userId = ? AND orderDateTime < ?", (user_id, cutoff))
+        oldest = cursor.fetchone()[0]
+    finally:
+        conn.close()
+    months = []
+    month = month_start(oldest) if oldest else cutoff
+    while month < cutoff:
+        months.append(month)
+        month = add_months(month, 1)
+    return months
+
+
+def archived_rows(cursor, user_id, start, end, missing=None):
+    #archived lines in [start, end), shaped like the live sales rows (see reports.sales_buffer)
+    start, end = as_datetime(start), as_datetime(end)
+    cursor.execute(CATALOG_IN_RANGE, (user_id, month_start(start), end))
+    rows = []
+    for month, path in cursor.fetchall():
+        #the files stay on the terminal that archived them, elsewhere the month is skipped, not the whole range
+        try:
+            orders = read_archive(path)
+        except (OSError, EOFError, ValueError) as e:
+            print(f"Archive for {month:%Y-%m} not readable here ({path}):", e)
+            if missing is not None:
+                missing.append(month)
+            continue
+        for order in orders:
+            moment = datetime.fromisoformat(order["orderDateTime"])
+            if start <= moment < end:
+                rows.extend(
+                    (order["orderId"], line["productName"], line["quantity"], line["totalCents"],
+                     line["unitCostCents"] * line["quantity"], moment)
+                    for line in order["lines"]
+                )
+    return rows
+
+
+def as_datetime(value):
+    if isinstance(value, datetime):
+        return value
+    if isinstance(value, str):
+        value = date.fromisoformat(value)
+    return datetime(value.year, value.month, value.day)
+
+
+def restore_month(db_config, user_id, month):
+    month = month_start(month)
+    conn = mariadb.connect(**db_config)
+    try:
+        cursor = conn.cursor()
+        cursor.execute("SELECT path FROM archive_catalog WHERE userId = ? AND month = ?", (user_id, month))
+        row = cursor.fetchone()
+        if not row:
+            raise ValueError(f"{month:%Y-%m} is not archived.")
+        path = row[0]
+        orders = read_archive(path)
+        for order in orders:
+            cursor.execute("""
+                INSERT INTO orders (orderId, userId, totalPrice, totalMoney, changeAmount, orderDateTime)
+                VALUES (?, ?, ?, ?, ?, ?)
+            """, (order["orderId"], user_id, cents(order["totalCents"]), cents(order["moneyCents"]),
+                  cents(order["changeCents"]), order["orderDateTime"]))
+            cursor.executemany("""
+                INSERT INTO order_details (orderDetailId, orderId, productId, quantity, unitPrice, unitCost, totalPrice)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            """, [
+                (line["orderDetailId"], order["orderId"], line["productId"], line["quantity"],
+                 cents(line["unitPriceCents"]), cents(line["unitCostCents"]), cents(line["totalCents"]))
+                for line in order["lines"]
+            ])
+        cursor.execute("DELETE FROM archive_catalog WHERE userId = ? AND month = ?", (user_id, month))
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+    os.remove(path)
+    return len(orders)
+
+
+def cents(value):
+    return Decimal(value).scaleb(-2)
+
+
+def main(argv=None):
+    from db.shards import config_for_user
+
+    parser = argparse.ArgumentParser(description="Move closed months of orders to compressed archive files")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run = commands.add_parser("run", help="archive every month older than keep_months")
+    run.add_argument("--user", type=int, required=True, help="userId")
+    run.add_argument("--keep", type=int, default=None, help="months to keep besides the current one")
+
+    for name, text in (("month", "archive one month"), ("restore", "put an archived month back")):
+        command = commands.add_parser(name, help=text)
+        command.add_argument("--user", type=int, required=True, help="userId")
+        command.add_argument("--month", type=lambda value: date.fromisoformat(value + "-01"), required=True,
+                             help="YYYY-MM")
+
+    listing = commands.add_parser("list", help="show the archive catalog")
+    listing.add_argument("--user", type=int, required=True, help="userId")
+    args = parser.parse_args(argv)
+    db_config = config_for_user(args.user)
+
+    if args.command == "restore":
+        print(f"{restore_month(db_config, args.user, args.month)} orders restored.")
+        return 0
+
+    if args.command == "list":
+        conn = mariadb.connect(**db_config)
+        try:
+            cursor = conn.cursor()
+            cursor.execute("""
+                SELECT month, orders, `lines`, totalCents, path FROM archive_catalog
+                WHERE userId = ? ORDER BY month
+            """, (args.user,))
+            for month, orders, lines, total_cents, path in cursor.fetchall():
+                print(f"{month:%Y-%m}  orders={orders:>7}  lines={lines:>8}  total={cents(total_cents):>14}  {path}")
+        finally:
+            conn.close()
+        return 0
+
+    months = [args.month] if args.command == "month" else closed_months(db_config, args.user, args.keep)
+    for month in months:
+        result = archive_month(db_config, args.user, month)
+        if result:
+            print(f"{month:%Y-%m}: {result['orders']} orders, {result['lines']} lines -> {result['path']}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
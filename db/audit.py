@@ -0,0 +1,378 @@
+import argparse
+import json
+import os
+import random
+import re
+import sys
+import uuid
+from collections import namedtuple
+from datetime import date, datetime, timedelta
+
+import mariadb
+
+from db.changes import PRUNE_CHANGES, TERMINAL_ID
+from db.config import audit_config, db_config
+from db.hourly import CLEAR_HOURS, REBUILD_HOURS
+from db.inventory import LEDGER_BETWEEN, LOCK_PRODUCTS, SNAPSHOT_AFTER, SNAPSHOT_BEFORE, SNAPSHOT_DUE, TAKE_SNAPSHOTS
+from db.statements import STATEMENTS
+from db.velocity import REBUILD_VELOCITY, VELOCITY_DAYS
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MIGRATIONS = os.path.join(ROOT, "db", "migrations")
+
+#tables the seed fills, analyzed afterwards so the optimizer sees real statistics
+SEEDED_TABLES = ("user", "products", "orders", "order_details", "product_velocity", "stock_ledger",
+                 "stock_snapshots", "archive_catalog", "sales_hourly", "change_seq", "change_log")
+
+#the values EXPLAIN runs with, picked from the seeded data of the busiest user
+Sample = namedtuple("Sample", "user_id username product_id sku name_part order_id order_datetime today")
+
+#representative parameters per registry statement; a new statement without an entry fails the audit
+PARAMS = {
+    "user_by_username": lambda s: (s.username,),
+    "username_taken": lambda s: (s.username,),
+    "insert_user": lambda s: ("Audit", "audit-new", "x:00", "Other", "token"),
+    "token_by_username": lambda s: (s.username,),
+    "update_password": lambda s: ("x:00", s.username),
+    "products_like": lambda s: (s.user_id, f"%{s.name_part}%"),
+    "product_by_sku": lambda s: (s.user_id, s.sku),
+    "insert_order": lambda s: (s.user_id, 10, 20, 10),
+    "insert_order_line": lambda s: (s.order_id, s.product_id, 1, 10, 5, 10),
+    "take_stock": lambda s: (1, s.product_id, 1),
+    "record_movement": lambda s: (s.product_id, s.user_id, "sale", -1, s.order_id, None),
+    "record_sale": lambda s: (s.product_id, s.user_id, 1, 0.2, 0.2, 0.2),
+    "record_hour": lambda s: (s.user_id, s.order_datetime.replace(minute=0, second=0), 10),
+    "order_datetime": lambda s: (s.order_id,),
+    "import_order": lambda s: (s.user_id, 10, 10, s.order_datetime),
+    "deduct_stock": lambda s: (1, s.product_id, s.user_id),
+    "reserve_changes": lambda s: (s.user_id, 1),
+    "reserved_change": lambda s: (s.user_id,),
+    "record_change": lambda s: (s.user_id, 1, "order", s.order_id, TERMINAL_ID),
+    "product_list": lambda s: (s.user_id,),
+    "product_list_like": lambda s: (s.user_id, f"%{s.name_part}%"),
+    "update_price": lambda s: (10, s.product_id),
+    "lock_stock": lambda s: (s.product_id,),
+    "set_stock": lambda s: (10, s.product_id),
+    "delete_product": lambda s: (s.product_id,),
+    "orders_version": lambda s: (s.user_id,),
+    "orders_per_month": lambda s: (s.user_id, date(s.today.year, 1, 1), date(s.today.year + 1, 1, 1)),
+    "orders_per_day": lambda s: (s.user_id, s.today.replace(day=1), s.today + timedelta(days=1)),
+    "last_change": lambda s: (s.user_id,),
+    "changes_since": lambda s: (s.user_id, 0, 200),
+    "changed_order": lambda s: (s.order_id, s.user_id),
+    "changed_product": lambda s: (s.product_id, s.user_id),
+    "sales_lines": lambda s: (s.user_id, s.today, s.today + timedelta(days=1))
+}
+
+
+def audited_statements(sample):
+    #name -> (sql, params): the registry plus the report and maintenance queries
+    from db.archive import CATALOG_IN_RANGE, LINES_IN_RANGE, ORDERS_IN_RANGE
+    from reports.compare import COMPARE_PRODUCTS, COMPARE_TOTALS, previous_period
+    from reports.export import SALES_QUERY
+    from reports.heatmap import HEATMAP_QUERY
+    from reports.profit import LINES_QUERY
+    from reports.top_sellers import CLASS_SUMMARY, METRIC_COLUMNS, RANKED_PRODUCTS, TOP_PRODUCTS
+    from reports.trends import BUCKETS, TREND_QUERY
+
+    missing = sorted(set(STATEMENTS) - set(PARAMS))
+    if missing:
+        raise KeyError(f"No audit parameters for: {', '.join(missing)}")
+    statements = {name: (sql, PARAMS[name](sample)) for name, sql in STATEMENTS.items()}
+
+    user_id, today = sample.user_id, sample.today
+    month = (today.replace(day=1), today + timedelta(days=1))
+    year = (today - timedelta(days=365), today + timedelta(days=1))
+    statements.update({
+        "hourly.clear": (CLEAR_HOURS, (user_id, *month)),
+        "hourly.rebuild": (REBUILD_HOURS, (user_id, *month)),
+        "inventory.lock_products": (LOCK_PRODUCTS, (user_id,)),
+        "inventory.take_snapshots": (TAKE_SNAPSHOTS, (user_id,)),
+        "inventory.snapshot_due": (SNAPSHOT_DUE, (24, user_id)),
+        "inventory.snapshot_before": (SNAPSHOT_BEFORE, (sample.product_id, sample.order_datetime)),
+        "inventory.snapshot_after": (SNAPSHOT_AFTER, (sample.product_id, sample.order_datetime)),
+        "inventory.ledger_between": (LEDGER_BETWEEN, (sample.product_id, 0, sys.maxsize, sample.order_datetime)),
+        "changes.prune": (PRUNE_CHANGES, (2,)),
+        "velocity.rebuild": (REBUILD_VELOCITY, (VELOCITY_DAYS, user_id, user_id, VELOCITY_DAYS)),
+        "archive.orders_in_range": (ORDERS_IN_RANGE, (user_id, *month)),
+        "archive.lines_in_range": (LINES_IN_RANGE, (user_id, *month)),
+        "archive.catalog_in_range": (CATALOG_IN_RANGE, (user_id, *year)),
+        "reports.export": (SALES_QUERY, (user_id, *month)),
+        "reports.heatmap": (HEATMAP_QUERY, (user_id, *year)),
+        "reports.profit": (LINES_QUERY, (user_id, *year)),
+        "reports.top_sellers.summary": (CLASS_SUMMARY, (user_id, *month))
+    })
+    base = previous_period(*month)
+    compare_params = (*month, *base, user_id, *month, *base)
+    statements["reports.compare.totals"] = (COMPARE_TOTALS, compare_params)
+    statements["reports.compare.products"] = (COMPARE_PRODUCTS, compare_params)
+    for metric, column in METRIC_COLUMNS.items():
+        statements[f"reports.top_sellers.{metric}"] = (
+            TOP_PRODUCTS.format(ranked=RANKED_PRODUCTS, column=column), (user_id, *month, 10))
+    for bucket, (_, expression) in BUCKETS.items():
+        statements[f"reports.trends.{bucket}"] = (TREND_QUERY.format(bucket=expression), (user_id, *year))
+    return statements
+
+
+def script_statements(path):
+    #the dump and the migrations: full line comments dropped, one statement per `;` at a line end
+    with open(path, encoding="utf-8") as f:
+        text = "\n".join(line for line in f.read().splitlines() if not line.lstrip().startswith("--"))
+    return [statement.strip() for statement in re.split(r";\s*$", text, flags=re.MULTILINE) if statement.strip()]
+
+
+def server_config():
+    return {key: value for key, value in db_config.items() if key != "database"}
+
+
+def scratch_config():
+    return dict(db_config, database=audit_config["database"])
+
+
+def create_schema():
+    name = audit_config["database"]
+    if name == db_config["database"]:
+        raise ValueError("audit_config['database'] must not be the app's database, it is dropped on every run")
+    conn = mariadb.connect(**server_config())
+    try:
+        cursor = conn.cursor()
+        cursor.execute(f"DROP DATABASE IF EXISTS `{name}`")
+        cursor.execute(f"CREATE DATABASE `{name}` CHARACTER SET utf8mb4 COLLATE utf8mb4_general_ci")
+    finally:
+        conn.close()
+
+    conn = mariadb.connect(**scratch_config())
+    try:
+        cursor = conn.cursor()
+        scripts = [os.path.join(ROOT, "dailysales.sql")]
+        scripts += [os.path.join(MIGRATIONS, name) for name in sorted(os.listdir(MIGRATIONS)) if name.endswith(".sql")]
+        for path in scripts:
+            for statement in script_statements(path):
+                cursor.execute(statement)
+            conn.commit()
+    finally:
+        conn.close()
+
+
+def batches(rows, size=5000):
+    for i in range(0, len(rows), size):
+        yield rows[i:i + size]
+
+
+def seed(conn):
+    rng = random.Random(audit_config["seed"])
+    cursor = conn.cursor()
+    now = datetime.now().replace(microsecond=0)
+
+    users = []
+    for n in range(audit_config["users"]):
+        cursor.execute(STATEMENTS["insert_user"], (f"Audit {n}", f"audit{n}", "x:00", "Other", uuid.uuid4().hex))
+        users.append(cursor.lastrowid)
+
+    products = {}
+    for user_id in users:
+        rows = []
+        for n in range(audit_config["products"]):
+            cost = rng.randint(50, 5000) / 100
+            rows.append((f"Product {n} {rng.choice(['Soap', 'Rice', 'Soda', 'Bread', 'Candy', 'Noodles'])}",
+                         f"{user_id}-{n:06d}", round(cost * rng.uniform(1.1, 1.6), 2), cost, rng.randint(0, 300), user_id))
+        cursor.executemany("INSERT INTO products (productName, sku, price, purchasePrice, stock, userId) "
+                           "VALUES (?, ?, ?, ?, ?, ?)", rows)
+        cursor.execute("SELECT productId, price, purchasePrice FROM products WHERE userId = ?", (user_id,))
+        products[user_id] = cursor.fetchall()
+
+    cursor.execute("SELECT COALESCE(MAX(orderId), 0) FROM orders")
+    order_id = cursor.fetchone()[0]
+    #the first user is the busiest, like a real store next to a few trial accounts
+    weights = [1 / (i + 1) for i in range(len(users))]
+    orders, lines, movements, changes = [], [], [], []
+    change_seqs = dict.fromkeys(users, 0)
+    for _ in range(audit_config["orders"]):
+        order_id += 1
+        user_id = rng.choices(users, weights)[0]
+        moment = now - timedelta(days=rng.randrange(audit_config["days"]),
+                                 hours=rng.randint(0, 12), minutes=rng.randrange(60))
+        basket = rng.sample(products[user_id], rng.randint(1, 4))
+        total = 0
+        for product_id, price, cost in basket:
+            quantity = rng.randint(1, 5)
+            lines.append((order_id, product_id, quantity, price, cost, price * quantity))
+            movements.append((product_id, user_id, "sale", -quantity, moment, order_id))
+            total += price * quantity
+        orders.append((order_id, basket[0][0], user_id, len(basket), total, total, 0, moment))
+        change_seqs[user_id] += 1
+        changes.append((user_id, change_seqs[user_id], "order", order_id, "audit", moment))
+
+    for rows in batches(orders):
+        cursor.executemany("INSERT INTO orders (orderId, productId, userId, quantity, totalPrice, totalMoney, "
+                           "changeAmount, orderDateTime) VALUES (?, ?, ?, ?, ?, ?, ?, ?)", rows)
+    for rows in batches(lines):
+        cursor.executemany("INSERT INTO order_details (orderId, productId, quantity, unitPrice, unitCost, totalPrice) "
+                           "VALUES (?, ?, ?, ?, ?, ?)", rows)
+    for rows in batches(movements):
+        cursor.executemany("INSERT INTO stock_ledger (productId, userId, kind, quantity, movedAt, reference) "
+                           "VALUES (?, ?, ?, ?, ?, ?)", rows)
+    for rows in batches(changes):
+        cursor.executemany("INSERT INTO change_log (userId, seq, entity, entityId, terminalId, changedAt) "
+                           "VALUES (?, ?, ?, ?, ?, ?)", rows)
+    cursor.executemany("INSERT INTO change_seq (userId, seq) VALUES (?, ?)", list(change_seqs.items()))
+
+    for user_id in users:
+        cursor.executemany("INSERT INTO product_velocity (productId, userId, avgDailyUnits, dayUnits, lastSaleDate) "
+                           "VALUES (?, ?, ?, ?, ?)",
+                           [(product_id, user_id, rng.uniform(0, 5), rng.randint(0, 5), now.date() - timedelta(days=rng.randrange(30)))
+                            for product_id, _, _ in products[user_id]])
+        cursor.execute(REBUILD_HOURS, (user_id, now - timedelta(days=audit_config["days"] + 1), now + timedelta(days=1)))
+        cursor.execute(TAKE_SNAPSHOTS, (user_id,))
+        #a year of archived months in the catalog, the files themselves are never read
+        cursor.executemany("INSERT INTO archive_catalog (userId, month, path, orders, `lines`, totalCents, sha256) "
+                           "VALUES (?, ?, ?, 0, 0, 0, ?)",
+                           [(user_id, date(now.year - 2, month, 1), f"audit/{user_id}-{month}.json.gz", "0" * 64)
+                            for month in range(1, 13)])
+    conn.commit()
+
+    for table in SEEDED_TABLES:
+        cursor.execute(f"ANALYZE TABLE `{table}`")
+        cursor.fetchall()
+    return users[0]
+
+
+def pick_sample(cursor, user_id):
+    cursor.execute("SELECT username FROM user WHERE userId = ?", (user_id,))
+    username = cursor.fetchone()[0]
+    cursor.execute("SELECT productId, sku, productName FROM products WHERE userId = ? AND sku IS NOT NULL "
+                   "ORDER BY productId LIMIT 1", (user_id,))
+    product_id, sku, name = cursor.fetchone()
+    cursor.execute("SELECT orderId, orderDateTime FROM orders WHERE userId = ? ORDER BY orderDateTime DESC LIMIT 1",
+                   (user_id,))
+    order_id, order_datetime = cursor.fetchone()
+    return Sample(user_id, username, product_id, sku, name.split()[-1].lower(), order_id, order_datetime,
+                  order_datetime.date())
+
+
+def plan_flags(plan):
+    #what makes a statement slow as data grows; the derived tables a query builds itself are not counted
+    flags = set()
+    for row in plan:
+        table = row["table"] or ""
+        extra = row["Extra"] or ""
+        if row["select_type"] == "INSERT" or table.startswith("<"):
+            continue
+        if row["type"] == "ALL":
+            flags.add(f"full scan: {table}")
+        elif row["type"] == "index":
+            flags.add(f"full index scan: {table}")
+        if "Using filesort" in extra:
+            flags.add(f"filesort: {table}")
+        if "Using temporary" in extra:
+            flags.add(f"temporary: {table}")
+    return sorted(flags)
+
+
+def explain(cursor, sql, params):
+    cursor.execute("EXPLAIN " + sql, params)
+    columns = [column[0] for column in cursor.description]
+    plan = [dict(zip(columns, row)) for row in cursor.fetchall()]
+    rows = sum(int(row["rows"] or 0) for row in plan)
+    return {"flags": plan_flags(plan), "rows": rows, "plan": plan}
+
+
+def run_audit(statements):
+    conn = mariadb.connect(**scratch_config())
+    try:
+        cursor = conn.cursor()
+        results = {}
+        for name, (sql, params) in statements.items():
+            try:
+                results[name] = explain(cursor, sql, params)
+            except mariadb.Error as e:
+                results[name] = {"flags": [f"error: {e}"], "rows": 0, "plan": []}
+        conn.rollback()
+    finally:
+        conn.close()
+    return results
+
+
+def compare(results, baseline):
+    #regressed: a flag the baseline did not have, or far more rows examined
+    regressions = {}
+    for name, result in results.items():
+        known = baseline.get(name)
+        if known is None:
+            if result["flags"]:
+                regressions[name] = [f"new statement: {flag}" for flag in result["flags"]]
+            continue
+        problems = [flag for flag in result["flags"] if flag not in known["flags"]]
+        if result["rows"] > max(known["rows"], 1000) * audit_config["rows_growth"]:
+            problems.append(f"rows examined {known['rows']} -> {result['rows']}")
+        if problems:
+            regressions[name] = problems
+    return regressions
+
+
+def load_baseline(path):
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except OSError:
+        return None
+
+
+def save_baseline(path, results):
+    baseline = {name: {"flags": result["flags"], "rows": result["rows"]} for name, result in sorted(results.items())}
+    with open(path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(baseline, f, indent=1, sort_keys=True)
+    os.replace(path + ".tmp", path)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="EXPLAIN every statement the app runs against a seeded scratch database")
+    parser.add_argument("--reuse", action="store_true", help="keep the scratch database from the last run instead of reseeding")
+    parser.add_argument("--baseline", default=audit_config["baseline"])
+    parser.add_argument("--save", action="store_true", help="accept the current plans as the new baseline")
+    parser.add_argument("--plans", action="store_true", help="print the full EXPLAIN output of flagged statements")
+    args = parser.parse_args(argv)
+
+    if not args.reuse:
+        print(f"Seeding {audit_config['database']} with {audit_config['orders']} orders...")
+        create_schema()
+    conn = mariadb.connect(**scratch_config())
+    try:
+        if not args.reuse:
+            seed(conn)
+        cursor = conn.cursor()
+        cursor.execute("SELECT userId FROM orders GROUP BY userId ORDER BY COUNT(*) DESC LIMIT 1")
+        sample = pick_sample(cursor, cursor.fetchone()[0])
+    finally:
+        conn.close()
+
+    results = run_audit(audited_statements(sample))
+    baseline = load_baseline(args.baseline)
+    regressions = compare(results, baseline) if baseline is not None else {}
+
+    for name, result in sorted(results.items()):
+        status = "REGRESSED" if name in regressions else ("flagged" if result["flags"] else "ok")
+        print(f"{status:<10} {name:<32} rows~{result['rows']:<9} {'; '.join(result['flags'])}")
+        for problem in regressions.get(name, []):
+            print(f"{'':<10}   -> {problem}")
+        if args.plans and result["flags"]:
+            for row in result["plan"]:
+                print(f"{'':<13}{row['select_type']:<12} {row['table'] or '':<16} {row['type'] or '':<8} "
+                      f"key={row['key']} rows={row['rows']} {row['Extra'] or ''}")
+
+    if args.save:
+        save_baseline(args.baseline, results)
+        print(f"Baseline saved to {args.baseline}.")
+        return 0
+    if baseline is None:
+        print(f"No baseline at {args.baseline}, run with --save to record one.")
+        return 0
+    if regressions:
+        print(f"{len(regressions)} statement(s) regressed against {args.baseline}.")
+        return 1
+    print(f"No regressions against {args.baseline}.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
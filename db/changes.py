@@ -0,0 +1,116 @@
+import argparse
+import socket
+import sys
+import uuid
+
+import mariadb
+
+from db.config import change_feed_config
+
+ENTITIES = ("order", "product")
+
+#one id per running app, a terminal skips the changes it already published itself
+TERMINAL_ID = f"{socket.gethostname()[:27]}-{uuid.uuid4().hex[:12]}"
+
+#takes n seqs from the user's counter; its row stays locked until the transaction commits
+RESERVE_CHANGES = """
+    INSERT INTO change_seq (userId, seq) VALUES (?, ?)
+    ON DUPLICATE KEY UPDATE seq = seq + VALUES(seq)
+"""
+
+RESERVED_CHANGE = "SELECT seq FROM change_seq WHERE userId = ?"
+
+RECORD_CHANGE = """
+    INSERT INTO change_log (userId, seq, entity, entityId, terminalId)
+    VALUES (?, ?, ?, ?, ?)
+"""
+
+LAST_CHANGE = "SELECT COALESCE(MAX(seq), 0) AS seq FROM change_seq WHERE userId = ?"
+
+#a range read on (userId, seq), usually zero rows
+CHANGES_SINCE = """
+    SELECT seq, entity, entityId, terminalId
+    FROM change_log
+    WHERE userId = ? AND seq > ?
+    ORDER BY seq
+    LIMIT ?
+"""
+
+CHANGED_ORDER = """
+    SELECT o.orderDateTime,
+           CAST(ROUND(o.totalPrice * 100) AS SIGNED) AS totalCents,
+           od.productId, COALESCE(p.productName, CONCAT('#', od.productId)) AS productName, od.quantity,
+           CAST(ROUND(od.totalPrice * 100) AS SIGNED) AS lineCents,
+           CAST(ROUND(COALESCE(od.unitCost, p.purchasePrice, 0) * 100) AS SIGNED) * od.quantity AS costCents
+    FROM orders o
+    JOIN order_details od ON od.orderId = o.orderId
+    LEFT JOIN products p ON p.productId = od.productId
+    WHERE o.orderId = ? AND o.userId = ?
+    ORDER BY od.orderDetailId
+"""
+
+CHANGED_PRODUCT = """
+    SELECT productName,
+           CAST(ROUND(price * 100) AS SIGNED) AS priceCents,
+           CAST(ROUND(purchasePrice * 100) AS SIGNED) AS purchasePriceCents,
+           stock, sku
+    FROM products WHERE productId = ? AND userId = ?
+"""
+
+PRUNE_CHANGES = "DELETE FROM change_log WHERE changedAt < NOW() - INTERVAL ? DAY"
+
+
+def record_changes(cursor, user_id, changes):
+    #changes are (entity, entityId) pairs; call last, right before commit, the user's counter is locked from here on
+    changes = list(dict.fromkeys(changes))
+    if not changes:
+        return
+    for entity, _ in changes:
+        if entity not in ENTITIES:
+            raise ValueError(f"Unknown change entity: {entity}")
+    cursor.execute(RESERVE_CHANGES, (user_id, len(changes)))
+    cursor.execute(RESERVED_CHANGE, (user_id,))
+    first = cursor.fetchone()[0] - len(changes) + 1
+    cursor.executemany(RECORD_CHANGE, [(user_id, first + i, entity, entity_id, TERMINAL_ID)
+                                       for i, (entity, entity_id) in enumerate(changes)])
+
+
+def record_change(cursor, user_id, entity, entity_id):
+    record_changes(cursor, user_id, [(entity, entity_id)])
+
+
+def prune_changes(cursor, keep_days=None):
+    cursor.execute(PRUNE_CHANGES, (change_feed_config["keep_days"] if keep_days is None else keep_days,))
+    return cursor.rowcount
+
+
+def main(argv=None):
+    from db.shards import config_for_user
+
+    parser = argparse.ArgumentParser(description="Show or prune the cross-terminal change feed")
+    parser.add_argument("--user", type=int, required=True, help="userId")
+    parser.add_argument("--since", type=int, default=0, help="only changes after this sequence number")
+    parser.add_argument("--limit", type=int, default=50)
+    parser.add_argument("--prune", action="store_true",
+                        help=f"delete changes older than {change_feed_config['keep_days']} days on the user's shard")
+    args = parser.parse_args(argv)
+
+    conn = mariadb.connect(**config_for_user(args.user))
+    try:
+        cursor = conn.cursor()
+        if args.prune:
+            deleted = prune_changes(cursor)
+            conn.commit()
+            print(f"Deleted {deleted} old changes.")
+            return 0
+        cursor.execute("SELECT seq, entity, entityId, terminalId, changedAt FROM change_log "
+                       "WHERE userId = ? AND seq > ? ORDER BY seq DESC LIMIT ?", (args.user, args.since, args.limit))
+        for seq, entity, entity_id, terminal_id, changed_at in reversed(cursor.fetchall()):
+            print(f"{seq:>10}  {changed_at}  {entity:<8} #{entity_id:<8} {terminal_id}")
+    finally:
+        conn.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,3 +1,5 @@
+import os
+
 #db connection
 db_config = {
     'host': 'localhost',
@@ -5,3 +7,74 @@ db_config = {
     'password': "",
     'database': 'dailysales'
 }
+
+#databases that hold store data, users are spread across them (see db/shards.py)
+#db_config above is also the directory: logins and the user -> shard map live there
+#give every shard its own auto_increment_offset so ids never collide when a user moves
+shard_configs = {
+    'main': db_config,
+    # 'shard2': {'host': 'localhost', 'port': 3307, 'user': 'root', 'password': "", 'database': 'dailysales'},
+}
+
+#read-only replicas per shard, used for reports, graphs and exports (see db/replicas.py)
+replica_configs = {
+    # 'main': [{'host': 'localhost', 'port': 3308, 'user': 'report', 'password': "", 'database': 'dailysales'}],
+}
+
+replication_config = {
+    'max_staleness_seconds': 30,     # skip a replica further behind than this
+    'read_your_writes_seconds': 10,  # after a user's own write, read from the primary this long
+    'lag_check_seconds': 5,          # how long a replica lag reading is trusted
+    'down_retry_max_seconds': 300    # a replica that cannot be reached is retried after 10 s, 20 s, 40 s... up to this
+}
+
+#low stock alerts and reorder suggestions
+inventory_config = {
+    'velocity_alpha': 0.2,   # weight of the newest day in the daily average
+    'lead_time_days': 3,     # days before a reorder arrives
+    'review_days': 7,        # days a reorder should cover after it arrives
+    'low_stock_days': 5,     # warn when stock lasts fewer days than this
+    'snapshot_hours': 24     # take stock snapshots at most this often
+}
+
+#old months moved out of the orders tables
+archive_config = {
+    'directory': os.path.join(os.path.expanduser("~"), ".dailysales", "archive"),
+    'keep_months': 12        # months (besides the current one) kept in the database
+}
+
+#other terminals' sales and product edits reach open views through db/changes.py
+change_feed_config = {
+    'poll_seconds': 3,       # how often open views look for changes made elsewhere
+    'batch': 200,            # changes read per poll at most
+    'keep_days': 2           # python -m db.changes --prune deletes older changes
+}
+
+#per action profiling for slow screen reports (see controls/profiling.py), DAILYSALES_PROFILE=1 also turns it on
+profiling_config = {
+    'enabled': False,
+    'directory': os.path.join(os.path.expanduser("~"), ".dailysales", "profiles"),
+    'keep_files': 50,        # newest .prof files kept, older ones are deleted
+    'top_functions': 15      # functions listed per action in index.json
+}
+
+#logs GUI freezes with the main thread's stack (see controls/watchdog.py), DAILYSALES_WATCHDOG=0 turns it off
+watchdog_config = {
+    'enabled': True,
+    'heartbeat_ms': 100,     # how often the GUI thread checks in
+    'stall_ms': 500,         # a longer gap between beats is logged as a freeze
+    'log_file': os.path.join(os.path.expanduser("~"), ".dailysales", "stalls.jsonl"),
+    'max_log_bytes': 5 * 1024 * 1024
+}
+
+#query plan audit (see db/audit.py): a scratch database seeded with fake data, never the real one
+audit_config = {
+    'database': 'dailysales_audit',
+    'baseline': os.path.join(os.path.dirname(os.path.abspath(__file__)), "audit_baseline.json"),
+    'seed': 42,              # same seed, same data, comparable plans
+    'users': 3,
+    'products': 400,         # per user
+    'orders': 40000,         # spread over the users, the first one busiest
+    'days': 730,             # orders go back this far
+    'rows_growth': 4         # an estimate this many times the baseline's also counts as a regression
+}
@@ -1,23 +1,30 @@
 import mariadb
+from db.statements import Statements
 # ito sa mga functions like yang execute query
 class Database:
     def __init__(self, config):
         self.config = config
         self.conn = None
         self.cursor = None
+        self.statements = None
 
     def connect(self):
         if self.conn is None:
             self.conn = mariadb.connect(**self.config)
-            self.cursor = self.conn.cursor(dictionary=True)
+            #rows are named tuples (row.username, row[0]), not a dict per row
+            self.cursor = self.conn.cursor(named_tuple=True)
+            self.statements = Statements(self.conn)
 
     def disconnect(self):
+        if self.statements:
+            self.statements.close()
         if self.cursor:
             self.cursor.close()
         if self.conn:
             self.conn.close()
             self.conn = None
             self.cursor = None
+            self.statements = None
 
     def execute_query(self, query, params=None):
         try:
@@ -38,4 +45,23 @@ class Database:
         except mariadb.Error as e:
             print(f"Error executing non-query: {e}")
             return False
-    
\ No newline at end of file
+
+    def fetch(self, name, params=None):
+        #a statement from db/statements.py, prepared the first time it runs on this connection
+        try:
+            self.connect()
+            return self.statements.all(name, params or ())
+        except mariadb.Error as e:
+            print(f"Error executing {name}: {e}")
+            return None
+
+    def run(self, name, params=None):
+        #returns the cursor (for lastrowid / rowcount), None if it failed
+        try:
+            self.connect()
+            cursor = self.statements.execute(name, params or ())
+            self.conn.commit()
+            return cursor
+        except mariadb.Error as e:
+            print(f"Error executing {name}: {e}")
+            return None
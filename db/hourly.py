@@ -0,0 +1,74 @@
+import argparse
+import sys
+from datetime import date, timedelta
+
+import mariadb
+
+#one order added to its hour, inside the checkout transaction
+RECORD_HOUR = """
+    INSERT INTO sales_hourly (userId, hourStart, orders, revenueCents)
+    VALUES (?, ?, 1, CAST(ROUND(? * 100) AS SIGNED))
+    ON DUPLICATE KEY UPDATE
+        orders = orders + 1,
+        revenueCents = revenueCents + VALUES(revenueCents)
+"""
+
+#hours with no orders left would keep their old totals, they are cleared before the recount;
+#archived months keep the totals they had, their orders are not in the table to count again
+CLEAR_HOURS = """
+    DELETE FROM sales_hourly
+    WHERE userId = ? AND hourStart >= ? AND hourStart < ?
+      AND NOT EXISTS (SELECT 1 FROM archive_catalog a
+                      WHERE a.userId = sales_hourly.userId AND a.month = DATE_FORMAT(sales_hourly.hourStart, '%Y-%m-01'))
+"""
+
+REBUILD_HOURS = """
+    INSERT INTO sales_hourly (userId, hourStart, orders, revenueCents)
+    SELECT o.userId, DATE(o.orderDateTime) + INTERVAL HOUR(o.orderDateTime) HOUR AS hourStart,
+           COUNT(*), CAST(ROUND(SUM(o.totalPrice) * 100) AS SIGNED)
+    FROM orders o
+    WHERE o.userId = ? AND o.orderDateTime >= ? AND o.orderDateTime < ?
+    GROUP BY o.userId, hourStart
+    ON DUPLICATE KEY UPDATE
+        orders = VALUES(orders),
+        revenueCents = VALUES(revenueCents)
+"""
+
+
+def hour_start(moment):
+    return moment.replace(minute=0, second=0, microsecond=0)
+
+
+def record_order_hour(cursor, user_id, order_datetime, total_price):
+    cursor.execute(RECORD_HOUR, (user_id, hour_start(order_datetime), total_price))
+
+
+def rebuild_hours(cursor, user_id, start, end):
+    #same transaction, the heatmap never sees the range empty
+    cursor.execute(CLEAR_HOURS, (user_id, start, end))
+    cursor.execute(REBUILD_HOURS, (user_id, start, end))
+    return cursor.rowcount
+
+
+def main(argv=None):
+    from db.shards import config_for_user
+
+    parser = argparse.ArgumentParser(description="Recount the hourly sales rollup from the orders table")
+    parser.add_argument("--user", type=int, required=True, help="userId")
+    parser.add_argument("--start", type=date.fromisoformat, default=date.today() - timedelta(days=30))
+    parser.add_argument("--end", type=date.fromisoformat, default=date.today(), help="last day, inclusive")
+    args = parser.parse_args(argv)
+
+    conn = mariadb.connect(**config_for_user(args.user))
+    try:
+        cursor = conn.cursor()
+        hours = rebuild_hours(cursor, args.user, args.start, args.end + timedelta(days=1))
+        conn.commit()
+    finally:
+        conn.close()
+    print(f"Hourly totals recounted from {args.start} to {args.end}, {hours} hours with sales.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,179 @@
+import argparse
+import sys
+from datetime import date, datetime, timedelta
+
+import mariadb
+
+from db.config import inventory_config
+
+MOVEMENT_KINDS = ("opening", "sale", "adjustment", "import", "receipt")
+
+#quantity is signed, negative takes stock out
+RECORD_MOVEMENT = """
+    INSERT INTO stock_ledger (productId, userId, kind, quantity, reference, note)
+    VALUES (?, ?, ?, ?, ?, ?)
+"""
+
+#every stock writer locks the product row before its ledger row (take_stock, lock_stock, a new
+#product's insert), so once these locks are held no movement of the user's products is half committed
+LOCK_PRODUCTS = "SELECT productId FROM products WHERE userId = ? ORDER BY productId FOR UPDATE"
+
+#run under LOCK_PRODUCTS; lastEntryId per product, entryIds of one product follow its row lock
+#but across products they are handed out before commit and say nothing about commit order.
+#IGNORE: a second snapshot in the same second adds nothing new
+TAKE_SNAPSHOTS = """
+    INSERT IGNORE INTO stock_snapshots (productId, takenAt, userId, stock, lastEntryId)
+    SELECT p.productId, NOW(), p.userId, p.stock,
+           (SELECT COALESCE(MAX(l.entryId), 0) FROM stock_ledger l WHERE l.productId = p.productId)
+    FROM products p
+    WHERE p.userId = ?
+"""
+
+SNAPSHOT_DUE = """
+    SELECT COALESCE(MAX(takenAt) < NOW() - INTERVAL ? HOUR, 1)
+    FROM stock_snapshots
+    WHERE userId = ?
+"""
+
+SNAPSHOT_BEFORE = """
+    SELECT stock, lastEntryId FROM stock_snapshots
+    WHERE productId = ? AND takenAt < ?
+    ORDER BY takenAt DESC LIMIT 1
+"""
+
+SNAPSHOT_AFTER = """
+    SELECT lastEntryId FROM stock_snapshots
+    WHERE productId = ? AND takenAt >= ?
+    ORDER BY takenAt LIMIT 1
+"""
+
+#only the rows between two snapshots are read, never the whole history
+LEDGER_BETWEEN = """
+    SELECT COALESCE(SUM(quantity), 0) FROM stock_ledger
+    WHERE productId = ? AND entryId > ? AND entryId <= ? AND movedAt < ?
+"""
+
+END_OF_TIME = datetime(9999, 12, 31)
+
+
+def record_movement(cursor, user_id, product_id, quantity, kind, reference=None, note=None):
+    #call inside the transaction that changes products.stock so both commit together
+    if kind not in MOVEMENT_KINDS:
+        raise ValueError(f"Unknown stock movement: {kind}")
+    cursor.execute(RECORD_MOVEMENT, (product_id, user_id, kind, quantity, reference, note))
+
+
+def lock_products(cursor, user_id):
+    cursor.execute(LOCK_PRODUCTS, (user_id,))
+    cursor.fetchall()
+
+
+def take_snapshots(cursor, user_id):
+    lock_products(cursor, user_id)
+    cursor.execute(TAKE_SNAPSHOTS, (user_id,))
+    return cursor.rowcount
+
+
+def snapshot_due(cursor, user_id, hours=None):
+    if hours is None:
+        hours = inventory_config["snapshot_hours"]
+    cursor.execute(SNAPSHOT_DUE, (hours, user_id))
+    return bool(cursor.fetchone()[0])
+
+
+def take_snapshots_if_due(db_config, user_id, hours=None):
+    conn = mariadb.connect(**db_config)
+    try:
+        cursor = conn.cursor()
+        if not snapshot_due(cursor, user_id, hours):
+            return 0
+        #new transaction so the check below sees snapshots committed while we waited for the locks
+        conn.rollback()
+        lock_products(cursor, user_id)
+        if not snapshot_due(cursor, user_id, hours):
+            conn.rollback()
+            return 0  # another dashboard just took them
+        taken = take_snapshots(cursor, user_id)
+        conn.commit()
+        return taken
+    finally:
+        conn.close()
+
+
+def stock_at(cursor, product_id, moment):
+    #stock just before `moment`: nearest snapshot, then the ledger rows after it
+    cursor.execute(SNAPSHOT_BEFORE, (product_id, moment))
+    row = cursor.fetchone()
+    stock, last_entry_id = row if row else (0, 0)
+    cursor.execute(SNAPSHOT_AFTER, (product_id, moment))
+    row = cursor.fetchone()
+    upper_entry_id = row[0] if row else sys.maxsize
+    cursor.execute(LEDGER_BETWEEN, (product_id, last_entry_id, upper_entry_id, moment))
+    return int(stock) + int(cursor.fetchone()[0])
+
+
+def user_products(cursor, user_id):
+    cursor.execute("SELECT productId, productName, stock FROM products WHERE userId = ? ORDER BY productName", (user_id,))
+    return cursor.fetchall()
+
+
+def main(argv=None):
+    from db.shards import config_for_user
+
+    parser = argparse.ArgumentParser(description="Stock ledger and snapshots")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    snapshot = commands.add_parser("snapshot", help="take stock snapshots (schedule this daily)")
+    snapshot.add_argument("--user", type=int, required=True, help="userId")
+    snapshot.add_argument("--force", action="store_true", help="even if the last one is recent")
+
+    on_hand = commands.add_parser("stock-at", help="stock on hand at the end of a day")
+    on_hand.add_argument("--user", type=int, required=True, help="userId")
+    on_hand.add_argument("--date", type=date.fromisoformat, default=date.today())
+    on_hand.add_argument("--product", type=int, help="only this productId")
+
+    check = commands.add_parser("check", help="compare products.stock with the ledger")
+    check.add_argument("--user", type=int, required=True, help="userId")
+    args = parser.parse_args(argv)
+    db_config = config_for_user(args.user)
+
+    if args.command == "snapshot":
+        if args.force:
+            conn = mariadb.connect(**db_config)
+            try:
+                cursor = conn.cursor()
+                taken = take_snapshots(cursor, args.user)
+                conn.commit()
+            finally:
+                conn.close()
+        else:
+            taken = take_snapshots_if_due(db_config, args.user)
+        print(f"{taken} product snapshots taken." if taken else "Last snapshot is recent, nothing to do.")
+        return 0
+
+    conn = mariadb.connect(**db_config)
+    try:
+        cursor = conn.cursor()
+        products = user_products(cursor, args.user)
+        if args.command == "stock-at":
+            moment = datetime(args.date.year, args.date.month, args.date.day) + timedelta(days=1)
+            for product_id, name, _ in products:
+                if args.product is None or product_id == args.product:
+                    print(f"{product_id:>6}  {name:<40} {stock_at(cursor, product_id, moment):>8}")
+            return 0
+
+        #stock changed without a ledger row shows up as a difference here
+        drifted = 0
+        for product_id, name, stock in products:
+            expected = stock_at(cursor, product_id, END_OF_TIME)
+            if expected != stock:
+                drifted += 1
+                print(f"{product_id:>6}  {name:<40} stock={stock:>8}  ledger={expected:>8}  diff={stock - expected:>+8}")
+        print(f"{drifted} of {len(products)} products differ from the ledger.")
+        return 1 if drifted else 0
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,14 @@
+-- Keep the selling price and purchase cost of every order line as they were
+-- at checkout, so profit reports do not change when a product is repriced.
+
+ALTER TABLE `order_details`
+  ADD COLUMN `unitPrice` decimal(10,2) DEFAULT NULL AFTER `quantity`,
+  ADD COLUMN `unitCost` decimal(10,2) DEFAULT NULL AFTER `unitPrice`;
+
+-- Backfill existing lines. The old cost was never recorded, so the product's
+-- current purchase price is the best we have.
+UPDATE `order_details` od
+  LEFT JOIN `products` p ON od.productId = p.productId
+  SET od.unitPrice = ROUND(od.totalPrice / NULLIF(od.quantity, 0), 2),
+      od.unitCost = COALESCE(p.purchasePrice, 0)
+  WHERE od.unitCost IS NULL;
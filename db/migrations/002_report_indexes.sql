@@ -0,0 +1,9 @@
+-- Indexes for date-range reports.
+-- Orders are always filtered by user and time, and the line columns used by
+-- the product reports are covered so the join never has to read full rows.
+
+ALTER TABLE `orders`
+  ADD KEY `idx_orders_user_date` (`userId`, `orderDateTime`);
+
+ALTER TABLE `order_details`
+  ADD KEY `idx_details_order_product` (`orderId`, `productId`, `quantity`, `totalPrice`, `unitCost`);
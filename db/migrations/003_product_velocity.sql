@@ -0,0 +1,26 @@
+-- Exponentially weighted daily sales per product, updated at checkout.
+-- avgDailyUnits covers the days before lastSaleDate, dayUnits is what has
+-- been sold on lastSaleDate so far.
+
+CREATE TABLE `product_velocity` (
+  `productId` int(11) NOT NULL,
+  `userId` int(11) NOT NULL,
+  `avgDailyUnits` double NOT NULL DEFAULT 0,
+  `dayUnits` int(11) NOT NULL DEFAULT 0,
+  `lastSaleDate` date NOT NULL,
+  PRIMARY KEY (`productId`),
+  KEY `idx_velocity_user` (`userId`),
+  CONSTRAINT `product_velocity_ibfk_1` FOREIGN KEY (`productId`) REFERENCES `products` (`productId`) ON DELETE CASCADE
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_general_ci;
+
+-- Seed from the last 28 days once; after this it is only updated incrementally.
+INSERT INTO `product_velocity` (`productId`, `userId`, `avgDailyUnits`, `dayUnits`, `lastSaleDate`)
+SELECT p.productId, p.userId,
+       COALESCE(SUM(CASE WHEN o.orderDateTime < CURDATE() THEN od.quantity END), 0) / 28,
+       COALESCE(SUM(CASE WHEN o.orderDateTime >= CURDATE() THEN od.quantity END), 0),
+       CURDATE()
+FROM products p
+JOIN order_details od ON od.productId = p.productId
+JOIN orders o ON o.orderId = od.orderId
+WHERE o.orderDateTime >= CURDATE() - INTERVAL 28 DAY
+GROUP BY p.productId, p.userId;
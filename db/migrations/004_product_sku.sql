@@ -0,0 +1,6 @@
+-- SKU / barcode per product, unique for each user so a scan maps to one product.
+-- Products without a code keep NULL, which the unique index allows many times.
+
+ALTER TABLE `products`
+  ADD COLUMN `sku` varchar(64) DEFAULT NULL AFTER `productName`,
+  ADD UNIQUE KEY `idx_products_user_sku` (`userId`, `sku`);
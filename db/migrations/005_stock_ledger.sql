@@ -0,0 +1,37 @@
+-- Every stock movement as an append-only ledger row, plus periodic stock
+-- snapshots. Stock on a past date = latest snapshot before it + the ledger
+-- rows written after that snapshot. No foreign key to products so history
+-- survives a product being removed.
+
+CREATE TABLE `stock_ledger` (
+  `entryId` bigint(20) NOT NULL AUTO_INCREMENT,
+  `productId` int(11) NOT NULL,
+  `userId` int(11) NOT NULL,
+  `kind` enum('opening','sale','adjustment','import','receipt') NOT NULL,
+  `quantity` int(11) NOT NULL,  -- signed: negative takes stock out
+  `movedAt` datetime NOT NULL DEFAULT current_timestamp(),
+  `reference` int(11) DEFAULT NULL,  -- orderId for sales
+  `note` varchar(255) DEFAULT NULL,
+  PRIMARY KEY (`entryId`),
+  KEY `idx_ledger_product` (`productId`, `entryId`, `movedAt`, `quantity`),
+  KEY `idx_ledger_user_date` (`userId`, `movedAt`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_general_ci;
+
+CREATE TABLE `stock_snapshots` (
+  `productId` int(11) NOT NULL,
+  `takenAt` datetime NOT NULL,
+  `userId` int(11) NOT NULL,
+  `stock` int(11) NOT NULL,
+  `lastEntryId` bigint(20) NOT NULL,  -- ledger rows up to here are included in stock
+  PRIMARY KEY (`productId`, `takenAt`),
+  KEY `idx_snapshots_user` (`userId`, `takenAt`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_general_ci;
+
+-- Open the ledger with today's stock and take the first snapshot.
+INSERT INTO `stock_ledger` (`productId`, `userId`, `kind`, `quantity`, `note`)
+SELECT productId, userId, 'opening', stock, 'stock when the ledger started'
+FROM products;
+
+INSERT INTO `stock_snapshots` (`productId`, `takenAt`, `userId`, `stock`, `lastEntryId`)
+SELECT p.productId, NOW(), p.userId, p.stock, (SELECT COALESCE(MAX(entryId), 0) FROM stock_ledger)
+FROM products p;
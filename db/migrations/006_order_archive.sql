@@ -0,0 +1,17 @@
+-- Closed months can be moved out of orders/order_details into compressed
+-- files (python -m db.archive). This catalog says which months live where.
+-- MariaDB partitioning cannot be used here: partitioned InnoDB tables do not
+-- support the foreign keys orders and order_details rely on.
+
+CREATE TABLE `archive_catalog` (
+  `userId` int(11) NOT NULL,
+  `month` date NOT NULL,  -- first day of the archived month
+  `path` varchar(500) NOT NULL,
+  `orders` int(11) NOT NULL,
+  `lines` int(11) NOT NULL,
+  `totalCents` bigint(20) NOT NULL,
+  `sha256` char(64) NOT NULL,
+  `archivedAt` datetime NOT NULL DEFAULT current_timestamp(),
+  PRIMARY KEY (`userId`, `month`),
+  CONSTRAINT `archive_catalog_ibfk_1` FOREIGN KEY (`userId`) REFERENCES `user` (`userId`) ON DELETE CASCADE
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_general_ci;
@@ -0,0 +1,16 @@
+-- Directory of which shard (an entry of shard_configs in db/config.py) holds
+-- each user's data. Run this on the directory database (db_config) only;
+-- every existing user stays on the main shard.
+
+CREATE TABLE `user_shards` (
+  `userId` int(11) NOT NULL,
+  `shard` varchar(64) NOT NULL,
+  `assignedAt` datetime NOT NULL DEFAULT current_timestamp(),
+  `movedAt` datetime DEFAULT NULL,
+  PRIMARY KEY (`userId`),
+  KEY `idx_user_shards_shard` (`shard`),
+  CONSTRAINT `user_shards_ibfk_1` FOREIGN KEY (`userId`) REFERENCES `user` (`userId`) ON DELETE CASCADE
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_general_ci;
+
+INSERT INTO `user_shards` (`userId`, `shard`)
+SELECT userId, 'main' FROM `user`;
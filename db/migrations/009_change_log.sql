@@ -0,0 +1,27 @@
+-- One row per order or product changed, per user. Open views on other
+-- terminals poll `seq > last seen` on the (userId, seq) key and re-read only
+-- those rows instead of reloading whole screens. Rows are only needed for a
+-- few days, schedule `python -m db.changes --prune` to delete the rest.
+--
+-- seq comes from the user's change_seq row, bumped right before the writing
+-- transaction commits. Its row lock is held until that commit, so a user's
+-- seqs become visible in order and a poller never steps over one that is
+-- still uncommitted (AUTO_INCREMENT values are handed out at insert time and
+-- can commit out of order).
+
+CREATE TABLE `change_seq` (
+  `userId` int(11) NOT NULL,
+  `seq` bigint(20) NOT NULL DEFAULT 0,
+  PRIMARY KEY (`userId`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_general_ci;
+
+CREATE TABLE `change_log` (
+  `userId` int(11) NOT NULL,
+  `seq` bigint(20) NOT NULL,
+  `entity` enum('order','product') NOT NULL,
+  `entityId` int(11) NOT NULL,
+  `terminalId` varchar(40) NOT NULL,
+  `changedAt` datetime NOT NULL DEFAULT current_timestamp(),
+  PRIMARY KEY (`userId`, `seq`),
+  KEY `idx_change_log_changed_at` (`changedAt`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_general_ci;
@@ -0,0 +1,106 @@
+import argparse
+import sys
+import threading
+import time
+
+import mariadb
+
+from db.config import replica_configs, replication_config, shard_configs
+from db.shards import shard_name
+
+#userId -> time.monotonic() of that user's last write from this app
+last_write = {}
+#replica (host, port, database) -> (checked at, seconds behind or None if not replicating, failed connects in a row)
+lag_readings = {}
+lag_lock = threading.Lock()
+
+
+def note_write(user_id):
+    #call after committing, the next reads of this user go to the primary for a while
+    last_write[user_id] = time.monotonic()
+
+
+def replica_key(config):
+    return config.get("host"), config.get("port"), config.get("database")
+
+
+def trusted_for(failures):
+    #a down replica costs a connect timeout per try, so it is tried less and less often
+    if not failures:
+        return replication_config["lag_check_seconds"]
+    return min(replication_config["lag_check_seconds"] * 2 ** failures, replication_config["down_retry_max_seconds"])
+
+
+def replica_lag(config):
+    key = replica_key(config)
+    with lag_lock:
+        reading = lag_readings.get(key)
+        failures = reading[2] if reading else 0
+        if reading and time.monotonic() - reading[0] < trusted_for(failures):
+            return reading[1]
+        #other threads keep using this reading while this one checks
+        if reading:
+            lag_readings[key] = (time.monotonic(), reading[1], failures)
+
+    lag = None
+    try:
+        conn = mariadb.connect(**config)
+        try:
+            cursor = conn.cursor()
+            cursor.execute("SHOW SLAVE STATUS")
+            row = cursor.fetchone()
+            if row:
+                status = dict(zip([column[0] for column in cursor.description], row))
+                #NULL while the replica threads are stopped
+                lag = status.get("Seconds_Behind_Master")
+        finally:
+            conn.close()
+        failures = 0
+    except mariadb.Error as e:
+        failures += 1
+        print(f"Replica unavailable, next try in {trusted_for(failures)}s:", e)
+
+    with lag_lock:
+        lag_readings[key] = (time.monotonic(), lag, failures)
+    return lag
+
+
+def reporting_config(db_config, user_id=None):
+    #where heavy reads go: a fresh enough replica, otherwise the primary itself
+    if user_id is not None:
+        written = last_write.get(user_id)
+        if written and time.monotonic() - written < replication_config["read_your_writes_seconds"]:
+            return db_config
+
+    for replica in replica_configs.get(shard_name(db_config), []):
+        lag = replica_lag(replica)
+        if lag is not None and lag <= replication_config["max_staleness_seconds"]:
+            return replica
+    return db_config
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Show how far behind each read replica is")
+    parser.parse_args(argv)
+
+    behind = 0
+    for shard in shard_configs:
+        replicas = replica_configs.get(shard, [])
+        if not replicas:
+            print(f"{shard:<12} no replicas, reports read from the primary")
+        for replica in replicas:
+            lag = replica_lag(replica)
+            where = f"{replica.get('host')}:{replica.get('port')}"
+            if lag is None:
+                behind += 1
+                print(f"{shard:<12} {where:<24} NOT REPLICATING")
+            elif lag > replication_config["max_staleness_seconds"]:
+                behind += 1
+                print(f"{shard:<12} {where:<24} {lag:>6}s behind (skipped)")
+            else:
+                print(f"{shard:<12} {where:<24} {lag:>6}s behind")
+    return 1 if behind else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
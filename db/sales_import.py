@@ -0,0 +1,285 @@
+import argparse
+import os
+import sys
+from collections import defaultdict, namedtuple
+from datetime import date, timedelta
+from decimal import Decimal, InvalidOperation
+
+import mariadb
+import pandas as pd
+
+from db.archive import CATALOG_IN_RANGE, month_start
+from db.changes import record_changes
+from db.hourly import rebuild_hours
+from db.inventory import record_movement
+from db.statements import Statements
+from db.velocity import VELOCITY_DAYS, rebuild_velocity
+
+#spreadsheet header for each field, change them with --columns field=Header
+DEFAULT_COLUMNS = {
+    "order": "order",        # receipt / order number; rows with the same value become one order
+    "date": "date",
+    "product": "product",    # product name or SKU
+    "quantity": "quantity",
+    "price": "price",        # unit price, or give a total column instead
+    "total": "total",
+    "cost": "cost"           # optional unit cost, defaults to the product's purchase price
+}
+
+CENT = Decimal("0.01")
+
+ImportLine = namedtuple("ImportLine", "row key moment product quantity unit_price total cost")
+ImportOrder = namedtuple("ImportOrder", "moment total lines")
+
+
+def text(value):
+    #empty cells come back as "" from a .csv and NaN from an .xlsx
+    return "" if value is None or (isinstance(value, float) and value != value) else str(value).strip()
+
+
+def money(value):
+    if not text(value):
+        return None
+    try:
+        return Decimal(str(value).replace(",", "").strip()).quantize(CENT)
+    except InvalidOperation:
+        raise ValueError(f"not an amount: {value!r}")
+
+
+def read_sheet(path, sheet=None):
+    if os.path.splitext(path)[1].lower() in (".xlsx", ".xlsm"):
+        return pd.read_excel(path, sheet_name=sheet or 0, dtype=object)
+    return pd.read_csv(path, dtype=str, keep_default_na=False)
+
+
+def parse_lines(frame, columns, dayfirst=False):
+    #one ImportLine per spreadsheet row plus "row N: problem" for the rows that cannot be used
+    missing = [columns[field] for field in ("date", "product", "quantity") if columns[field] not in frame.columns]
+    if columns["price"] not in frame.columns and columns["total"] not in frame.columns:
+        missing.append(f"{columns['price']} or {columns['total']}")
+    if missing:
+        raise KeyError(f"Missing column(s): {', '.join(missing)}")
+
+    #each cell parsed on its own, spreadsheets mix "2024-03-01" and "2024-03-01 09:15"
+    moments = pd.to_datetime(frame[columns["date"]], format="mixed", dayfirst=dayfirst, errors="coerce")
+    quantities = pd.to_numeric(frame[columns["quantity"]], errors="coerce")
+    has_order = columns["order"] in frame.columns
+
+    lines, errors = [], []
+    for i, record in enumerate(frame.to_dict("records")):
+        row = i + 2  # header is row 1
+        try:
+            moment, quantity = moments.iloc[i], quantities.iloc[i]
+            product = text(record[columns["product"]])
+            if pd.isna(moment):
+                raise ValueError(f"not a date: {record[columns['date']]!r}")
+            if pd.isna(quantity) or quantity != int(quantity) or quantity <= 0:
+                raise ValueError(f"not a quantity: {record[columns['quantity']]!r}")
+            if not product:
+                raise ValueError("no product")
+            quantity = int(quantity)
+            unit_price = money(record.get(columns["price"]))
+            total = money(record.get(columns["total"]))
+            if total is None and unit_price is None:
+                raise ValueError("no price or total")
+            if total is None:
+                total = unit_price * quantity
+            if unit_price is None:
+                unit_price = (total / quantity).quantize(CENT)
+            key = text(record[columns["order"]]) if has_order else None
+            lines.append(ImportLine(row, key or f"row {row}", moment.to_pydatetime().replace(microsecond=0),
+                                    product, quantity, unit_price, total, money(record.get(columns["cost"]))))
+        except ValueError as e:
+            errors.append(f"row {row}: {e}")
+    return lines, errors
+
+
+def product_index(cursor, user_id):
+    #SKU first, then the name; a name two products share cannot be imported by name
+    cursor.execute("SELECT productId, productName, sku, purchasePrice FROM products WHERE userId = ?", (user_id,))
+    by_sku, by_name, shared = {}, {}, set()
+    for product_id, name, sku, cost in cursor.fetchall():
+        if sku:
+            by_sku[sku.strip().lower()] = (product_id, cost)
+        name = name.strip().lower()
+        if name in by_name:
+            shared.add(name)
+        by_name[name] = (product_id, cost)
+    for name in shared:
+        del by_name[name]
+    return by_sku, by_name, shared
+
+
+def map_products(cursor, user_id, lines, create_missing=False):
+    by_sku, by_name, shared = product_index(cursor, user_id)
+    products, unknown, errors = {}, {}, []
+    for line in lines:
+        key = line.product.lower()
+        if key in products:
+            continue
+        match = by_sku.get(key) or by_name.get(key)
+        if match:
+            products[key] = match
+        elif key in shared:
+            errors.append(f"row {line.row}: several products are called {line.product!r}, use the SKU")
+            products[key] = None
+        else:
+            unknown.setdefault(key, line)
+
+    if unknown and create_missing:
+        #created with the last price seen and no stock, the user fills in the rest later
+        for key, line in unknown.items():
+            cursor.execute("INSERT INTO products (productName, price, purchasePrice, stock, userId) VALUES (?, ?, ?, 0, ?)",
+                           (line.product, line.unit_price, line.cost, user_id))
+            products[key] = (cursor.lastrowid, line.cost)
+        record_changes(cursor, user_id, [("product", products[key][0]) for key in unknown])
+        unknown = {}
+    errors += [f"row {line.row}: no product with SKU or name {line.product!r}" for line in unknown.values()]
+    return products, errors
+
+
+def group_orders(lines):
+    #lines keep their spreadsheet order inside an order, orders are imported oldest first
+    grouped = {}
+    for line in lines:
+        grouped.setdefault(line.key, []).append(line)
+    orders = [ImportOrder(order_lines[0].moment, sum(line.total for line in order_lines), order_lines)
+              for order_lines in grouped.values()]
+    orders.sort(key=lambda order: order.moment)
+    return orders
+
+
+def archived_months(cursor, user_id, first, last):
+    cursor.execute(CATALOG_IN_RANGE, (user_id, month_start(first), last + timedelta(days=1)))
+    return [month for month, _ in cursor.fetchall()]
+
+
+def import_batch(statements, user_id, batch, products, keep_stock, note):
+    lines, sold = [], defaultdict(int)
+    order_ids = []
+    for order in batch:
+        order_id = statements.execute("import_order", (user_id, order.total, order.total, order.moment)).lastrowid
+        order_ids.append(order_id)
+        for line in order.lines:
+            product_id, purchase_price = products[line.product.lower()]
+            cost = line.cost if line.cost is not None else purchase_price
+            lines.append((order_id, product_id, line.quantity, line.unit_price, cost, line.total))
+            sold[product_id] += line.quantity
+    #the lines of the whole batch go to the server in one round trip
+    statements.many("insert_order_line", lines)
+    if not keep_stock:
+        #product rows locked in productId order, like LOCK_PRODUCTS, so a checkout or snapshot cannot deadlock with us
+        sold = dict(sorted(sold.items()))
+        statements.many("deduct_stock", [(quantity, product_id, user_id) for product_id, quantity in sold.items()])
+        for product_id, quantity in sold.items():
+            record_movement(statements.cursor("record_movement"), user_id, product_id, -quantity, "import", note=note)
+    return order_ids, sold
+
+
+def refresh_derived(cursor, user_id, first, last, product_ids, recent_orders):
+    #once per import: the rollups are recounted from the orders instead of updated per row
+    rebuild_hours(cursor, user_id, first, last + timedelta(days=1))
+    if last >= date.today() - timedelta(days=VELOCITY_DAYS):
+        rebuild_velocity(cursor, user_id)
+    #open screens elsewhere pick up the new stock, and only this month's orders, which they can show
+    record_changes(cursor, user_id, [("product", product_id) for product_id in product_ids]
+                   + [("order", order_id) for order_id in recent_orders])
+
+
+def main(argv=None):
+    from db.shards import config_for_user
+
+    parser = argparse.ArgumentParser(description="Import past sales from a spreadsheet (.xlsx or .csv)")
+    parser.add_argument("file")
+    parser.add_argument("--user", type=int, required=True, help="userId")
+    parser.add_argument("--sheet", help="sheet name of an .xlsx file, the first one by default")
+    parser.add_argument("--columns", nargs="*", default=[], metavar="FIELD=HEADER",
+                        help=f"spreadsheet headers, fields: {', '.join(DEFAULT_COLUMNS)}")
+    parser.add_argument("--dayfirst", action="store_true", help="dates are written 31/12/2024")
+    parser.add_argument("--create-missing", action="store_true", help="add products that are not in the product list")
+    parser.add_argument("--keep-stock", action="store_true", help="leave product stock as it is")
+    parser.add_argument("--batch", type=int, default=2000, help="orders per transaction")
+    parser.add_argument("--skip-orders", type=int, default=0, help="resume after this many orders were imported")
+    parser.add_argument("--dry-run", action="store_true", help="check and map everything, write nothing")
+    args = parser.parse_args(argv)
+
+    columns = dict(DEFAULT_COLUMNS)
+    for pair in args.columns:
+        field, _, header = pair.partition("=")
+        if field not in columns or not header:
+            parser.error(f"--columns expects FIELD=HEADER with FIELD one of {', '.join(columns)}")
+        columns[field] = header
+
+    lines, errors = parse_lines(read_sheet(args.file, args.sheet), columns, args.dayfirst)
+    if not lines and not errors:
+        print("The spreadsheet has no rows.")
+        return 0
+
+    conn = mariadb.connect(**config_for_user(args.user))
+    try:
+        cursor = conn.cursor()
+        products, mapping_errors = map_products(cursor, args.user, lines, args.create_missing)
+        errors += mapping_errors
+        first = min(line.moment for line in lines).date()
+        last = max(line.moment for line in lines).date()
+        archived = archived_months(cursor, args.user, first, last)
+        if archived:
+            errors.append("these months are archived, restore them first (python -m db.archive restore): "
+                          + ", ".join(f"{month:%Y-%m}" for month in archived))
+        if errors:
+            conn.rollback()
+            print(f"Nothing imported, {len(errors)} problem(s):")
+            for error in errors[:50]:
+                print("  " + error)
+            if len(errors) > 50:
+                print(f"  ...and {len(errors) - 50} more")
+            return 1
+
+        orders = group_orders(lines)
+        print(f"{len(orders)} orders, {len(lines)} lines from {first} to {last}, "
+              f"{len({product for product, _ in products.values()})} products.")
+        if args.dry_run:
+            conn.rollback()  # products made by --create-missing
+            return 0
+        conn.commit()  # products made by --create-missing
+
+        statements = Statements(conn)
+        note = f"sales import {os.path.basename(args.file)}"
+        this_month = month_start(date.today())
+        sold_total, recent_orders = defaultdict(int), []
+        imported, stopped = args.skip_orders, None
+        for start in range(args.skip_orders, len(orders), args.batch):
+            batch = orders[start:start + args.batch]
+            try:
+                order_ids, sold = import_batch(statements, args.user, batch, products, args.keep_stock, note)
+                conn.commit()
+            except mariadb.Error as e:
+                conn.rollback()
+                stopped = e
+                break
+            imported += len(batch)
+            for product_id, quantity in sold.items():
+                sold_total[product_id] += quantity
+            recent_orders += [order_id for order_id, order in zip(order_ids, batch) if order.moment.date() >= this_month]
+            print(f"{imported}/{len(orders)} orders")
+
+        refresh_derived(cursor, args.user, first, last, [] if args.keep_stock else sorted(sold_total), recent_orders)
+        conn.commit()
+        statements.close()
+        if stopped:
+            print(f"Stopped: {stopped}\n{imported} orders are imported, rerun with --skip-orders {imported} to go on.")
+            return 1
+
+        cursor.execute("SELECT productName, stock FROM products WHERE userId = ? AND stock < 0", (args.user,))
+        negative = cursor.fetchall()
+        if negative:
+            print(f"{len(negative)} product(s) now have negative stock, e.g. {negative[0][0]} ({negative[0][1]}); "
+                  "record the missing receipts or rerun with --keep-stock next time.")
+    finally:
+        conn.close()
+    print(f"Imported {imported - args.skip_orders} orders.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
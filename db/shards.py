@@ -0,0 +1,236 @@
+import argparse
+import sys
+
+import mariadb
+
+from db.config import db_config, shard_configs
+
+#userId -> shard name, a user only moves through move_user() below
+shard_cache = {}
+
+#a user's rows per table, parents before children
+USER_TABLES = [
+    ("products", "userId = ?"),
+    ("orders", "userId = ?"),
+    ("order_details", "orderId IN (SELECT orderId FROM orders WHERE userId = ?)"),
+    ("product_velocity", "userId = ?"),
+    ("stock_ledger", "userId = ?"),
+    ("stock_snapshots", "userId = ?"),
+    ("archive_catalog", "userId = ?"),
+    ("sales_hourly", "userId = ?"),
+    ("change_seq", "userId = ?"),
+    ("change_log", "userId = ?")
+]
+
+COPY_BATCH = 1000
+
+
+def same_database(config, other):
+    return all(config.get(key) == other.get(key) for key in ("host", "port", "database"))
+
+
+def is_directory(config):
+    return same_database(config, db_config)
+
+
+def shard_name(config):
+    for name, shard_config in shard_configs.items():
+        if same_database(shard_config, config):
+            return name
+    return None
+
+
+def shard_of(user_id):
+    shard = shard_cache.get(user_id)
+    if shard is None:
+        conn = mariadb.connect(**db_config)
+        try:
+            cursor = conn.cursor()
+            cursor.execute("SELECT shard FROM user_shards WHERE userId = ?", (user_id,))
+            row = cursor.fetchone()
+        finally:
+            conn.close()
+        #users from before sharding have no row and live on main
+        shard = shard_cache[user_id] = row[0] if row else "main"
+    return shard
+
+
+def config_for_user(user_id):
+    #the db_config every window of this user should get
+    shard = shard_of(user_id)
+    if shard not in shard_configs:
+        raise KeyError(f"User {user_id} is on shard '{shard}', which is not in shard_configs.")
+    return shard_configs[shard]
+
+
+def least_loaded_shard(cursor):
+    cursor.execute("SELECT shard, COUNT(*) FROM user_shards GROUP BY shard")
+    users = dict(cursor.fetchall())
+    return min(shard_configs, key=lambda shard: (users.get(shard, 0), shard != "main"))
+
+
+def copy_user_row(user_id, target_config):
+    #the shard needs the user row for its foreign keys; logins still use the directory
+    source = mariadb.connect(**db_config)
+    try:
+        cursor = source.cursor()
+        cursor.execute("SELECT * FROM user WHERE userId = ?", (user_id,))
+        row = cursor.fetchone()
+        columns = [column[0] for column in cursor.description]
+    finally:
+        source.close()
+
+    target = mariadb.connect(**target_config)
+    try:
+        cursor = target.cursor()
+        cursor.execute(
+            f"INSERT INTO user ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))}) "
+            f"ON DUPLICATE KEY UPDATE {', '.join(f'{column} = VALUES({column})' for column in columns)}",
+            row
+        )
+        target.commit()
+    finally:
+        target.close()
+
+
+def assign_shard(user_id, shard=None):
+    #called right after registration
+    conn = mariadb.connect(**db_config)
+    try:
+        cursor = conn.cursor()
+        shard = shard or least_loaded_shard(cursor)
+        cursor.execute("INSERT INTO user_shards (userId, shard) VALUES (?, ?)", (user_id, shard))
+        conn.commit()
+    finally:
+        conn.close()
+    if not is_directory(shard_configs[shard]):
+        copy_user_row(user_id, shard_configs[shard])
+    shard_cache[user_id] = shard
+    return shard
+
+
+def copy_table(source_cursor, target_cursor, table, where, user_id):
+    source_cursor.execute(f"SELECT * FROM {table} WHERE {where}", (user_id,))
+    columns = [column[0] for column in source_cursor.description]
+    insert = f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})"
+    copied = 0
+    while True:
+        rows = source_cursor.fetchmany(COPY_BATCH)
+        if not rows:
+            return copied
+        target_cursor.executemany(insert, rows)
+        copied += len(rows)
+
+
+def move_user(user_id, target):
+    #the user should be logged out everywhere while this runs
+    source = shard_of(user_id)
+    if source == target:
+        return {}
+    source_config, target_config = shard_configs[source], shard_configs[target]
+    copy_user_row(user_id, target_config)
+
+    copied = {}
+    source_conn = mariadb.connect(**source_config)
+    target_conn = mariadb.connect(**target_config)
+    try:
+        source_cursor = source_conn.cursor()
+        target_cursor = target_conn.cursor()
+        try:
+            for table, where in USER_TABLES:
+                copied[table] = copy_table(source_cursor, target_cursor, table, where, user_id)
+            #a duplicate id fails the insert above, so nothing is half copied
+            target_conn.commit()
+        except Exception:
+            target_conn.rollback()
+            raise
+
+        conn = mariadb.connect(**db_config)
+        try:
+            cursor = conn.cursor()
+            cursor.execute("""
+                INSERT INTO user_shards (userId, shard) VALUES (?, ?)
+                ON DUPLICATE KEY UPDATE shard = VALUES(shard), movedAt = NOW()
+            """, (user_id, target))
+            conn.commit()
+        finally:
+            conn.close()
+        shard_cache[user_id] = target
+
+        #routing already points at the target, now clear the old copy
+        for table, where in reversed(USER_TABLES):
+            source_cursor.execute(f"DELETE FROM {table} WHERE {where}", (user_id,))
+        if not is_directory(source_config):
+            source_cursor.execute("DELETE FROM user WHERE userId = ?", (user_id,))
+        source_conn.commit()
+    finally:
+        source_conn.close()
+        target_conn.close()
+    return copied
+
+
+def shard_status():
+    conn = mariadb.connect(**db_config)
+    try:
+        cursor = conn.cursor()
+        cursor.execute("SELECT shard, COUNT(*) FROM user_shards GROUP BY shard")
+        users = dict(cursor.fetchall())
+    finally:
+        conn.close()
+
+    status = []
+    for name, config in shard_configs.items():
+        try:
+            shard_conn = mariadb.connect(**config)
+            try:
+                cursor = shard_conn.cursor()
+                cursor.execute("SELECT @@auto_increment_increment, @@auto_increment_offset")
+                increment, offset = cursor.fetchone()
+            finally:
+                shard_conn.close()
+            status.append((name, users.get(name, 0), increment, offset, None))
+        except mariadb.Error as e:
+            status.append((name, users.get(name, 0), None, None, str(e)))
+    return status
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Route users to database shards")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("status", help="users per shard and auto increment settings")
+    where = commands.add_parser("where", help="which shard holds a user")
+    where.add_argument("--user", type=int, required=True, help="userId")
+    move = commands.add_parser("move", help="move a user's data to another shard")
+    move.add_argument("--user", type=int, required=True, help="userId")
+    move.add_argument("--to", required=True, choices=sorted(shard_configs))
+    args = parser.parse_args(argv)
+
+    if args.command == "where":
+        print(shard_of(args.user))
+        return 0
+
+    if args.command == "move":
+        copied = move_user(args.user, args.to)
+        if not copied:
+            print(f"User {args.user} is already on {args.to}.")
+        for table, rows in copied.items():
+            print(f"{table:<18} {rows:>9} rows")
+        return 0
+
+    offsets = {}
+    for name, users, increment, offset, error in shard_status():
+        if error:
+            print(f"{name:<12} users={users:>6}  UNREACHABLE: {error}")
+            continue
+        print(f"{name:<12} users={users:>6}  auto_increment_increment={increment}  auto_increment_offset={offset}")
+        offsets.setdefault(offset, []).append(name)
+    clashes = [names for names in offsets.values() if len(names) > 1]
+    if len(shard_configs) > 1 and clashes:
+        print("Warning: shards sharing an auto_increment_offset can hand out the same ids: "
+              + "; ".join(", ".join(names) for names in clashes))
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
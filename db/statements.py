@@ -0,0 +1,232 @@
+import argparse
+import sys
+import time
+import tracemalloc
+from datetime import date, timedelta
+
+import mariadb
+
+from db.changes import (CHANGED_ORDER, CHANGED_PRODUCT, CHANGES_SINCE, LAST_CHANGE, RECORD_CHANGE,
+                        RESERVE_CHANGES, RESERVED_CHANGE)
+from db.hourly import RECORD_HOUR
+from db.inventory import RECORD_MOVEMENT
+from db.velocity import RECORD_SALE
+
+#every statement the app runs over and over, by name; columns are plain names so rows can be named tuples
+STATEMENTS = {
+    #accounts, on the directory database
+    "user_by_username": """
+        SELECT userId, name, username, password, gender, accountDateCreated, uniqueToken
+        FROM user WHERE username = ?
+    """,
+    "username_taken": "SELECT username FROM user WHERE username = ?",
+    "insert_user": """
+        INSERT INTO user (name, username, password, gender, uniqueToken)
+        VALUES (?, ?, ?, ?, ?)
+    """,
+    #username is utf8mb4_general_ci, already case insensitive, and a plain compare can use its unique index
+    "token_by_username": "SELECT uniqueToken FROM user WHERE username = ?",
+    "update_password": "UPDATE user SET password = ? WHERE username = ?",
+
+    #order screen
+    "products_like": """
+        SELECT productId, productName, price, stock, purchasePrice, sku
+        FROM products WHERE userId = ? AND productName LIKE ?
+    """,
+    "product_by_sku": """
+        SELECT productId, productName, price, stock, purchasePrice
+        FROM products WHERE userId = ? AND sku = ?
+    """,
+    "insert_order": """
+        INSERT INTO orders (userId, totalPrice, totalMoney, changeAmount, orderDateTime)
+        VALUES (?, ?, ?, ?, NOW())
+    """,
+    "insert_order_line": """
+        INSERT INTO order_details (orderId, productId, quantity, unitPrice, unitCost, totalPrice)
+        VALUES (?, ?, ?, ?, ?, ?)
+    """,
+    #another terminal may have sold the same stock meanwhile, rowcount 0 means not enough left
+    "take_stock": "UPDATE products SET stock = stock - ? WHERE productId = ? AND stock >= ?",
+    "record_movement": RECORD_MOVEMENT,
+    "record_sale": RECORD_SALE,
+    "record_hour": RECORD_HOUR,
+    "order_datetime": "SELECT orderDateTime FROM orders WHERE orderId = ?",
+
+    #sales import, past orders keep their own time and were paid exactly
+    "import_order": """
+        INSERT INTO orders (userId, totalPrice, totalMoney, changeAmount, orderDateTime)
+        VALUES (?, ?, ?, 0, ?)
+    """,
+    #unlike take_stock this never refuses, history already happened
+    "deduct_stock": "UPDATE products SET stock = stock - ? WHERE productId = ? AND userId = ?",
+    "reserve_changes": RESERVE_CHANGES,
+    "reserved_change": RESERVED_CHANGE,
+    "record_change": RECORD_CHANGE,
+
+    #product list
+    "product_list": """
+        SELECT p.productId, p.productName, p.price, p.stock,
+               v.avgDailyUnits, v.dayUnits, v.lastSaleDate
+        FROM products p
+        LEFT JOIN product_velocity v ON v.productId = p.productId
+        WHERE p.userId = ?
+    """,
+    "product_list_like": """
+        SELECT p.productId, p.productName, p.price, p.stock,
+               v.avgDailyUnits, v.dayUnits, v.lastSaleDate
+        FROM products p
+        LEFT JOIN product_velocity v ON v.productId = p.productId
+        WHERE p.userId = ? AND p.productName LIKE ?
+    """,
+    "update_price": "UPDATE products SET price = ? WHERE productId = ?",
+    "lock_stock": "SELECT stock FROM products WHERE productId = ? FOR UPDATE",
+    "set_stock": "UPDATE products SET stock = ? WHERE productId = ?",
+    "delete_product": "DELETE FROM products WHERE productId = ?",
+
+    #dashboard graphs
+    "orders_version": "SELECT COUNT(*) AS orders, COALESCE(MAX(orderId), 0) AS lastOrderId FROM orders WHERE userId = ?",
+    "orders_per_month": """
+        SELECT MONTH(o.orderDateTime) AS month, COUNT(o.orderId) AS orders
+        FROM orders o
+        WHERE o.userId = ? AND o.orderDateTime >= ? AND o.orderDateTime < ?
+        GROUP BY MONTH(o.orderDateTime)
+    """,
+    "orders_per_day": """
+        SELECT DAY(o.orderDateTime) AS day, COUNT(o.orderId) AS orders
+        FROM orders o
+        WHERE o.userId = ? AND o.orderDateTime >= ? AND o.orderDateTime < ?
+        GROUP BY DAY(o.orderDateTime)
+    """,
+
+    #change feed, polled by every open terminal
+    "last_change": LAST_CHANGE,
+    "changes_since": CHANGES_SINCE,
+    "changed_order": CHANGED_ORDER,
+    "changed_product": CHANGED_PRODUCT,
+
+    #sales history, one day or any range
+    "sales_lines": """
+        SELECT o.orderId, p.productName, od.quantity,
+               CAST(ROUND(od.totalPrice * 100) AS SIGNED) AS totalCents,
+               CAST(ROUND(COALESCE(od.unitCost, p.purchasePrice, 0) * 100) AS SIGNED) * od.quantity AS costCents,
+               o.orderDateTime
+        FROM order_details od
+        JOIN orders o ON od.orderId = o.orderId
+        JOIN products p ON od.productId = p.productId
+        WHERE o.userId = ? AND o.orderDateTime >= ? AND o.orderDateTime < ?
+        ORDER BY o.orderId, od.orderDetailId
+    """
+}
+
+
+class Statements:
+    #one prepared cursor per statement name: the server parses each statement once per connection
+    def __init__(self, conn):
+        self.conn = conn
+        self.cursors = {}
+
+    def cursor(self, name):
+        if name not in STATEMENTS:
+            raise KeyError(f"Unknown statement: {name}")
+        cursor = self.cursors.get(name)
+        if cursor is None:
+            cursor = self.cursors[name] = self.conn.cursor(prepared=True, named_tuple=True)
+        return cursor
+
+    def execute(self, name, params=()):
+        cursor = self.cursor(name)
+        cursor.execute(STATEMENTS[name], params)
+        return cursor
+
+    def many(self, name, rows):
+        cursor = self.cursor(name)
+        cursor.executemany(STATEMENTS[name], rows)
+        return cursor
+
+    def all(self, name, params=()):
+        return self.execute(name, params).fetchall()
+
+    def one(self, name, params=()):
+        return self.execute(name, params).fetchone()
+
+    def close(self):
+        for cursor in self.cursors.values():
+            cursor.close()
+        self.cursors = {}
+
+
+def fetch_with(conn, label, sql, params, **cursor_options):
+    tracemalloc.start()
+    began = time.perf_counter()
+    cursor = conn.cursor(**cursor_options)
+    cursor.execute(sql, params)
+    rows = cursor.fetchall()
+    elapsed = time.perf_counter() - began
+    size, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    cursor.close()
+    return label, len(rows), size, peak, elapsed, rows
+
+
+def repeat_with(conn, sql, params, repeat, **cursor_options):
+    cursor = conn.cursor(**cursor_options)
+    began = time.perf_counter()
+    for _ in range(repeat):
+        cursor.execute(sql, params)
+        cursor.fetchall()
+    elapsed = time.perf_counter() - began
+    cursor.close()
+    return elapsed / repeat
+
+
+def main(argv=None):
+    from db.shards import config_for_user
+
+    parser = argparse.ArgumentParser(description="Benchmark dict rows vs named tuple rows and text vs prepared statements")
+    parser.add_argument("--user", type=int, help="userId, required unless --audit")
+    parser.add_argument("--audit", action="store_true",
+                        help="run on the scratch database seeded by python -m db.audit, its busiest user by default")
+    parser.add_argument("--start", type=date.fromisoformat, default=date.today() - timedelta(days=365))
+    parser.add_argument("--end", type=date.fromisoformat, default=date.today() + timedelta(days=1))
+    parser.add_argument("--repeat", type=int, default=1000, help="executions for the latency test")
+    args = parser.parse_args(argv)
+    if args.user is None and not args.audit:
+        parser.error("--user is required unless --audit is given")
+
+    if args.audit:
+        from db.audit import scratch_config
+        conn = mariadb.connect(**scratch_config())
+    else:
+        conn = mariadb.connect(**config_for_user(args.user))
+    try:
+        if args.user is None:
+            cursor = conn.cursor()
+            cursor.execute("SELECT userId FROM orders GROUP BY userId ORDER BY COUNT(*) DESC LIMIT 1")
+            args.user = cursor.fetchone()[0]
+            cursor.close()
+        sql, params = STATEMENTS["sales_lines"], (args.user, args.start, args.end)
+        results = [
+            fetch_with(conn, "dict rows", sql, params, dictionary=True),
+            fetch_with(conn, "tuple rows", sql, params),
+            fetch_with(conn, "named tuples", sql, params, prepared=True, named_tuple=True)
+        ]
+        for label, count, size, peak, elapsed, _ in results:
+            per_row = size / count if count else 0
+            print(f"{label:<14} rows={count:>8}  kept={size / 1024 / 1024:8.2f} MiB  bytes/row={per_row:7.1f}  "
+                  f"peak={peak / 1024 / 1024:8.2f} MiB  fetch={elapsed:6.3f}s")
+
+        rows = results[-1][-1]
+        if not rows:
+            print("No orders in that range, skipping the latency test.")
+            return 0
+        sql, params = STATEMENTS["order_datetime"], (rows[-1].orderId,)
+        text = repeat_with(conn, sql, params, args.repeat)
+        prepared = repeat_with(conn, sql, params, args.repeat, prepared=True, named_tuple=True)
+        print(f"order_datetime x{args.repeat}: text {text * 1e6:8.1f} us/call  prepared {prepared * 1e6:8.1f} us/call")
+    finally:
+        conn.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
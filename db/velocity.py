@@ -0,0 +1,76 @@
+import math
+from datetime import date
+
+from db.config import inventory_config
+
+#fold the finished day into the average, then decay it for days with no sales
+RECORD_SALE = """
+    INSERT INTO product_velocity (productId, userId, avgDailyUnits, dayUnits, lastSaleDate)
+    VALUES (?, ?, 0, ?, CURDATE())
+    ON DUPLICATE KEY UPDATE
+        avgDailyUnits = IF(lastSaleDate = CURDATE(), avgDailyUnits,
+            (avgDailyUnits * (1 - ?) + ? * dayUnits) * POW(1 - ?, DATEDIFF(CURDATE(), lastSaleDate) - 1)),
+        dayUnits = IF(lastSaleDate = CURDATE(), dayUnits + VALUES(dayUnits), VALUES(dayUnits)),
+        lastSaleDate = CURDATE()
+"""
+
+
+#recount from the last `days` days of orders, like the first seed; for bulk changes such as an import
+REBUILD_VELOCITY = """
+    INSERT INTO product_velocity (productId, userId, avgDailyUnits, dayUnits, lastSaleDate)
+    SELECT p.productId, p.userId,
+           COALESCE(SUM(CASE WHEN o.orderDateTime < CURDATE() THEN od.quantity END), 0) / ?,
+           COALESCE(SUM(CASE WHEN o.orderDateTime >= CURDATE() THEN od.quantity END), 0),
+           CURDATE()
+    FROM products p
+    JOIN order_details od ON od.productId = p.productId
+    JOIN orders o ON o.orderId = od.orderId
+    WHERE p.userId = ? AND o.userId = ? AND o.orderDateTime >= CURDATE() - INTERVAL ? DAY
+    GROUP BY p.productId, p.userId
+    ON DUPLICATE KEY UPDATE
+        avgDailyUnits = VALUES(avgDailyUnits),
+        dayUnits = VALUES(dayUnits),
+        lastSaleDate = VALUES(lastSaleDate)
+"""
+
+VELOCITY_DAYS = 28
+
+
+def record_sale(cursor, user_id, product_id, quantity, alpha=None):
+    #runs inside the checkout transaction, one row per product
+    if alpha is None:
+        alpha = inventory_config["velocity_alpha"]
+    cursor.execute(RECORD_SALE, (product_id, user_id, quantity, alpha, alpha, alpha))
+
+
+def daily_rate(avg_daily_units, day_units, last_sale_date, today=None, alpha=None):
+    if last_sale_date is None:
+        return 0.0
+    if alpha is None:
+        alpha = inventory_config["velocity_alpha"]
+    today = today or date.today()
+    days = (today - last_sale_date).days
+    if days <= 0:
+        #today is not over yet, so do not let a slow morning hide a busy product
+        return max(avg_daily_units, float(day_units))
+    rate = avg_daily_units * (1 - alpha) + alpha * day_units
+    return rate * (1 - alpha) ** (days - 1)
+
+
+def stock_outlook(stock, rate, config=None):
+    config = config or inventory_config
+    cover_days = stock / rate if rate > 0 else None
+    target = rate * (config["lead_time_days"] + config["review_days"])
+    reorder = max(0, math.ceil(target - stock))
+    low = stock <= 0 or (cover_days is not None and cover_days < config["low_stock_days"])
+    return {
+        "rate": rate,
+        "cover_days": cover_days,
+        "reorder": reorder,
+        "low": low
+    }
+
+
+def rebuild_velocity(cursor, user_id, days=VELOCITY_DAYS):
+    cursor.execute(REBUILD_VELOCITY, (days, user_id, user_id, days))
+    return cursor.rowcount
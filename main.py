@@ -5,6 +5,7 @@ from PyQt6.QtWidgets import QMainWindow, QMessageBox, QLineEdit, QApplication
 from controls.register import RegisterWindow
 from db.db_functions import Database
 from db.config import db_config
+from db.shards import config_for_user
 
 class LoginWindow(QMainWindow):
     def __init__(self, db, parent=None):
@@ -24,11 +25,12 @@ class LoginWindow(QMainWindow):
             return
         try:
             self.db.connect()
-            user = self.db.execute_query("SELECT userId, name, username, password, gender, accountDateCreated, uniqueToken FROM user WHERE username = %s", (username,))            
-            if not user:
+            users = self.db.fetch("user_by_username", (username,))
+            if not users:
                 QMessageBox.warning(self, "Error", f"Account '{username}' isn't registered.")
                 return
-            db_password = user[0]["password"]
+            user = users[0]
+            db_password = user.password
             
             if ':' not in db_password:
                 QMessageBox.critical(self, "Error", "Invalid credentials. Please try again.")
@@ -41,16 +43,17 @@ class LoginWindow(QMainWindow):
             if encrypted_input == encrypted_stored:
                 from controls.dashboard_window import DashboardWindow
                 user_data = {
-                    "userId": user[0]["userId"],
-                    "name": user[0]["name"],
-                    "username": user[0]["username"],
-                    "password": user[0]["password"],
-                    "gender": user[0].get("gender", "N/A"),
-                    "accountDateCreated": user[0].get("accountDateCreated", "N/A"),
-                    "uniqueToken":user[0].get("uniqueToken", "N/A")
+                    "userId": user.userId,
+                    "name": user.name,
+                    "username": user.username,
+                    "password": user.password,
+                    "gender": user.gender or "N/A",
+                    "accountDateCreated": user.accountDateCreated or "N/A",
+                    "uniqueToken": user.uniqueToken or "N/A"
                 }
 
-                self.dashboard = DashboardWindow(user_data, self.db.config)
+                #the user's data lives on their shard, the login stays on the directory
+                self.dashboard = DashboardWindow(user_data, config_for_user(user_data["userId"]))
                 self.dashboard.on_login_success(user_data)
                 self.dashboard.show()
                 self.close()
@@ -87,7 +90,10 @@ if __name__ == "__main__":
     from PyQt6.QtWidgets import QApplication
     import sys
     from db.db_functions import Database
+    from controls.watchdog import install_watchdog
     app = QApplication(sys.argv)
+    #freezes of the event loop are logged to ~/.dailysales/stalls.jsonl
+    watchdog = install_watchdog(app)
     db = Database(db_config)
     window = LoginWindow(db)
     window.show()
@@ -0,0 +1,190 @@
+import argparse
+import sys
+from datetime import date, timedelta
+
+import mariadb
+
+from db.replicas import reporting_config
+from reports.money import format_cents
+
+#every line of either period once, flagged with the period(s) it belongs to; the periods may overlap
+PERIOD_LINES = """
+    SELECT o.orderId, od.productId, od.quantity, od.totalPrice,
+           od.totalPrice - od.quantity * COALESCE(od.unitCost, 0) AS profit,
+           (o.orderDateTime >= ? AND o.orderDateTime < ?) AS inPeriod,
+           (o.orderDateTime >= ? AND o.orderDateTime < ?) AS inBase
+    FROM orders o
+    JOIN order_details od ON od.orderId = o.orderId
+    WHERE o.userId = ?
+      AND ((o.orderDateTime >= ? AND o.orderDateTime < ?) OR (o.orderDateTime >= ? AND o.orderDateTime < ?))
+"""
+
+COMPARE_TOTALS = f"""
+    SELECT COUNT(DISTINCT CASE WHEN l.inPeriod THEN l.orderId END),
+           COUNT(DISTINCT CASE WHEN l.inBase THEN l.orderId END),
+           COALESCE(SUM(CASE WHEN l.inPeriod THEN l.quantity END), 0),
+           COALESCE(SUM(CASE WHEN l.inBase THEN l.quantity END), 0),
+           CAST(ROUND(COALESCE(SUM(CASE WHEN l.inPeriod THEN l.totalPrice END), 0) * 100) AS SIGNED),
+           CAST(ROUND(COALESCE(SUM(CASE WHEN l.inBase THEN l.totalPrice END), 0) * 100) AS SIGNED),
+           CAST(ROUND(COALESCE(SUM(CASE WHEN l.inPeriod THEN l.profit END), 0) * 100) AS SIGNED),
+           CAST(ROUND(COALESCE(SUM(CASE WHEN l.inBase THEN l.profit END), 0) * 100) AS SIGNED)
+    FROM ({PERIOD_LINES}) l
+"""
+
+COMPARE_PRODUCTS = f"""
+    SELECT l.productId, COALESCE(p.productName, CONCAT('#', l.productId)),
+           COALESCE(SUM(CASE WHEN l.inPeriod THEN l.quantity END), 0),
+           COALESCE(SUM(CASE WHEN l.inBase THEN l.quantity END), 0),
+           CAST(ROUND(COALESCE(SUM(CASE WHEN l.inPeriod THEN l.totalPrice END), 0) * 100) AS SIGNED),
+           CAST(ROUND(COALESCE(SUM(CASE WHEN l.inBase THEN l.totalPrice END), 0) * 100) AS SIGNED)
+    FROM ({PERIOD_LINES}) l
+    LEFT JOIN products p ON p.productId = l.productId
+    GROUP BY l.productId, p.productName
+"""
+
+METRICS = ("orders", "units", "revenue_cents", "profit_cents", "basket_cents", "margin")
+
+METRIC_LABELS = {
+    "orders": "Orders",
+    "units": "Units",
+    "revenue_cents": "Revenue",
+    "profit_cents": "Profit",
+    "basket_cents": "Average basket",
+    "margin": "Margin"
+}
+
+
+def previous_period(start, end):
+    #the same number of days right before start
+    return start - (end - start), start
+
+
+def same_period_last_year(start, end):
+    def shift(day):
+        try:
+            return day.replace(year=day.year - 1)
+        except ValueError:
+            return day.replace(year=day.year - 1, day=28)  # Feb 29
+    return shift(start), shift(end)
+
+
+def change(current, base):
+    #fraction, None when the base is zero but the period is not
+    if not base:
+        return None if current else 0.0
+    return (current - base) / base
+
+
+def period_totals(orders, units, revenue, profit):
+    return {
+        "orders": int(orders),
+        "units": int(units),
+        "revenue_cents": int(revenue),
+        "profit_cents": int(profit),
+        "basket_cents": int(revenue) // int(orders) if orders else 0,
+        "margin": profit / revenue if revenue else 0.0
+    }
+
+
+def compare_periods(db_config, user_id, period, base):
+    #period and base are (start inclusive, end exclusive); deltas are period minus base
+    params = (*period, *base, user_id, *period, *base)
+    conn = mariadb.connect(**reporting_config(db_config, user_id))
+    try:
+        cursor = conn.cursor()
+        cursor.execute(COMPARE_TOTALS, params)
+        orders, base_orders, units, base_units, revenue, base_revenue, profit, base_profit = cursor.fetchone()
+        cursor.execute(COMPARE_PRODUCTS, params)
+        product_rows = cursor.fetchall()
+        cursor.close()
+    finally:
+        conn.close()
+
+    current = period_totals(orders, units, revenue, profit)
+    previous = period_totals(base_orders, base_units, base_revenue, base_profit)
+    totals = {
+        metric: {
+            "period": current[metric],
+            "base": previous[metric],
+            "delta": current[metric] - previous[metric],
+            "change": None if metric == "margin" else change(current[metric], previous[metric])
+        }
+        for metric in METRICS
+    }
+
+    products = [
+        {
+            "productId": product_id,
+            "productName": name,
+            "period_units": int(units),
+            "base_units": int(base_units),
+            "units_delta": int(units) - int(base_units),
+            "period_revenue_cents": int(revenue),
+            "base_revenue_cents": int(base_revenue),
+            "revenue_delta_cents": int(revenue) - int(base_revenue),
+            "revenue_change": change(int(revenue), int(base_revenue))
+        }
+        for product_id, name, units, base_units, revenue, base_revenue in product_rows
+    ]
+    #biggest movers first, up or down
+    products.sort(key=lambda product: (-abs(product["revenue_delta_cents"]), product["productName"]))
+    return totals, products
+
+
+def format_metric(metric, value):
+    if metric == "margin":
+        return f"{value:.1%}"
+    if metric.endswith("_cents"):
+        return format_cents(value)
+    return f"{value:,}"
+
+
+def format_delta(metric, value):
+    if metric == "margin":
+        return f"{value * 100:+.1f} pts"
+    if metric.endswith("_cents"):
+        return ("+" if value >= 0 else "") + format_cents(value)
+    return f"{value:+,}"
+
+
+def format_change(fraction):
+    return "new" if fraction is None else f"{fraction:+.1%}"
+
+
+def main(argv=None):
+    from db.shards import config_for_user
+
+    today = date.today()
+    parser = argparse.ArgumentParser(description="Compare two periods: totals and per product changes")
+    parser.add_argument("--user", type=int, required=True, help="userId")
+    parser.add_argument("--start", type=date.fromisoformat, default=today - timedelta(days=today.weekday()))
+    parser.add_argument("--end", type=date.fromisoformat, default=today, help="last day, inclusive")
+    parser.add_argument("--base-start", type=date.fromisoformat, help="defaults to the period right before")
+    parser.add_argument("--base-end", type=date.fromisoformat, help="last day, inclusive")
+    parser.add_argument("--last-year", action="store_true", help="compare with the same dates last year")
+    parser.add_argument("--top", type=int, default=10, help="products listed")
+    args = parser.parse_args(argv)
+
+    period = (args.start, args.end + timedelta(days=1))
+    if args.base_start and args.base_end:
+        base = (args.base_start, args.base_end + timedelta(days=1))
+    elif args.last_year:
+        base = same_period_last_year(*period)
+    else:
+        base = previous_period(*period)
+
+    totals, products = compare_periods(config_for_user(args.user), args.user, period, base)
+    print(f"Period {period[0]} to {period[1] - timedelta(days=1)}  vs  base {base[0]} to {base[1] - timedelta(days=1)}")
+    for metric in METRICS:
+        row = totals[metric]
+        print(f"{METRIC_LABELS[metric]:<15} {format_metric(metric, row['period']):>14} {format_metric(metric, row['base']):>14} "
+              f"{format_delta(metric, row['delta']):>14} {'' if metric == 'margin' else format_change(row['change']):>8}")
+    for product in products[:args.top]:
+        print(f"  {product['productName']:<40} units {product['base_units']:>6} -> {product['period_units']:<6} "
+              f"revenue {format_cents(product['base_revenue_cents']):>12} -> {format_cents(product['period_revenue_cents']):>12} "
+              f"{format_change(product['revenue_change']):>8}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
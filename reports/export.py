@@ -0,0 +1,244 @@
+import argparse
+import hashlib
+import json
+import os
+import re
+import sys
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, datetime, timedelta
+
+import mariadb
+import openpyxl
+import pandas as pd
+from fpdf import FPDF
+from openpyxl.styles import Alignment
+
+from db.archive import archived_rows
+from db.replicas import reporting_config
+from reports.money import format_cents
+from reports.sales_buffer import SalesBuffer
+
+HEADERS = ["Order ID", "Product Name", "Quantity", "Total Retail Sales", "Sales Date"]
+
+#same rows the sales history screen shows, for a whole range at once
+SALES_QUERY = """
+    SELECT o.orderId, p.productName, od.quantity, CAST(ROUND(od.totalPrice * 100) AS SIGNED),
+           CAST(ROUND(COALESCE(od.unitCost, p.purchasePrice, 0) * 100) AS SIGNED) * od.quantity,
+           o.orderDateTime
+    FROM order_details od
+    JOIN orders o ON od.orderId = o.orderId
+    JOIN products p ON od.productId = p.productId
+    WHERE o.userId = ? AND o.orderDateTime >= ? AND o.orderDateTime < ?
+    ORDER BY o.orderDateTime, o.orderId, od.orderDetailId
+"""
+
+CORE_DATES = re.compile(rb"(<dcterms:(?:created|modified)[^>]*>)[^<]*(</dcterms:)")
+PDF_CREATION_DATE = re.compile(rb"(/CreationDate \(D:)\d{14}")
+
+
+def fetch_sales(db_config, user_id, start, end, missing=None):
+    conn = mariadb.connect(**reporting_config(db_config, user_id))
+    try:
+        cursor = conn.cursor()
+        #archived months first, they are always older than what is still in the tables
+        rows = archived_rows(cursor, user_id, start, end, missing)
+        cursor.execute(SALES_QUERY, (user_id, start, end))
+        rows += cursor.fetchall()
+        cursor.close()
+    finally:
+        conn.close()
+    return rows
+
+
+def table_rows(sales, indexes=None, separator=", "):
+    return [
+        [
+            str(order_id),
+            separator.join([p[0] for p in products]),
+            separator.join([str(p[1]) for p in products]),
+            format_cents(total_cents),
+            str(sales_date)
+        ]
+        for order_id, products, total_cents, sales_date in sales.orders(indexes)
+    ]
+
+
+def write_excel(rows, path, stamp=None):
+    data = []
+    for row in rows:
+        row = list(row)
+        #newlines for 30 exceeded char
+        row[1] = '\n'.join([row[1][i:i+30] for i in range(0, len(row[1]), 30)])
+        data.append(row)
+    pd.DataFrame(data, columns=HEADERS).to_excel(path, index=False)
+
+    #textwrapping
+    wb = openpyxl.load_workbook(path)
+    ws = wb.active
+    for row in ws.iter_rows(min_row=2, max_col=5, max_row=ws.max_row):
+        for cell in row:
+            cell.alignment = Alignment(wrap_text=True, vertical='top')
+    wb.save(path)
+
+    if stamp is not None:
+        normalize_xlsx(path, stamp)
+
+
+def write_pdf(sales, path, stamp=None):
+    pdf = FPDF()
+    if stamp is not None and hasattr(pdf, "set_creation_date"):
+        pdf.set_creation_date(as_stamp(stamp))
+    pdf.add_page()
+    pdf.set_font("Arial", size=10)
+
+    line_height = 6
+    col_widths = [25, 60, 30, 40, 35]
+
+    for i, header in enumerate(HEADERS):
+        pdf.cell(col_widths[i], line_height, header, border=1)
+    pdf.ln(line_height)
+
+    for order_id, products, total_cents, sales_date in sales.orders():
+        for i, (product, quantity) in enumerate(products):
+            row_data = [
+                str(order_id) if i == 0 else "",
+                product,
+                str(quantity),
+                format_cents(total_cents) if i == 0 else "",
+                str(sales_date) if i == 0 else ""
+            ]
+            for j, data in enumerate(row_data):
+                pdf.cell(col_widths[j], line_height, data, border=1)
+            pdf.ln(line_height)
+
+    pdf.output(path)
+
+    if stamp is not None:
+        normalize_pdf(path, stamp)
+
+
+def as_stamp(stamp):
+    if isinstance(stamp, datetime):
+        return stamp
+    return datetime(stamp.year, stamp.month, stamp.day)
+
+
+def normalize_xlsx(path, stamp):
+    #openpyxl writes the save time into the document and the zip entries, pin both
+    stamp = as_stamp(stamp)
+    with zipfile.ZipFile(path) as source:
+        entries = [(info.filename, source.read(info.filename)) for info in source.infolist()]
+    iso = stamp.strftime("%Y-%m-%dT%H:%M:%SZ").encode()
+    with zipfile.ZipFile(path + ".tmp", "w", zipfile.ZIP_DEFLATED) as target:
+        for name, content in entries:
+            if name == "docProps/core.xml":
+                content = CORE_DATES.sub(rb"\g<1>" + iso + rb"\g<2>", content)
+            info = zipfile.ZipInfo(name, date_time=stamp.timetuple()[:6])
+            info.compress_type = zipfile.ZIP_DEFLATED
+            target.writestr(info, content)
+    os.replace(path + ".tmp", path)
+
+
+def normalize_pdf(path, stamp):
+    #older fpdf always stamps the current time; same length, so the xref offsets stay valid
+    with open(path, "rb") as f:
+        content = f.read()
+    pinned = PDF_CREATION_DATE.sub(rb"\g<1>" + as_stamp(stamp).strftime("%Y%m%d%H%M%S").encode(), content)
+    if pinned != content:
+        with open(path, "wb") as f:
+            f.write(pinned)
+
+
+def render(job):
+    #runs in a worker process, no database or Qt needed here
+    path, file_format, sales, stamp = job
+    if file_format == "xlsx":
+        write_excel(table_rows(sales), path, stamp)
+    else:
+        write_pdf(sales, path, stamp)
+    with open(path, "rb") as f:
+        content = f.read()
+    return {
+        "file": os.path.basename(path),
+        "format": file_format,
+        "orders": len(sales),
+        "sales_cents": sales.totals()[0],
+        "bytes": len(content),
+        "sha256": hashlib.sha256(content).hexdigest()
+    }
+
+
+def export_jobs(sales, start, end, formats, out_dir, per_day=True):
+    #end is exclusive
+    if not per_day:
+        last = end - timedelta(days=1)
+        return [
+            (os.path.join(out_dir, f"sales_history_{start}_{last}.{file_format}"), file_format, sales, last)
+            for file_format in formats
+        ]
+
+    return [
+        (os.path.join(out_dir, f"sales_history_{day}.{file_format}"), file_format, day_sales, day)
+        for day, day_sales in sales.split_by_day().items()
+        for file_format in formats
+    ]
+
+
+def export_sales(db_config, user_id, start, end, out_dir, formats=("xlsx", "pdf"), per_day=True, workers=None):
+    missing = []
+    sales = SalesBuffer.from_rows(fetch_sales(db_config, user_id, start, end, missing))
+    os.makedirs(out_dir, exist_ok=True)
+    jobs = export_jobs(sales, start, end, formats, out_dir, per_day)
+
+    #days don't depend on each other, render them on every core
+    if len(jobs) > 1 and workers != 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            files = list(pool.map(render, jobs))
+    else:
+        files = [render(job) for job in jobs]
+
+    manifest = {
+        "user": user_id,
+        "start": str(start),
+        "end": str(end - timedelta(days=1)),
+        "mode": "daily" if per_day else "consolidated",
+        "orders": len(sales),
+        "missing_archives": [f"{month:%Y-%m}" for month in missing],
+        "files": files
+    }
+    with open(os.path.join(out_dir, "manifest.json"), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    return manifest
+
+
+def main(argv=None):
+    from db.shards import config_for_user
+
+    today = date.today()
+    parser = argparse.ArgumentParser(description="Export sales history to Excel/PDF without the GUI")
+    parser.add_argument("--user", type=int, required=True, help="userId")
+    parser.add_argument("--start", type=date.fromisoformat, default=today.replace(day=1))
+    parser.add_argument("--end", type=date.fromisoformat, default=today, help="last day, inclusive")
+    parser.add_argument("--format", choices=["xlsx", "pdf", "both"], default="both")
+    parser.add_argument("--consolidated", action="store_true", help="one file for the whole range")
+    parser.add_argument("--out", default=os.path.join(os.path.expanduser("~"), "sales_exports"))
+    parser.add_argument("--workers", type=int, default=None, help="worker processes, default one per core")
+    args = parser.parse_args(argv)
+    db_config = config_for_user(args.user)
+
+    formats = ("xlsx", "pdf") if args.format == "both" else (args.format,)
+    manifest = export_sales(db_config, args.user, args.start, args.end + timedelta(days=1), args.out,
+                            formats, not args.consolidated, args.workers)
+    for entry in manifest["files"]:
+        print(f"{entry['file']:<45} orders={entry['orders']:>5}  sales={format_cents(entry['sales_cents']):>12}  "
+              f"{entry['sha256'][:12]}")
+    print(f"{len(manifest['files'])} files written to {args.out}")
+    if manifest["missing_archives"]:
+        print("Archived months not found on this computer, left out: " + ", ".join(manifest["missing_archives"]))
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,60 @@
+import argparse
+import sys
+from datetime import date, timedelta
+
+import mariadb
+
+from db.replicas import reporting_config
+from reports.money import format_cents
+
+WEEKDAYS = ["Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun"]
+
+#a primary key range read of the rollup, a year is at most 8784 rows
+HEATMAP_QUERY = """
+    SELECT WEEKDAY(hourStart) AS weekday, HOUR(hourStart) AS hour, SUM(orders), SUM(revenueCents)
+    FROM sales_hourly
+    WHERE userId = ? AND hourStart >= ? AND hourStart < ?
+    GROUP BY weekday, hour
+"""
+
+
+def load_heatmap(db_config, user_id, start, end):
+    #start is inclusive, end is exclusive; returns orders[weekday][hour] and revenue_cents[weekday][hour]
+    orders = [[0] * 24 for _ in WEEKDAYS]
+    revenue_cents = [[0] * 24 for _ in WEEKDAYS]
+    conn = mariadb.connect(**reporting_config(db_config, user_id))
+    try:
+        cursor = conn.cursor()
+        cursor.execute(HEATMAP_QUERY, (user_id, start, end))
+        for weekday, hour, order_count, cents in cursor.fetchall():
+            orders[weekday][hour] = int(order_count)
+            revenue_cents[weekday][hour] = int(cents)
+    finally:
+        conn.close()
+    return orders, revenue_cents
+
+
+def main(argv=None):
+    from db.shards import config_for_user
+
+    today = date.today()
+    parser = argparse.ArgumentParser(description="Orders or revenue by weekday and hour")
+    parser.add_argument("--user", type=int, required=True, help="userId")
+    parser.add_argument("--start", type=date.fromisoformat, default=today - timedelta(days=90))
+    parser.add_argument("--end", type=date.fromisoformat, default=today, help="last day, inclusive")
+    parser.add_argument("--metric", choices=("orders", "revenue"), default="orders")
+    args = parser.parse_args(argv)
+
+    orders, revenue_cents = load_heatmap(config_for_user(args.user), args.user, args.start,
+                                         args.end + timedelta(days=1))
+    grid = orders if args.metric == "orders" else revenue_cents
+    value = str if args.metric == "orders" else format_cents
+    width = max(len(value(cell)) for row in grid for cell in row) + 1
+    print("     " + "".join(f"{hour:>{width}}" for hour in range(24)))
+    for weekday, row in zip(WEEKDAYS, grid):
+        print(f"{weekday:<5}" + "".join(f"{value(cell):>{width}}" for cell in row))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,14 @@
+from decimal import Decimal, ROUND_HALF_UP
+
+#amounts are kept as integer cents so sums never drift
+def to_cents(value):
+    if value is None:
+        return 0
+    amount = Decimal(str(value)).quantize(Decimal("0.01"), rounding=ROUND_HALF_UP)
+    return int(amount * 100)
+
+def format_cents(cents):
+    cents = int(cents)
+    sign = "-" if cents < 0 else ""
+    cents = abs(cents)
+    return f"{sign}{cents // 100}.{cents % 100:02d}"
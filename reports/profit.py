@@ -0,0 +1,123 @@
+import argparse
+import sys
+from datetime import date, timedelta
+
+import mariadb
+import numpy as np
+import pandas as pd
+
+from db.replicas import reporting_config
+from reports.money import format_cents
+
+LINE_FIELDS = ("day", "order_id", "quantity", "revenue_cents", "cost_cents")
+
+LINES_QUERY = """
+    SELECT TO_DAYS(o.orderDateTime) - 719528,  -- days since 1970-01-01
+           o.orderId,
+           od.quantity,
+           CAST(ROUND(od.totalPrice * 100) AS SIGNED),
+           CAST(ROUND(COALESCE(od.unitCost, 0) * 100) AS SIGNED) * od.quantity
+    FROM orders o
+    JOIN order_details od ON od.orderId = o.orderId
+    WHERE o.userId = ? AND o.orderDateTime >= ? AND o.orderDateTime < ?
+"""
+
+
+def empty_lines():
+    return {field: np.empty(0, dtype=np.int64) for field in LINE_FIELDS}
+
+
+def load_lines(db_config, user_id, start, end, chunk_size=100000):
+    #start is inclusive, end is exclusive (both dates)
+    conn = mariadb.connect(**reporting_config(db_config, user_id))
+    try:
+        cursor = conn.cursor()
+        cursor.execute(LINES_QUERY, (user_id, start, end))
+        chunks = []
+        while True:
+            rows = cursor.fetchmany(chunk_size)
+            if not rows:
+                break
+            chunks.append(np.array(rows, dtype=np.int64))
+        cursor.close()
+    finally:
+        conn.close()
+
+    if not chunks:
+        return empty_lines()
+    table = np.concatenate(chunks)
+    return {field: table[:, i] for i, field in enumerate(LINE_FIELDS)}
+
+
+def totals(revenue_cents, cost_cents):
+    revenue = int(np.asarray(revenue_cents, dtype=np.int64).sum())
+    cost = int(np.asarray(cost_cents, dtype=np.int64).sum())
+    return revenue, cost, revenue - cost
+
+
+def summarize(lines):
+    revenue, cost, profit = totals(lines["revenue_cents"], lines["cost_cents"])
+    return {
+        "orders": int(np.unique(lines["order_id"]).size),
+        "units": int(lines["quantity"].sum()),
+        "revenue_cents": revenue,
+        "cost_cents": cost,
+        "profit_cents": profit,
+        "margin": profit / revenue if revenue else 0.0
+    }
+
+
+def aggregate(lines, freq="M"):
+    #freq is "D", "W" (weeks start on Monday), "M" or "Y"
+    days = lines["day"]
+    if freq == "W":
+        periods = (days - (days + 3) % 7).astype("datetime64[D]")  # 1970-01-01 was a Thursday
+    else:
+        periods = days.astype("datetime64[D]").astype(f"datetime64[{freq}]")
+    frame = pd.DataFrame({
+        "period": periods,
+        "order_id": lines["order_id"],
+        "units": lines["quantity"],
+        "revenue_cents": lines["revenue_cents"],
+        "cost_cents": lines["cost_cents"]
+    })
+    grouped = frame.groupby("period", sort=True)
+    result = grouped[["units", "revenue_cents", "cost_cents"]].sum()
+    result.insert(0, "orders", grouped["order_id"].nunique())
+    result["profit_cents"] = result["revenue_cents"] - result["cost_cents"]
+    revenue = result["revenue_cents"].to_numpy()
+    result["margin"] = np.divide(result["profit_cents"].to_numpy(), revenue,
+                                 out=np.zeros(len(result)), where=revenue != 0)
+    return result
+
+
+def profit_report(db_config, user_id, start, end, freq="M"):
+    lines = load_lines(db_config, user_id, start, end)
+    return summarize(lines), aggregate(lines, freq)
+
+
+def main(argv=None):
+    from db.shards import config_for_user
+
+    today = date.today()
+    parser = argparse.ArgumentParser(description="Profit and margin report")
+    parser.add_argument("--user", type=int, required=True, help="userId")
+    parser.add_argument("--start", type=date.fromisoformat, default=date(today.year, 1, 1))
+    parser.add_argument("--end", type=date.fromisoformat, default=today, help="last day, inclusive")
+    parser.add_argument("--freq", choices=["D", "W", "M", "Y"], default="M")
+    args = parser.parse_args(argv)
+    db_config = config_for_user(args.user)
+
+    summary, periods = profit_report(db_config, args.user, args.start, args.end + timedelta(days=1), args.freq)
+    for row in periods.itertuples():
+        print(f"{row.Index:%Y-%m-%d}  orders={row.orders:>7}  units={row.units:>8}  "
+              f"revenue={format_cents(row.revenue_cents):>12}  profit={format_cents(row.profit_cents):>12}  "
+              f"margin={row.margin:.1%}")
+    print(f"TOTAL  orders={summary['orders']}  units={summary['units']}  "
+          f"revenue={format_cents(summary['revenue_cents'])}  cost={format_cents(summary['cost_cents'])}  "
+          f"profit={format_cents(summary['profit_cents'])}  margin={summary['margin']:.1%}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
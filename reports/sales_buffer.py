@@ -0,0 +1,175 @@
+import argparse
+import random
+import sys
+import time
+import tracemalloc
+from array import array
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+
+#column order of the rows from_rows() expects
+ROW_FIELDS = ("order_id", "product_name", "quantity", "total_cents", "cost_cents", "order_datetime")
+
+
+class SalesBuffer:
+    #loaded sales as typed columns: one entry per order, one per order line
+    def __init__(self):
+        self.order_ids = array("q")
+        self.order_days = array("l")        # date.toordinal() of the order
+        self.order_totals = array("q")      # cents
+        self.order_starts = array("l", [0])  # order i owns lines order_starts[i]:order_starts[i + 1]
+        self.line_names = array("l")        # index into self.names
+        self.line_quantities = array("l")
+        self.line_cents = array("q")
+        self.line_costs = array("q")
+        self.names = []
+        self.name_index = {}
+        self.positions = {}
+
+    @classmethod
+    def from_rows(cls, rows):
+        buffer = cls()
+        for row in rows:
+            buffer.append(*row)
+        return buffer
+
+    def __len__(self):
+        return len(self.order_ids)
+
+    def __contains__(self, order_id):
+        return order_id in self.positions
+
+    def intern(self, name):
+        index = self.name_index.get(name)
+        if index is None:
+            index = self.name_index[name] = len(self.names)
+            self.names.append(name)
+        return index
+
+    def append(self, order_id, product_name, quantity, total_cents, cost_cents, order_datetime):
+        #lines of one order must come together, the loaders sort by orderId
+        if not self.order_ids or self.order_ids[-1] != order_id:
+            self.positions[order_id] = len(self.order_ids)
+            self.order_ids.append(order_id)
+            self.order_days.append(order_datetime.toordinal())
+            self.order_totals.append(0)
+            self.order_starts.append(self.order_starts[-1])
+        self.line_names.append(self.intern(product_name))
+        self.line_quantities.append(quantity)
+        self.line_cents.append(total_cents)
+        self.line_costs.append(cost_cents)
+        self.order_totals[-1] += total_cents
+        self.order_starts[-1] += 1
+
+    def add_order(self, order_id, order_datetime, lines):
+        #lines are (product_name, quantity, total_cents, cost_cents)
+        for product_name, quantity, total_cents, cost_cents in lines:
+            self.append(order_id, product_name, quantity, total_cents, cost_cents, order_datetime)
+
+    def products(self, i):
+        return [
+            (self.names[self.line_names[j]], self.line_quantities[j])
+            for j in range(self.order_starts[i], self.order_starts[i + 1])
+        ]
+
+    def order(self, i):
+        return self.order_ids[i], self.products(i), self.order_totals[i], date.fromordinal(self.order_days[i])
+
+    def orders(self, indexes=None):
+        for i in range(len(self)) if indexes is None else indexes:
+            yield self.order(i)
+
+    def totals(self):
+        return sum(self.line_cents), sum(self.line_costs)
+
+    def search(self, text):
+        #match each distinct product name once, then only compare ints per line
+        text = text.lower()
+        matching = {i for i, name in enumerate(self.names) if text in name.lower()}
+        return [
+            i for i in range(len(self))
+            if any(self.line_names[j] in matching for j in range(self.order_starts[i], self.order_starts[i + 1]))
+        ]
+
+    def matches(self, i, text):
+        text = text.lower()
+        return any(text in self.names[self.line_names[j]].lower()
+                   for j in range(self.order_starts[i], self.order_starts[i + 1]))
+
+    def select(self, indexes):
+        subset = SalesBuffer()
+        for i in indexes:
+            order_id, _, _, sales_date = self.order(i)
+            moment = datetime(sales_date.year, sales_date.month, sales_date.day)
+            for j in range(self.order_starts[i], self.order_starts[i + 1]):
+                subset.append(order_id, self.names[self.line_names[j]], self.line_quantities[j],
+                              self.line_cents[j], self.line_costs[j], moment)
+        return subset
+
+    def split_by_day(self):
+        days = {}
+        for i, day in enumerate(self.order_days):
+            days.setdefault(day, []).append(i)
+        return {date.fromordinal(day): self.select(indexes) for day, indexes in sorted(days.items())}
+
+
+def legacy_order_sales(rows):
+    #the dict of dicts SalesHistoryWindow used before, kept for the benchmark
+    order_sales = {}
+    for order_id, product_name, quantity, total_cents, cost_cents, order_datetime in rows:
+        if order_id not in order_sales:
+            order_sales[order_id] = {
+                "products": [],
+                "total_sales": Decimal("0.00"),
+                "sales_date": order_datetime.date()
+            }
+        order_sales[order_id]["products"].append((product_name, quantity))
+        order_sales[order_id]["total_sales"] += Decimal(total_cents) / 100
+    return order_sales
+
+
+def sample_rows(lines, products=200, seed=1):
+    rng = random.Random(seed)
+    #names built at runtime like the ones fetched from the database, so they are separate objects
+    names = [f"Product {i}" for i in range(products)]
+    start = datetime(2025, 1, 1, 8)
+    rows = []
+    order_id = 0
+    while len(rows) < lines:
+        order_id += 1
+        moment = start + timedelta(minutes=7 * order_id)
+        for _ in range(rng.randint(1, 5)):
+            quantity = rng.randint(1, 10)
+            price = rng.randint(500, 50000)
+            rows.append((order_id, "".join(list(rng.choice(names))), quantity, price * quantity,
+                         price * quantity * 7 // 10, moment))
+    return rows[:lines]
+
+
+def measure(build, rows):
+    tracemalloc.start()
+    began = time.perf_counter()
+    result = build(rows)
+    elapsed = time.perf_counter() - began
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, size, elapsed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Memory benchmark: SalesBuffer vs the old dict of dicts")
+    parser.add_argument("--lines", type=int, default=200000)
+    parser.add_argument("--products", type=int, default=200)
+    args = parser.parse_args(argv)
+
+    rows = sample_rows(args.lines, args.products)
+    for label, build in (("dict of dicts", legacy_order_sales), ("SalesBuffer", SalesBuffer.from_rows)):
+        result, size, elapsed = measure(build, rows)
+        print(f"{label:<14} orders={len(result):>8}  memory={size / 1024 / 1024:8.2f} MiB  "
+              f"bytes/line={size / len(rows):7.1f}  build={elapsed:6.3f}s")
+        del result
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
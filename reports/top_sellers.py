@@ -0,0 +1,127 @@
+import argparse
+import sys
+from datetime import date, timedelta
+
+import mariadb
+
+from db.replicas import reporting_config
+from reports.money import format_cents
+
+#ranking column per metric; never put user text into the SQL
+METRIC_COLUMNS = {
+    "units": "units",
+    "revenue": "revenueCents",
+    "margin": "profitCents"
+}
+
+#revenue share that closes class A and class B
+CLASS_A_SHARE = 0.80
+CLASS_B_SHARE = 0.95
+
+#one row per product sold in the period, computed by the server
+PRODUCT_TOTALS = """
+    SELECT od.productId,
+           SUM(od.quantity) AS units,
+           CAST(SUM(od.totalPrice) * 100 AS SIGNED) AS revenueCents,
+           CAST(SUM(od.totalPrice - od.quantity * COALESCE(od.unitCost, 0)) * 100 AS SIGNED) AS profitCents
+    FROM orders o
+    JOIN order_details od ON od.orderId = o.orderId
+    WHERE o.userId = ? AND o.orderDateTime >= ? AND o.orderDateTime < ?
+    GROUP BY od.productId
+"""
+
+#running revenue share over every product, then the ABC class
+RANKED_PRODUCTS = f"""
+    SELECT t.productId, p.productName, t.units, t.revenueCents, t.profitCents,
+           t.revenueCents / NULLIF(SUM(t.revenueCents) OVER (), 0) AS share,
+           CASE
+               WHEN SUM(t.revenueCents) OVER (ORDER BY t.revenueCents DESC, t.productId ROWS UNBOUNDED PRECEDING)
+                    - t.revenueCents < {CLASS_A_SHARE} * SUM(t.revenueCents) OVER () THEN 'A'
+               WHEN SUM(t.revenueCents) OVER (ORDER BY t.revenueCents DESC, t.productId ROWS UNBOUNDED PRECEDING)
+                    - t.revenueCents < {CLASS_B_SHARE} * SUM(t.revenueCents) OVER () THEN 'B'
+               ELSE 'C'
+           END AS abcClass
+    FROM ({PRODUCT_TOTALS}) t
+    JOIN products p ON p.productId = t.productId
+"""
+
+TOP_PRODUCTS = """
+    SELECT productId, productName, units, revenueCents, profitCents, share, abcClass
+    FROM ({ranked}) r
+    ORDER BY r.{column} DESC, r.productId
+    LIMIT ?
+"""
+
+CLASS_SUMMARY = f"""
+    SELECT r.abcClass, COUNT(*), SUM(r.revenueCents)
+    FROM ({RANKED_PRODUCTS}) r
+    GROUP BY r.abcClass
+    ORDER BY r.abcClass
+"""
+
+
+def top_products(cursor, user_id, start, end, metric="revenue", limit=10):
+    column = METRIC_COLUMNS[metric]
+    cursor.execute(TOP_PRODUCTS.format(ranked=RANKED_PRODUCTS, column=column),
+                   (user_id, start, end, limit))
+    products = []
+    for product_id, name, units, revenue, profit, share, abc_class in cursor.fetchall():
+        products.append({
+            "productId": product_id,
+            "productName": name,
+            "units": int(units),
+            "revenue_cents": int(revenue),
+            "profit_cents": int(profit),
+            "margin": profit / revenue if revenue else 0.0,
+            "share": float(share or 0),
+            "class": abc_class
+        })
+    return products
+
+
+def class_summary(cursor, user_id, start, end):
+    cursor.execute(CLASS_SUMMARY, (user_id, start, end))
+    summary = {abc_class: {"products": 0, "revenue_cents": 0} for abc_class in "ABC"}
+    for abc_class, count, revenue in cursor.fetchall():
+        summary[abc_class] = {"products": int(count), "revenue_cents": int(revenue or 0)}
+    return summary
+
+
+def top_sellers_report(db_config, user_id, start, end, metric="revenue", limit=10):
+    #start is inclusive, end is exclusive
+    conn = mariadb.connect(**reporting_config(db_config, user_id))
+    try:
+        cursor = conn.cursor()
+        products = top_products(cursor, user_id, start, end, metric, limit)
+        summary = class_summary(cursor, user_id, start, end)
+        cursor.close()
+    finally:
+        conn.close()
+    return products, summary
+
+
+def main(argv=None):
+    from db.shards import config_for_user
+
+    today = date.today()
+    parser = argparse.ArgumentParser(description="Top sellers and ABC classification")
+    parser.add_argument("--user", type=int, required=True, help="userId")
+    parser.add_argument("--start", type=date.fromisoformat, default=today.replace(day=1))
+    parser.add_argument("--end", type=date.fromisoformat, default=today, help="last day, inclusive")
+    parser.add_argument("--metric", choices=sorted(METRIC_COLUMNS), default="revenue")
+    parser.add_argument("--top", type=int, default=10)
+    args = parser.parse_args(argv)
+    db_config = config_for_user(args.user)
+
+    products, summary = top_sellers_report(db_config, args.user, args.start,
+                                           args.end + timedelta(days=1), args.metric, args.top)
+    for rank, product in enumerate(products, start=1):
+        print(f"{rank:>3}. [{product['class']}] {product['productName']:<40} units={product['units']:>7}  "
+              f"revenue={format_cents(product['revenue_cents']):>12}  margin={product['margin']:.1%}")
+    for abc_class, totals in summary.items():
+        print(f"Class {abc_class}: {totals['products']} products, revenue {format_cents(totals['revenue_cents'])}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
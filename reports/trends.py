@@ -0,0 +1,123 @@
+from datetime import date, datetime, timedelta
+
+import mariadb
+
+from db.replicas import reporting_config
+
+#bucket name -> (approximate seconds, SQL expression for the bucket start)
+BUCKETS = {
+    "hour": (3600, "DATE(o.orderDateTime) + INTERVAL HOUR(o.orderDateTime) HOUR"),
+    "day": (86400, "DATE(o.orderDateTime)"),
+    "week": (7 * 86400, "DATE(o.orderDateTime) - INTERVAL WEEKDAY(o.orderDateTime) DAY"),
+    "month": (30 * 86400, "DATE(o.orderDateTime) - INTERVAL DAYOFMONTH(o.orderDateTime) - 1 DAY"),
+    "quarter": (91 * 86400, "MAKEDATE(YEAR(o.orderDateTime), 1) + INTERVAL QUARTER(o.orderDateTime) - 1 QUARTER"),
+    "year": (365 * 86400, "MAKEDATE(YEAR(o.orderDateTime), 1)")
+}
+
+#the range filter stays on the raw column so the (userId, orderDateTime) index is used
+TREND_QUERY = """
+    SELECT {bucket} AS bucketStart, COUNT(*), CAST(SUM(o.totalPrice) * 100 AS SIGNED)
+    FROM orders o
+    WHERE o.userId = ? AND o.orderDateTime >= ? AND o.orderDateTime < ?
+    GROUP BY bucketStart
+    ORDER BY bucketStart
+"""
+
+MAX_BUCKETS = 2000
+
+
+def choose_bucket(start, end, max_buckets=MAX_BUCKETS):
+    seconds = (as_datetime(end) - as_datetime(start)).total_seconds()
+    for name, (size, _) in BUCKETS.items():
+        if seconds / size <= max_buckets:
+            return name
+    return "year"
+
+
+def as_datetime(value):
+    if isinstance(value, datetime):
+        return value
+    if isinstance(value, date):
+        return datetime(value.year, value.month, value.day)
+    return datetime.fromisoformat(str(value))
+
+
+def bucket_floor(moment, bucket):
+    moment = as_datetime(moment)
+    if bucket == "hour":
+        return moment.replace(minute=0, second=0, microsecond=0)
+    day = datetime(moment.year, moment.month, moment.day)
+    if bucket == "day":
+        return day
+    if bucket == "week":
+        return day - timedelta(days=day.weekday())
+    if bucket == "month":
+        return day.replace(day=1)
+    if bucket == "quarter":
+        return day.replace(month=(day.month - 1) // 3 * 3 + 1, day=1)
+    return day.replace(month=1, day=1)
+
+
+def next_bucket(moment, bucket):
+    if bucket == "hour":
+        return moment + timedelta(hours=1)
+    if bucket == "day":
+        return moment + timedelta(days=1)
+    if bucket == "week":
+        return moment + timedelta(days=7)
+    months = {"month": 1, "quarter": 3, "year": 12}[bucket]
+    month_index = moment.year * 12 + moment.month - 1 + months
+    return moment.replace(year=month_index // 12, month=month_index % 12 + 1)
+
+
+def load_trend(db_config, user_id, start, end, bucket=None):
+    #start is inclusive, end is exclusive; empty buckets come back as zero
+    bucket = bucket or choose_bucket(start, end)
+    conn = mariadb.connect(**reporting_config(db_config, user_id))
+    try:
+        cursor = conn.cursor()
+        cursor.execute(TREND_QUERY.format(bucket=BUCKETS[bucket][1]), (user_id, start, end))
+        rows = {as_datetime(bucket_start): (orders, revenue) for bucket_start, orders, revenue in cursor.fetchall()}
+        cursor.close()
+    finally:
+        conn.close()
+
+    series = []
+    moment = bucket_floor(start, bucket)
+    end = as_datetime(end)
+    while moment < end:
+        orders, revenue = rows.get(moment, (0, 0))
+        series.append((moment, int(orders), int(revenue or 0)))
+        moment = next_bucket(moment, bucket)
+    return bucket, series
+
+
+def lttb(points, threshold):
+    #Largest-Triangle-Three-Buckets: keeps the visual shape with `threshold` points
+    count = len(points)
+    if threshold >= count or threshold < 3:
+        return list(points)
+
+    sampled = [points[0]]
+    every = (count - 2) / (threshold - 2)
+    a = 0
+    for i in range(threshold - 2):
+        avg_start = int((i + 1) * every) + 1
+        avg_end = min(int((i + 2) * every) + 1, count)
+        avg_x = sum(points[j][0] for j in range(avg_start, avg_end)) / (avg_end - avg_start)
+        avg_y = sum(points[j][1] for j in range(avg_start, avg_end)) / (avg_end - avg_start)
+
+        range_start = int(i * every) + 1
+        range_end = int((i + 1) * every) + 1
+        ax, ay = points[a]
+        best_area = -1
+        best = range_start
+        for j in range(range_start, range_end):
+            area = abs((ax - avg_x) * (points[j][1] - ay) - (ax - points[j][0]) * (avg_y - ay))
+            if area > best_area:
+                best_area = area
+                best = j
+        sampled.append(points[best])
+        a = best
+    sampled.append(points[-1])
+    return sampled